@@ -1,9 +1,9 @@
 import pandas as pd
 import streamlit as st
 
-movies = pd.read_csv("../data/processed/merged_enriched_movies.csv")
-user_ratings = pd.read_csv("../data/processed/cleaned_user_ratings.csv")
-aggregated_user_ratings = pd.read_csv("../data/processed/aggregated_user_ratings.csv")
+movies = pd.read_parquet("../data/processed/merged_enriched_movies.parquet")
+user_ratings = pd.read_parquet("../data/processed/cleaned_user_ratings.parquet")
+aggregated_user_ratings = pd.read_parquet("../data/processed/aggregated_user_ratings.parquet")
 
 st.set_page_config(
     page_title="Letterboxd Ratings Dashboard",
@@ -95,15 +95,17 @@ options = ["Select a movie"] + movie_id
 selected_movie = st.selectbox("Select a movie", options)
 
 if selected_movie != "Select a movie":
-    movie_title = movies[movies['movie_id'] == selected_movie]['movie_title'].values[0]
-    genres = movies[movies['movie_id'] == selected_movie]['genres'].values[0].strip("[]").replace("'", "")
-    original_language = movies[movies['movie_id'] == selected_movie]['original_language'].values[0]
-    poster = movies[movies['movie_id'] == selected_movie]['image_url'].values[0]
-    runtime = movies[movies['movie_id'] == selected_movie]['runtime'].values[0]
-    year_released = movies[movies['movie_id'] == selected_movie]['year_released'].values[0]
-    rating = movies[movies['movie_id'] == selected_movie]['rating'].values[0]
-    power_users_rating = movies[movies['movie_id'] == selected_movie]['power_users_rating'].values[0]
-    ratings_count = movies[movies['movie_id'] == selected_movie]['ratings_count'].values[0]
+    # Look the movie up once by its id rather than filtering for each field
+    movie = movies.set_index('movie_id').loc[selected_movie]
+    movie_title = movie['movie_title']
+    genres = ", ".join(movie['genres'])
+    original_language = movie['original_language']
+    poster = movie['image_url']
+    runtime = movie['runtime']
+    year_released = movie['year_released']
+    rating = movie['rating']
+    power_users_rating = movie['power_users_rating']
+    ratings_count = movie['ratings_count']
 
     st.markdown(
         f"""
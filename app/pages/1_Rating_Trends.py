@@ -1,9 +1,8 @@
 import pandas as pd
 import streamlit as st
 import altair as alt
-from src.transform.clean_movies import convert_genres_to_list
 
-movies = pd.read_csv("../data/processed/merged_enriched_movies.csv")
+movies = pd.read_parquet("../data/processed/merged_enriched_movies.parquet")
 
 attributes = ['Language', 'Runtime', 'Genre', 'Decade Released']
 options = ["Select an attribute"] + attributes
@@ -157,13 +156,16 @@ if selected_attribute != "Select an attribute":
     elif selected_attribute == 'Genre':
         # Rating vs genres
 
-        # When table is saved as a CSV list converts back to string.
-        # Want to reconvert it so we can work with it.
-        movies = convert_genres_to_list(movies)
+        # The ETL writes one row per movie and genre, so each genre can be
+        # grouped on without reparsing the genres lists
+        movie_genres = pd.read_parquet("../data/processed/movie_genres.parquet")
 
-        # Split up movies with multiple genres, group by each genre,
+        # Join the genres to the movie ratings, group by each genre,
         # then find the average rating
-        average_rating_by_genre = movies.explode('genres').groupby('genres').agg(
+        average_rating_by_genre = movie_genres.merge(
+            movies[['movie_key', 'rating', 'power_users_rating']],
+            on='movie_key'
+        ).rename(columns={'genre': 'genres'}).groupby('genres').agg(
             letterboxd_avg=('rating', 'mean'),
             user_avg=('power_users_rating', 'mean')
         ).reset_index()
@@ -2,7 +2,7 @@ import pandas as pd
 import streamlit as st
 import altair as alt
 
-movies = pd.read_csv("../data/processed/merged_enriched_movies.csv")
+movies = pd.read_parquet("../data/processed/merged_enriched_movies.parquet")
 
 # Find movies with biggest differential in rating vs power_users_rating
 movies["rating_diff"] = movies["rating"] - movies["power_users_rating"]
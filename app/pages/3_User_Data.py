@@ -2,9 +2,11 @@ import pandas as pd
 import streamlit as st 
 import altair as alt
 
-movies = pd.read_csv("../data/processed/merged_enriched_movies.csv")
-user_ratings = pd.read_csv("../data/processed/cleaned_user_ratings.csv")
-aggregated_user_ratings = pd.read_csv("../data/processed/aggregated_user_ratings.csv")
+movies = pd.read_parquet("../data/processed/merged_enriched_movies.parquet")
+user_ratings = pd.read_parquet("../data/processed/cleaned_user_ratings.parquet")
+aggregated_user_ratings = pd.read_parquet("../data/processed/aggregated_user_ratings.parquet")
+# The slug of every movie key, including the rated movies the movies table leaves out
+movie_keys = pd.read_parquet("../data/processed/movie_keys.parquet")
 
 with st.expander("Aggregated User Ratings Data"):
     st.write(aggregated_user_ratings)
@@ -112,12 +114,16 @@ harsh_critics_options = harsh_critics["user_id"]
 # User ratings table filtered for only harsh critics
 user_ratings_filtered = user_ratings[user_ratings["user_id"].isin(harsh_critics_options)]
 # Find the top 20 films as rated by harsh critics
-user_ratings_filtered = user_ratings_filtered.groupby("movie_id").agg(
+user_ratings_filtered = user_ratings_filtered.groupby("movie_key").agg(
     {"rating_val": ["mean", "count"]}
 ).reset_index()
-user_ratings_filtered.columns = ["movie_id", "average_rating", "rating_count"]
+user_ratings_filtered.columns = ["movie_key", "average_rating", "rating_count"]
 user_ratings_filtered["average_rating"] = user_ratings_filtered["average_rating"].round(2)
 user_ratings_filtered = user_ratings_filtered.sort_values(by="average_rating", ascending=False).head(20)
+# Ratings are keyed by the integer movie key, the movie keys table has the ids
+user_ratings_filtered = user_ratings_filtered.merge(
+    movie_keys, on="movie_key", how="left"
+)
 user_ratings_filtered.reset_index(drop=True, inplace=True)
 # Display top 20 films as rated by harsh critics
 
@@ -151,5 +157,8 @@ harsh_critic_chosen = st.selectbox("Select a harsh critic", harsh_critics_option
 
 # Show user_ratings table where user_id is the selected harsh critic
 harsh_critic_ratings = user_ratings[user_ratings["user_id"] == harsh_critic_chosen]
+harsh_critic_ratings = harsh_critic_ratings.merge(
+    movie_keys, on="movie_key", how="left"
+)
 harsh_critic_ratings.sort_values(by="rating_val", ascending=False, inplace=True)
 st.write(harsh_critic_ratings)
\ No newline at end of file
@@ -8,6 +8,10 @@ class DatabaseConfigError(Exception):
     pass
 
 
+# Schema the tables are loaded into when TARGET_DB_SCHEMA is not set
+DEFAULT_TARGET_SCHEMA = "de_2506_a"
+
+
 # Configure the logger
 logger = setup_logger(__name__, "database.log", level=logging.DEBUG)
 
@@ -39,6 +43,7 @@ def load_db_config() -> Dict[str, Dict[str, str]]:
             "password": os.getenv("TARGET_DB_PASSWORD", ""),
             "host": os.getenv("TARGET_DB_HOST", "error"),
             "port": os.getenv("TARGET_DB_PORT", "5432"),
+            "schema": os.getenv("TARGET_DB_SCHEMA", DEFAULT_TARGET_SCHEMA),
         },
     }
 
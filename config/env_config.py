@@ -81,6 +81,7 @@ def cleanup_previous_env():
         "TARGET_DB_PASSWORD",
         "TARGET_DB_HOST",
         "TARGET_DB_PORT",
+        "TARGET_DB_SCHEMA",
     ]
     for key in keys_to_clear:
         if key in os.environ:
@@ -0,0 +1,53 @@
+import os
+from typing import Dict, Optional
+
+# Environment variables holding the extraction thresholds, and the default
+# used when a variable is not set. Thresholds without a default are only
+# checked once they are configured
+EXTRACT_THRESHOLD_VARIABLES = {
+    "max_seconds_per_row": ("EXTRACT_MAX_SECONDS_PER_ROW", "0.0001"),
+    "min_rows_per_second": ("EXTRACT_MIN_ROWS_PER_SECOND", None),
+    "min_mb_per_second": ("EXTRACT_MIN_MB_PER_SECOND", None),
+    "max_rss_delta_mb": ("EXTRACT_MAX_RSS_DELTA_MB", None),
+}
+
+# Environment variable that turns on timing the raw file reads apart from
+# the parse. Each extracted file is then read a second time, so it is meant
+# for benchmarking rather than for scheduled runs
+TIME_FILE_READS_VARIABLE = "EXTRACT_TIME_FILE_READS"
+
+
+class MetricsConfigError(Exception):
+    pass
+
+
+def load_extract_thresholds() -> Dict[str, Optional[float]]:
+    """
+    Load the extraction performance thresholds from environment variables.
+    Set these in the .env file or in the deployment environment to tune
+    the warnings raised for slow or memory hungry extractions.
+    :return: Dictionary of thresholds, None for the ones that are not set.
+    :raises MetricsConfigError: If a threshold is not a number.
+    """
+    thresholds = {}
+    for name, (variable, default) in EXTRACT_THRESHOLD_VARIABLES.items():
+        value = os.getenv(variable, default)
+        if value is None or value == "":
+            thresholds[name] = None
+            continue
+        try:
+            thresholds[name] = float(value)
+        except ValueError:
+            raise MetricsConfigError(
+                f"Configuration error: {variable} is not a number: {value}"
+            )
+    return thresholds
+
+
+def load_time_file_reads() -> bool:
+    """
+    Load whether the raw file reads of an extraction are timed apart from
+    the parse, from the EXTRACT_TIME_FILE_READS environment variable.
+    :return: True when the variable is set to true.
+    """
+    return os.getenv(TIME_FILE_READS_VARIABLE, "false").lower() == "true"
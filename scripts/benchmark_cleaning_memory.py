@@ -0,0 +1,40 @@
+import sys
+import pandas as pd
+from src.extract import extract_movies
+from src.transform.clean_movies import CLEAN_MOVIES_STEPS
+from src.transform.cleaning_steps import run_cleaning_steps
+
+ROWS = 1_000_000
+
+
+def main():
+    """
+    Print the memory used by each step of the movies cleaning, on the
+    movies file repeated to ROWS rows. A row count can be given as the
+    first argument.
+    """
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else ROWS
+    movies = pd.read_csv(
+        extract_movies.FILE_PATH, **extract_movies.READ_OPTIONS
+    )
+    repeats = rows // len(movies) + 1
+    movies = pd.concat([movies] * repeats, ignore_index=True)[:rows]
+    # Without the repeats every movie_id would be a duplicate
+    movies["movie_id"] = movies["movie_id"] + "-" + pd.Series(
+        range(rows), dtype="string[pyarrow]"
+    ).astype(movies["movie_id"].dtype)
+
+    memory_report = []
+    run_cleaning_steps(movies, CLEAN_MOVIES_STEPS, memory_report)
+    print(f"{rows} rows")
+    for record in memory_report:
+        print(
+            f"{record['step']:<34} frame {record['frame_mb']:8.1f} MB, "
+            f"peak {record['peak_mb']:8.1f} MB "
+            f"({record['peak_copies']:.2f} copies), "
+            f"retained {record['retained_mb']:8.1f} MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import os
+import resource
+import sys
+import timeit
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from src.extract import (
+    extract_movies,
+    extract_movies_with_ratings,
+    extract_user_ratings,
+)
+
+SOURCES = {
+    "movies": extract_movies,
+    "movies_with_ratings": extract_movies_with_ratings,
+    "user_ratings": extract_user_ratings,
+}
+
+
+def measure(file_path: str, read_csv_kwargs: dict) -> dict:
+    """
+    Read a CSV file and measure its wall-clock time, the in-memory size of
+    the resulting DataFrame and the growth in peak resident memory.
+    """
+    peak_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start_time = timeit.default_timer()
+    df = pd.read_csv(file_path, **read_csv_kwargs)
+    execution_time = timeit.default_timer() - start_time
+    peak_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "rows": len(df),
+        "seconds": round(execution_time, 3),
+        "frame_mb": round(
+            float(df.memory_usage(deep=True).sum()) / 1e6, 1
+        ),
+        # ru_maxrss is reported in kilobytes on Linux
+        "peak_rss_mb": round((peak_after - peak_before) / 1e3, 1),
+    }
+
+
+def measure_in_fresh_process(file_path: str, read_csv_kwargs: dict) -> dict:
+    # A new process per measurement so that memory held by one parser's
+    # allocator does not hide the footprint of the next
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        return executor.submit(measure, file_path, read_csv_kwargs).result()
+
+
+def benchmark_source(file_path: str, schema: dict) -> dict:
+    # Type inference with the default C parser, as the extractors did
+    # before the schemas were declared
+    before = measure_in_fresh_process(file_path, {})
+    after = measure_in_fresh_process(
+        file_path,
+        {"engine": "pyarrow", "dtype_backend": "pyarrow", "dtype": schema},
+    )
+    return {"before": before, "after": after}
+
+
+def main():
+    """
+    Compare untyped and typed parsing for every raw file that exists.
+    A raw data directory can be given as the first argument.
+    """
+    raw_dir = sys.argv[1] if len(sys.argv) > 1 else None
+    for name, module in SOURCES.items():
+        file_path = module.FILE_PATH
+        if raw_dir:
+            file_path = os.path.join(raw_dir, os.path.basename(file_path))
+        if not os.path.exists(file_path):
+            print(f"{name}: skipped, {file_path} not found")
+            continue
+        result = benchmark_source(file_path, module.SCHEMA)
+        print(f"{name}: before {result['before']}")
+        print(f"{name}: after  {result['after']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import ast
+import sys
+import timeit
+import pandas as pd
+from src.extract import extract_movies
+from src.utils.list_utils import parse_string_lists
+
+ROWS = 1_000_000
+
+LIST_COLUMNS = ["genres", "spoken_languages"]
+
+
+def literal_eval_lists(series: pd.Series, drop_empty: bool) -> pd.Series:
+    # The row by row parse the cleaning steps used before
+    lists = series.apply(
+        lambda x: ast.literal_eval(x) if isinstance(x, str) and x else []
+    )
+    if drop_empty:
+        lists = lists.apply(lambda x: [item for item in x if item != ""])
+    return lists
+
+
+def repeat_to(series: pd.Series, rows: int) -> pd.Series:
+    repeats = rows // len(series) + 1
+    return pd.concat([series] * repeats, ignore_index=True)[:rows]
+
+
+def main():
+    """
+    Compare the row by row and the vectorised list parsing on the list
+    columns of the movies file, repeated to ROWS rows. A row count can be
+    given as the first argument.
+    """
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else ROWS
+    movies = pd.read_csv(extract_movies.FILE_PATH, usecols=LIST_COLUMNS)
+    for column in LIST_COLUMNS:
+        drop_empty = column == "spoken_languages"
+        literals = repeat_to(movies[column], rows)
+        arrow_literals = literals.astype("string[pyarrow]")
+
+        before = timeit.timeit(
+            lambda: literal_eval_lists(literals, drop_empty), number=1
+        )
+        after = min(
+            timeit.repeat(
+                lambda: parse_string_lists(arrow_literals, drop_empty),
+                number=1,
+                repeat=3,
+            )
+        )
+        same = (
+            literal_eval_lists(literals, drop_empty).tolist()
+            == parse_string_lists(arrow_literals, drop_empty).tolist()
+        )
+        print(
+            f"{column}: {rows} rows, literal_eval {before:.2f}s, "
+            f"vectorised {after:.2f}s ({before / after:.0f}x), "
+            f"same result: {same}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import os
+import sys
+import tempfile
+import timeit
+import pandas as pd
+from src.utils.file_utils import (
+    ROOT_DIR,
+    read_dataframe_from_parquet,
+    write_dataframe_to_csv,
+    write_dataframe_to_parquet,
+)
+
+PROCESSED_DIR = os.path.join(ROOT_DIR, "data", "processed")
+
+# The processed tables the app reads
+APP_TABLES = [
+    "merged_enriched_movies",
+    "cleaned_user_ratings",
+    "aggregated_user_ratings",
+    "movie_genres",
+    "movie_keys",
+]
+
+
+def time_best(function, repeat: int = 3) -> float:
+    return min(timeit.repeat(function, number=1, repeat=repeat))
+
+
+def main():
+    """
+    Compare the CSV and Parquet files of the processed tables the app
+    reads: their size, the time to write them and the time the app takes
+    to load them. The tables are read from the Parquet files of the last
+    run, or of the directory given as the first argument.
+    """
+    processed_dir = sys.argv[1] if len(sys.argv) > 1 else PROCESSED_DIR
+    totals = {"csv": [0, 0.0, 0.0], "parquet": [0, 0.0, 0.0]}
+    with tempfile.TemporaryDirectory() as directory:
+        for table_name in APP_TABLES:
+            df = read_dataframe_from_parquet(
+                os.path.join(processed_dir, f"{table_name}.parquet")
+            )
+            for file_format, write, load in [
+                ("csv", write_dataframe_to_csv, pd.read_csv),
+                ("parquet", write_dataframe_to_parquet, pd.read_parquet),
+            ]:
+                path = os.path.join(directory, f"{table_name}.{file_format}")
+                write_time = time_best(lambda: write(df, path))
+                load_time = time_best(lambda: load(path))
+                size = os.path.getsize(path)
+                for position, value in enumerate(
+                    [size, write_time, load_time]
+                ):
+                    totals[file_format][position] += value
+                print(
+                    f"{table_name:<24} {file_format:<8} "
+                    f"{size / 1e6:8.2f} MB, write {write_time:6.3f}s, "
+                    f"load {load_time:6.3f}s"
+                )
+    for file_format, (size, write_time, load_time) in totals.items():
+        print(
+            f"{'total':<24} {file_format:<8} {size / 1e6:8.2f} MB, "
+            f"write {write_time:6.3f}s, load {load_time:6.3f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
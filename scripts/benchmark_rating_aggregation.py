@@ -0,0 +1,73 @@
+import sys
+import timeit
+import numpy as np
+import pandas as pd
+from src.transform.rating_statistics import compute_rating_statistics
+
+ROWS = 10_000_000
+MOVIES = 50_000
+USERS = 200_000
+
+
+def groupby_aggregates(cleaned_user_ratings: pd.DataFrame) -> tuple:
+    # The separate mean and count group-bys and merges used before
+    ratings = cleaned_user_ratings.groupby("movie_key")["rating_val"]
+    movies = ratings.mean().reset_index(name="power_users_rating").merge(
+        ratings.count().reset_index(name="ratings_count"), on="movie_key"
+    )
+    ratings = cleaned_user_ratings.groupby("user_id")["rating_val"]
+    users = ratings.mean().reset_index(name="user_average_rating").merge(
+        ratings.size().reset_index(name="rating_count"), on="user_id"
+    )
+    return movies, users
+
+
+def make_ratings(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(
+        {
+            "movie_key": rng.integers(1, MOVIES, rows, dtype=np.int32),
+            "user_id": rng.integers(1, USERS, rows),
+            "rating_val": rng.integers(1, 11, rows).astype(np.float64),
+        }
+    )
+
+
+def main():
+    """
+    Compare the per movie and per user aggregation of the cleaned user
+    ratings by group-bys with the single pass kernel, on ROWS random
+    ratings. A row count can be given as the first argument.
+    """
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else ROWS
+    cleaned_user_ratings = make_ratings(rows)
+    before = min(
+        timeit.repeat(
+            lambda: groupby_aggregates(cleaned_user_ratings),
+            number=1,
+            repeat=3,
+        )
+    )
+    after = min(
+        timeit.repeat(
+            lambda: compute_rating_statistics(cleaned_user_ratings),
+            number=1,
+            repeat=3,
+        )
+    )
+    movies, users = groupby_aggregates(cleaned_user_ratings)
+    movie_statistics, user_statistics = compute_rating_statistics(
+        cleaned_user_ratings
+    )
+    same = np.allclose(
+        movies["power_users_rating"], movie_statistics["mean"]
+    ) and np.allclose(users["user_average_rating"], user_statistics["mean"])
+    print(
+        f"{rows} rows, group-bys {before:.2f}s, "
+        f"single pass {after:.2f}s ({before / after:.1f}x), "
+        f"same result: {same}"
+    )
+
+
+if __name__ == "__main__":
+    main()
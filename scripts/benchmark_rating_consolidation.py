@@ -0,0 +1,82 @@
+import resource
+import sys
+import time
+import numpy as np
+import pandas as pd
+from src.transform.clean_user_ratings import (
+    consolidate_ratings_for_same_movie,
+    deduplicate_and_consolidate_ratings,
+)
+
+ROWS = 50_000_000
+MOVIES = 50_000
+USERS = 200_000
+
+# Share of the ratings that are repeated, exactly or with another rating
+DUPLICATE_SHARE = 0.1
+
+
+def make_ratings(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    unique_rows = int(rows * (1 - DUPLICATE_SHARE))
+    movie_keys = rng.integers(1, MOVIES, unique_rows, dtype=np.int32)
+    user_ids = rng.integers(1, USERS, unique_rows)
+    repeated = rng.integers(0, unique_rows, rows - unique_rows)
+    return pd.DataFrame(
+        {
+            "movie_key": np.concatenate((movie_keys, movie_keys[repeated])),
+            "rating_val": pd.array(
+                rng.integers(1, 11, rows).astype(np.float64), dtype="Float64"
+            ),
+            "user_id": np.concatenate((user_ids, user_ids[repeated])),
+        }
+    )
+
+
+def groupby_consolidation(user_ratings: pd.DataFrame) -> pd.DataFrame:
+    # The separate steps used before
+    return consolidate_ratings_for_same_movie(user_ratings.drop_duplicates())
+
+
+METHODS = {
+    "groupby": groupby_consolidation,
+    "fused": deduplicate_and_consolidate_ratings,
+}
+
+
+def main():
+    """
+    Time drop_duplicates followed by the groupby consolidation, and the
+    fused consolidation, on ROWS random ratings with a tenth of them
+    repeated, and check that both give the same result.
+
+    A row count can be given as the first argument. Naming a method as the
+    second argument times only that method, with its peak memory, for row
+    counts at which both do not fit in memory together.
+    """
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else ROWS
+    methods = sys.argv[2:] or list(METHODS)
+    user_ratings = make_ratings(rows)
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    results = {}
+    for method in methods:
+        start_time = time.perf_counter()
+        results[method] = METHODS[method](user_ratings)
+        seconds = time.perf_counter() - start_time
+        print(
+            f"{method}: {rows} rows in {seconds:.2f}s, "
+            f"{rows / seconds / 1e6:.1f}M rows/s"
+        )
+    if len(methods) == 1:
+        # The peak is only that of the method when it ran alone
+        peak_mb = (
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline_kb
+        ) / 1e3
+        print(f"peak memory growth {peak_mb:.0f} MB")
+    if len(results) == 2:
+        print(f"same result: {results['groupby'].equals(results['fused'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+import sys
+import pandas as pd
+from src.extract import extract_movies
+from src.transform.movie_aliases import (
+    MOVIE_ALIASES_PATH,
+    find_duplicate_movies,
+)
+
+
+def main():
+    """
+    List the movies of the raw movies file, or of the CSV file given as the
+    first argument, that look like duplicates not yet in the alias table.
+    Reviewed rows can be copied into the alias table as they are.
+    """
+    file_path = sys.argv[1] if len(sys.argv) > 1 else extract_movies.FILE_PATH
+    movies = pd.read_csv(
+        file_path, usecols=["movie_id", "movie_title", "year_released"]
+    )
+    duplicates = find_duplicate_movies(movies)
+    if duplicates.empty:
+        print(f"No new duplicates, the alias table is {MOVIE_ALIASES_PATH}")
+        return
+    print(f"Add the confirmed duplicates to {MOVIE_ALIASES_PATH}:")
+    print(duplicates.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
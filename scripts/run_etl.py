@@ -1,10 +1,23 @@
 import os
 import sys
+from config.db_config import load_db_config
 from config.env_config import setup_env
-from src.extract.extract import extract_data
+from src.extract.extract import (
+    commit_extract_watermark,
+    extract_data,
+    get_input_paths,
+)
 from src.transform.transform import transform_data
-from src.load.load import load_data_to_db
+from src.load.load import LOAD_DEPENDENCIES, load_data_to_db
 from src.utils.logging_utils import setup_logger
+from src.utils.run_manifest_utils import (
+    build_run_manifest,
+    get_run_target,
+    load_run_manifest,
+    plan_outputs,
+    save_run_manifest,
+)
+from src.utils.snapshot_utils import background_snapshots
 
 # Use LOG_BASE_PATH if set (for testing), otherwise use default
 log_base_path = os.getenv("LOG_BASE_PATH")
@@ -21,17 +34,87 @@ def main():
 
         logger.info(f"Starting ETL pipeline in {env} environment")
 
+        # Compare the inputs and the pipeline code with the last successful
+        # run into the same environment and database. Set FORCE_FULL_RUN to
+        # rebuild everything regardless
+        target = get_run_target(env, load_db_config()["target_database"])
+        previous_manifest = load_run_manifest(target=target)
+        manifest = build_run_manifest(
+            get_input_paths(), previous_manifest, target
+        )
+        if os.getenv("FORCE_FULL_RUN"):
+            tables = set(LOAD_DEPENDENCIES)
+        else:
+            tables = plan_outputs(
+                previous_manifest, manifest, LOAD_DEPENDENCIES
+            )
+        if not tables:
+            logger.info(
+                "No input or code changes since the last successful run, "
+                "skipping the ETL pipeline"
+            )
+            return None
+        logger.info(f"Tables to rebuild: {sorted(tables)}")
+
         logger.info("Beginning data extraction phase")
-        extracted_data = extract_data()
+        # Set INCREMENTAL_EXTRACT to true to only parse the user ratings
+        # appended since the last successful run, and FULL_REFRESH to true
+        # to parse them all again
+        incremental = (
+            os.getenv("INCREMENTAL_EXTRACT", "false").lower() == "true"
+        )
+        extracted_data = extract_data(
+            concurrent=True,
+            use_cache=True,
+            incremental=incremental,
+            full_refresh=os.getenv("FULL_REFRESH", "false").lower() == "true",
+            accumulate=incremental,
+        )
         logger.info("Data extraction phase completed")
 
-        logger.info("Beginning the data transformation phase")
-        transformed_data = transform_data(extracted_data)
-        logger.info("Data transformation phase completed")
+        # The processed tables the app reads are always saved as Parquet,
+        # in the background while the pipeline carries on. The debug
+        # snapshots of the intermediate tables are off by default in
+        # production. Set SAVE_SNAPSHOTS to true or false to override, and
+        # EXPORT_CSV to true to also save every table as CSV
+        save_snapshots = os.getenv(
+            "SAVE_SNAPSHOTS", "false" if env == "prod" else "true"
+        ).lower() == "true"
+        export_csv = os.getenv("EXPORT_CSV", "false").lower() == "true"
+        with background_snapshots(
+            enabled=save_snapshots, export_csv=export_csv
+        ):
+            logger.info("Beginning the data transformation phase")
+            # Set TRANSFORM_WORKERS to transform the user ratings in shards
+            # on that many processes. Steps whose inputs and code are
+            # unchanged reuse their cached outputs. Set
+            # INCREMENTAL_STATISTICS to true to update the rating statistics
+            # from the ratings that changed, which diffs every rating and so
+            # is slower than recomputing them, and VERIFY_STATISTICS to true
+            # to check the updates against a full recompute
+            transformed_data = transform_data(
+                extracted_data,
+                workers=int(os.getenv("TRANSFORM_WORKERS", "1")),
+                use_cache=True,
+                incremental_statistics=(
+                    os.getenv("INCREMENTAL_STATISTICS", "false").lower()
+                    == "true"
+                ),
+                verify_statistics=(
+                    os.getenv("VERIFY_STATISTICS", "false").lower() == "true"
+                ),
+            )
+            logger.info("Data transformation phase completed")
+
+            logger.info("Beginning data load phase")
+            loaded_data = load_data_to_db(transformed_data, tables)
+            logger.info("Data load phase completed")
 
-        logger.info("Beginning data load phase")
-        loaded_data = load_data_to_db(transformed_data)
-        logger.info("Data load phase completed")
+        # Only recorded once the load has succeeded, so a failed run is
+        # retried in full next time
+        if incremental:
+            commit_extract_watermark()
+        save_run_manifest(manifest, target=target)
 
         logger.info(
                 f"ETL pipeline completed successfully in {env} environment"
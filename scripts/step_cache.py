@@ -0,0 +1,71 @@
+import sys
+import time
+from src.utils.step_cache_utils import (
+    STEP_CACHE_DIR,
+    clear_step_cache,
+    evict_least_recently_used,
+    get_step_cache_bytes,
+    index_lock,
+    load_step_cache_index,
+    save_step_cache_index,
+)
+
+USAGE = (
+    "Usage: python -m scripts.step_cache list | clear [step] | "
+    "evict <max_mb>"
+)
+
+
+def list_entries() -> None:
+    # One line per entry, the most recently used first
+    index = load_step_cache_index()
+    if not index:
+        print(f"The step cache in {STEP_CACHE_DIR} is empty")
+        return
+    for key, entry in sorted(
+        index.items(), key=lambda item: item[1]["last_used"], reverse=True
+    ):
+        last_used = time.strftime(
+            "%Y-%m-%d %H:%M:%S", time.localtime(entry["last_used"])
+        )
+        print(
+            f"{key[:12]}  {entry['step']:<44} "
+            f"{entry['bytes'] / 1e6:8.1f} MB  last used {last_used}"
+        )
+    print(
+        f"{len(index)} entries, "
+        f"{get_step_cache_bytes(index) / 1e6:.1f} MB in {STEP_CACHE_DIR}"
+    )
+
+
+def evict(max_mb: float) -> None:
+    # Evict the least recently used entries down to max_mb
+    with index_lock:
+        index = load_step_cache_index()
+        evicted = evict_least_recently_used(index, int(max_mb * 1e6))
+        save_step_cache_index(index)
+    print(f"Evicted {len(evicted)} entries")
+
+
+def main():
+    """
+    Inspect or clear the cache of transform step outputs. `list` shows the
+    cached entries, `clear` removes them all or only those of the step
+    given, and `evict` removes the least recently used entries until the
+    cache fits in the size given in MB.
+    """
+    command = sys.argv[1] if len(sys.argv) > 1 else "list"
+    if command == "list":
+        list_entries()
+    elif command == "clear":
+        step = sys.argv[2] if len(sys.argv) > 2 else None
+        print(f"Cleared {clear_step_cache(step)} entries")
+    elif command == "evict" and len(sys.argv) > 2:
+        evict(float(sys.argv[2]))
+    else:
+        print(USAGE)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
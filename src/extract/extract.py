@@ -1,25 +1,143 @@
+import timeit
 import pandas as pd
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from functools import partial
+from typing import Callable, Iterator, Optional, Union
+from src.extract.extract_from_db import (
+    USER_RATINGS_WATERMARK_NAME,
+    extract_movies_from_db,
+    extract_movies_with_ratings_from_db,
+    extract_user_ratings_from_db,
+)
+from src.extract import (
+    extract_movies as movies_source,
+    extract_movies_with_ratings as movies_with_ratings_source,
+    extract_user_ratings as user_ratings_source,
+)
 from src.extract.extract_movies import extract_movies
 from src.extract.extract_movies_with_ratings import extract_movies_with_ratings
-from src.extract.extract_user_ratings import extract_user_ratings
+from src.extract.extract_user_ratings import (
+    extract_user_ratings,
+    extract_user_ratings_in_chunks,
+)
+from src.transform.column_manifest import COLUMN_MANIFEST
+from src.transform.movie_aliases import MOVIE_ALIASES_PATH
 from src.utils.logging_utils import setup_logger
+from src.utils.metrics_utils import get_metrics_path, start_metrics_run
+from src.utils.watermark_utils import commit_watermark
 
 logger = setup_logger("extract_data", "extract_data.log")
 
+# The watermark incremental extraction stages for each source
+WATERMARK_NAMES = {
+    "csv": user_ratings_source.WATERMARK_NAME,
+    "db": USER_RATINGS_WATERMARK_NAME,
+}
 
-def extract_data() -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+
+def extract_data(
+    user_ratings_chunk_size: Optional[int] = None,
+    user_ratings_chunk_bytes: Optional[int] = None,
+    concurrent: bool = False,
+    max_workers: Optional[int] = None,
+    use_cache: bool = False,
+    source: str = "csv",
+    incremental: bool = False,
+    full_refresh: bool = False,
+    column_manifest: Optional[dict[str, list[str]]] = COLUMN_MANIFEST,
+    file_paths: Optional[dict[str, str]] = None,
+    accumulate: bool = False,
+) -> tuple[
+    pd.DataFrame, pd.DataFrame, Union[pd.DataFrame, Iterator[pd.DataFrame]]
+]:
+    """
+    Extract the movies, movies with ratings and user ratings data.
+
+    When a chunk size (rows) or chunk bytes is given, the user ratings are
+    returned as an iterator of DataFrames instead of a single DataFrame so
+    that they can be consumed in constant memory.
+
+    When concurrent is set, the three sources are read at the same time on
+    a thread pool (the pyarrow parser releases the GIL while it works).
+    The wall-clock time is logged next to the summed per-source times.
+
+    When use_cache is set, whole-file reads go through the Parquet
+    ingestion cache and only re-parse a CSV file when it has changed.
+
+    When source is "db", the three tables are read from the configured
+    source database instead of the CSV files.
+
+    When incremental is set, only the user ratings added since the last
+    committed watermark are returned (full_refresh ignores the watermark).
+    With accumulate as well, they are returned after the user ratings of
+    the earlier runs, kept with the watermark, so that only the new rows
+    are parsed. The staged watermark is committed by
+    commit_extract_watermark once the run has succeeded. Incremental
+    extraction of the CSV file cannot be chunked.
+
+    Only the columns listed for each source in column_manifest are parsed
+    (by default the columns the transform stage reads). Passing None
+    extracts every column.
+
+    file_paths overrides the CSV file read for a source, by name. A path
+    may be a glob of (optionally compressed) part files, which are read in
+    parallel and combined in path order.
+    """
     try:
         logger.info("Starting data extraction process")
+        # Each run records the metrics of its sources in a file of its own
+        run_id = start_metrics_run()
+
+        if source == "db":
+            extractors = get_db_extractors(
+                user_ratings_chunk_size, incremental, full_refresh, accumulate
+            )
+        elif source == "csv":
+            extractors = get_csv_extractors(
+                user_ratings_chunk_size,
+                user_ratings_chunk_bytes,
+                use_cache,
+                incremental,
+                full_refresh,
+                accumulate,
+            )
+        else:
+            raise ValueError(f"Unknown extraction source: {source}")
+        if column_manifest:
+            extractors = bind_per_source(
+                extractors, "columns", column_manifest
+            )
+        if file_paths:
+            if source != "csv":
+                raise ValueError("file_paths only applies to the csv source")
+            extractors = bind_per_source(extractors, "file_path", file_paths)
 
-        movies = extract_movies()
-        movies_with_ratings = extract_movies_with_ratings()
-        user_ratings = extract_user_ratings()
+        start_time = timeit.default_timer()
+        if concurrent:
+            results = run_extractors_concurrently(extractors, max_workers)
+        else:
+            results = {
+                name: timed(extractor)
+                for name, extractor in extractors.items()
+            }
+        wall_clock_time = timeit.default_timer() - start_time
 
+        movies = results["movies"][0]
+        movies_with_ratings = results["movies_with_ratings"][0]
+        user_ratings = results["user_ratings"][0]
+
+        log_extract_timings(
+            {name: result[1] for name, result in results.items()},
+            wall_clock_time,
+        )
         logger.info(
             f"Data extraction completed successfully - "
             f"Movies: {movies.shape}, Movies with Ratings: "
             f"{movies_with_ratings.shape}, "
-            f"User Ratings: {user_ratings.shape}"
+            f"User Ratings: {describe_extracted(user_ratings)}"
+        )
+        logger.info(
+            f"Extraction metrics written to {get_metrics_path(run_id)}"
         )
 
         return (movies, movies_with_ratings, user_ratings)
@@ -27,3 +145,151 @@ def extract_data() -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
     except Exception as e:
         logger.error(f"Data extraction failed: {str(e)}")
         raise
+
+
+def get_csv_extractors(
+    user_ratings_chunk_size: Optional[int],
+    user_ratings_chunk_bytes: Optional[int],
+    use_cache: bool,
+    incremental: bool = False,
+    full_refresh: bool = False,
+    accumulate: bool = False,
+) -> dict[str, Callable]:
+    chunked = bool(user_ratings_chunk_size or user_ratings_chunk_bytes)
+    if chunked and incremental:
+        raise ValueError(
+            "Incremental extraction of the user ratings CSV file cannot be "
+            "chunked"
+        )
+    if chunked:
+        user_ratings_extractor = partial(
+            extract_user_ratings_in_chunks,
+            chunk_size=user_ratings_chunk_size,
+            chunk_bytes=user_ratings_chunk_bytes,
+        )
+    elif incremental:
+        user_ratings_extractor = partial(
+            extract_user_ratings,
+            incremental=True,
+            full_refresh=full_refresh,
+            accumulate=accumulate,
+        )
+    else:
+        user_ratings_extractor = partial(
+            extract_user_ratings, use_cache=use_cache
+        )
+    return {
+        "movies": partial(extract_movies, use_cache=use_cache),
+        "movies_with_ratings": partial(
+            extract_movies_with_ratings, use_cache=use_cache
+        ),
+        "user_ratings": user_ratings_extractor,
+    }
+
+
+def get_db_extractors(
+    user_ratings_chunk_size: Optional[int],
+    incremental: bool = False,
+    full_refresh: bool = False,
+    accumulate: bool = False,
+) -> dict[str, Callable]:
+    return {
+        "movies": extract_movies_from_db,
+        "movies_with_ratings": extract_movies_with_ratings_from_db,
+        "user_ratings": partial(
+            extract_user_ratings_from_db,
+            chunk_size=user_ratings_chunk_size,
+            incremental=incremental,
+            full_refresh=full_refresh,
+            accumulate=accumulate,
+        ),
+    }
+
+
+def commit_extract_watermark(source: str = "csv") -> bool:
+    # Commit the watermark of an incremental extraction, once the rows it
+    # covers have been loaded
+    return commit_watermark(WATERMARK_NAMES[source])
+
+
+def bind_per_source(
+    extractors: dict[str, Callable], argument: str, values: dict
+) -> dict[str, Callable]:
+    # Pass each source's value of an argument on to its extractor
+    return {
+        name: partial(extractor, **{argument: values[name]})
+        if name in values
+        else extractor
+        for name, extractor in extractors.items()
+    }
+
+
+def get_input_paths(
+    file_paths: Optional[dict[str, str]] = None
+) -> dict[str, str]:
+    # The CSV file, or glob of part files, read for each source, and the
+    # alias table the movies and user ratings are consolidated with
+    return {
+        "movies": movies_source.FILE_PATH,
+        "movies_with_ratings": movies_with_ratings_source.FILE_PATH,
+        "user_ratings": user_ratings_source.FILE_PATH,
+        "movie_aliases": MOVIE_ALIASES_PATH,
+        **(file_paths or {}),
+    }
+
+
+def timed(extractor: Callable) -> tuple:
+    # Run an extractor and return its result with its execution time
+    start_time = timeit.default_timer()
+    result = extractor()
+    return result, timeit.default_timer() - start_time
+
+
+def run_extractors_concurrently(
+    extractors: dict[str, Callable], max_workers: Optional[int] = None
+) -> dict[str, tuple]:
+    """
+    Run each extractor on a thread pool and collect the timed results.
+
+    If any extractor fails, extractors that have not started yet are
+    cancelled and the error is raised straight away, without waiting for
+    reads that are already in flight (their results are discarded).
+    """
+    executor = ThreadPoolExecutor(
+        max_workers=max_workers or len(extractors),
+        thread_name_prefix="extract",
+    )
+    futures = {
+        name: executor.submit(timed, extractor)
+        for name, extractor in extractors.items()
+    }
+    done, _ = wait(futures.values(), return_when=FIRST_EXCEPTION)
+    failed = [future for future in done if future.exception() is not None]
+    if failed:
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise failed[0].exception()
+    executor.shutdown()
+    return {name: future.result() for name, future in futures.items()}
+
+
+def log_extract_timings(
+    execution_times: dict[str, float], wall_clock_time: float
+) -> None:
+    for name, execution_time in execution_times.items():
+        logger.info(f"Extracted {name} in {execution_time:.3f} seconds")
+    summed_time = sum(execution_times.values())
+    speedup = summed_time / wall_clock_time if wall_clock_time else 1.0
+    logger.info(
+        f"Extraction wall-clock time: {wall_clock_time:.3f} seconds, "
+        f"summed per-source time: {summed_time:.3f} seconds "
+        f"(speedup {speedup:.2f}x)"
+    )
+
+
+def describe_extracted(
+    data: Union[pd.DataFrame, Iterator[pd.DataFrame]]
+) -> str:
+    # Streamed data has no shape until it has been consumed
+    if isinstance(data, pd.DataFrame):
+        return str(data.shape)
+    return "streamed in chunks"
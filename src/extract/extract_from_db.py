@@ -0,0 +1,301 @@
+import logging
+import time
+import timeit
+import pandas as pd
+from sqlalchemy import bindparam, column, select, table, text
+from typing import Any, Iterator, Optional, Union
+from config.db_config import load_db_config
+from src.extract import (
+    extract_movies,
+    extract_movies_with_ratings,
+    extract_user_ratings,
+)
+from src.utils.db_utils import get_db_connection
+from src.utils.logging_utils import setup_logger, log_extract_success
+from src.utils.metrics_utils import start_extract_measurement
+from src.utils.watermark_utils import (
+    append_to_kept_rows,
+    load_watermark,
+    stage_watermark,
+)
+
+# Configure the logger
+logger = setup_logger(__name__, "extract_data.log", level=logging.DEBUG)
+
+# Source tables, with the declared schema of the matching CSV extractor so
+# that both sources produce the same column types
+MOVIES_TABLE = "unclean_movies"
+MOVIES_WITH_RATINGS_TABLE = "unclean_movies_with_ratings"
+USER_RATINGS_TABLE = "unclean_user_ratings"
+
+TABLE_SCHEMAS = {
+    MOVIES_TABLE: extract_movies.SCHEMA,
+    MOVIES_WITH_RATINGS_TABLE: extract_movies_with_ratings.SCHEMA,
+    USER_RATINGS_TABLE: extract_user_ratings.SCHEMA,
+}
+
+# Number of rows fetched from the server-side cursor at a time
+FETCH_SIZE = 50_000
+
+# Monotonic key of the user ratings table, used as the incremental
+# extraction watermark
+USER_RATINGS_KEY_COLUMN = "_id"
+USER_RATINGS_WATERMARK_NAME = "user_ratings_db"
+
+
+def extract_table_from_db(
+    table_name: str,
+    chunk_size: Optional[int] = None,
+    db_schema: Optional[str] = None,
+    after_key: Optional[tuple[str, Any]] = None,
+    columns: Optional[list[str]] = None,
+) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
+    """
+    Extract a table from the configured source database.
+
+    Rows are read through a server-side cursor in batches of FETCH_SIZE
+    (or chunk_size), so the database driver never buffers the whole table.
+
+    Args:
+        table_name (str): The name of the source table.
+        chunk_size (int, optional): When given, return an iterator of
+        DataFrames with at most this many rows instead of one DataFrame.
+        db_schema (str, optional): The database schema holding the table.
+        after_key (tuple, optional): A key column and value. Only rows with
+        a greater key are read, in key order.
+        columns (list[str], optional): The columns to select. All columns
+        are selected by default.
+
+    Returns:
+        pd.DataFrame or Iterator[pd.DataFrame]: The table contents.
+    """
+    chunks = extract_table_in_chunks(
+        table_name,
+        chunk_size or FETCH_SIZE,
+        db_schema,
+        after_key,
+        columns,
+        yield_empty=not chunk_size,
+    )
+    if chunk_size:
+        return chunks
+    chunk_list = list(chunks)
+    # Categories can differ between chunks, so the schema is applied again
+    # to the combined table
+    return apply_table_schema(
+        pd.concat(chunk_list, ignore_index=True), table_name
+    )
+
+
+def extract_table_in_chunks(
+    table_name: str,
+    chunk_size: int,
+    db_schema: Optional[str] = None,
+    after_key: Optional[tuple[str, Any]] = None,
+    columns: Optional[list[str]] = None,
+    yield_empty: bool = False,
+) -> Iterator[pd.DataFrame]:
+    # With yield_empty, a query without rows yields one empty chunk that
+    # still has the result's columns and the declared dtypes
+    source_type = f"{table_name} from DB"
+    execution_time = 0.0
+    total_rows = 0
+    column_count = 0
+    # Time spent waiting on the database, as opposed to building the
+    # DataFrames
+    measurement = start_extract_measurement()
+    measurement["io_seconds"] = 0.0
+
+    try:
+        start_time = timeit.default_timer()
+        connection = get_db_connection(load_db_config()["source_database"])
+        try:
+            selected = (
+                [column(name) for name in columns] if columns else [text("*")]
+            )
+            query = select(*selected).select_from(
+                table(table_name, schema=db_schema)
+            )
+            if after_key is not None:
+                key_column, key_value = after_key
+                query = query.order_by(column(key_column))
+                if key_value is not None:
+                    query = query.where(
+                        column(key_column) > bindparam("after", key_value)
+                    )
+            io_start_time = time.perf_counter()
+            result = connection.execution_options(
+                stream_results=True, max_row_buffer=chunk_size
+            ).execute(query)
+            result_columns = list(result.keys())
+            while True:
+                rows = result.fetchmany(chunk_size)
+                measurement["io_seconds"] += (
+                    time.perf_counter() - io_start_time
+                )
+                if not rows:
+                    execution_time += timeit.default_timer() - start_time
+                    if yield_empty and not total_rows:
+                        yield apply_table_schema(
+                            pd.DataFrame(columns=result_columns), table_name
+                        )
+                    break
+                chunk = apply_table_schema(
+                    pd.DataFrame.from_records(rows, columns=result_columns),
+                    table_name,
+                )
+                execution_time += timeit.default_timer() - start_time
+                total_rows += chunk.shape[0]
+                column_count = chunk.shape[1]
+                yield chunk
+                start_time = timeit.default_timer()
+                io_start_time = time.perf_counter()
+        finally:
+            connection.close()
+            # The engine was created for this read only
+            connection.engine.dispose()
+    except Exception as e:
+        logger.error(f"Error loading table {table_name}: {e}")
+        raise Exception(f"Failed to load table from database: {table_name}")
+
+    if total_rows:
+        log_extract_success(
+            logger,
+            source_type,
+            (total_rows, column_count),
+            execution_time,
+            measurement,
+        )
+
+
+def apply_table_schema(df: pd.DataFrame, table_name: str) -> pd.DataFrame:
+    # Cast the columns declared for the matching CSV source
+    schema = TABLE_SCHEMAS.get(table_name, {})
+    return df.astype(
+        {column: dtype for column, dtype in schema.items() if column in df}
+    )
+
+
+def extract_movies_from_db(
+    chunk_size: Optional[int] = None,
+    columns: Optional[list[str]] = None,
+) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
+    return extract_table_from_db(MOVIES_TABLE, chunk_size, columns=columns)
+
+
+def extract_movies_with_ratings_from_db(
+    chunk_size: Optional[int] = None,
+    columns: Optional[list[str]] = None,
+) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
+    return extract_table_from_db(
+        MOVIES_WITH_RATINGS_TABLE, chunk_size, columns=columns
+    )
+
+
+def extract_user_ratings_from_db(
+    chunk_size: Optional[int] = None,
+    incremental: bool = False,
+    full_refresh: bool = False,
+    columns: Optional[list[str]] = None,
+    accumulate: bool = False,
+) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
+    """
+    Extract the user ratings table from the source database.
+
+    In incremental mode only rows with a key above the last committed
+    watermark are read, and the highest key seen is staged as the new
+    watermark. full_refresh ignores the committed watermark. With
+    accumulate, the new rows are returned after the rows read up to the
+    committed watermark, which are kept with it.
+
+    Raises:
+        ValueError: If accumulate is combined with a chunk size.
+    """
+    if accumulate and chunk_size:
+        logger.error("Accumulated user ratings cannot be read in chunks")
+        raise ValueError("Accumulated user ratings cannot be read in chunks")
+    if not incremental:
+        return extract_table_from_db(
+            USER_RATINGS_TABLE, chunk_size, columns=columns
+        )
+
+    watermark = None
+    if not full_refresh:
+        watermark = load_watermark(USER_RATINGS_WATERMARK_NAME)
+    max_key = watermark["max_key"] if watermark else None
+    row_count = watermark["row_count"] if watermark else 0
+    # The key column is always selected so that the watermark can be
+    # tracked, and is dropped again afterwards if it was not requested
+    drop_key = bool(columns) and USER_RATINGS_KEY_COLUMN not in columns
+    user_ratings = extract_table_from_db(
+        USER_RATINGS_TABLE,
+        chunk_size,
+        after_key=(USER_RATINGS_KEY_COLUMN, max_key),
+        columns=[*columns, USER_RATINGS_KEY_COLUMN] if drop_key else columns,
+    )
+    if chunk_size:
+        return track_max_key(user_ratings, max_key, row_count, drop_key)
+
+    max_key = latest_key(user_ratings, max_key)
+    row_count += len(user_ratings)
+    if drop_key:
+        user_ratings = drop_key_column(user_ratings)
+    if not accumulate:
+        stage_key_watermark(max_key, row_count)
+        return user_ratings
+
+    all_user_ratings = append_to_kept_rows(
+        USER_RATINGS_WATERMARK_NAME, user_ratings, row_count
+    )
+    if all_user_ratings is None:
+        logger.warning(
+            "The user ratings kept with the watermark do not match it, "
+            "reading the whole table"
+        )
+        return extract_user_ratings_from_db(
+            incremental=True,
+            full_refresh=True,
+            columns=columns,
+            accumulate=True,
+        )
+    stage_key_watermark(max_key, row_count, user_ratings)
+    return all_user_ratings
+
+
+def track_max_key(
+    chunks: Iterator[pd.DataFrame],
+    max_key: Any,
+    row_count: int,
+    drop_key: bool = False,
+) -> Iterator[pd.DataFrame]:
+    # Stage the watermark once every chunk has been consumed
+    for chunk in chunks:
+        max_key = latest_key(chunk, max_key)
+        row_count += len(chunk)
+        yield drop_key_column(chunk) if drop_key else chunk
+    stage_key_watermark(max_key, row_count)
+
+
+def drop_key_column(user_ratings: pd.DataFrame) -> pd.DataFrame:
+    return user_ratings.drop(
+        columns=[USER_RATINGS_KEY_COLUMN], errors="ignore"
+    )
+
+
+def latest_key(user_ratings: pd.DataFrame, max_key: Any) -> Any:
+    # Rows arrive in key order, so the last row holds the highest key
+    if user_ratings.empty:
+        return max_key
+    key = user_ratings[USER_RATINGS_KEY_COLUMN].iloc[-1]
+    # Convert NumPy scalars so that the watermark can be stored as JSON
+    return key.item() if hasattr(key, "item") else key
+
+
+def stage_key_watermark(
+    max_key: Any, row_count: int, rows: Optional[pd.DataFrame] = None
+) -> None:
+    stage_watermark(
+        USER_RATINGS_WATERMARK_NAME,
+        {"max_key": max_key, "row_count": row_count},
+        rows=rows,
+    )
@@ -2,7 +2,11 @@ import os
 import logging
 import pandas as pd
 import timeit
+from typing import Optional
+from src.utils.cache_utils import read_csv_with_parquet_cache
 from src.utils.logging_utils import setup_logger, log_extract_success
+from src.utils.metrics_utils import start_extract_measurement
+from src.utils.shard_utils import get_read_options, read_sharded_csv
 
 # Define the file path for the movies CSV file
 FILE_PATH = os.path.join(
@@ -17,26 +21,64 @@ FILE_PATH = os.path.join(
 # Configure the logger
 logger = setup_logger(__name__, "extract_data.log", level=logging.DEBUG)
 
-EXPECTED_PERFORMANCE = 0.0001
-
 TYPE = "MOVIES from CSV"
 
+# Declared column types, parsed directly by the pyarrow engine so that the
+# transform stage does not have to re-cast them. Undeclared columns are
+# strings and are kept in Arrow memory rather than as Python objects
+SCHEMA = {
+    "original_language": "category",
+    "runtime": "Int16",
+    "year_released": "Int16",
+}
+
+# Options for the pyarrow engine. They are part of the ingestion cache key,
+# so changing the schema invalidates cached copies
+READ_OPTIONS = {
+    "engine": "pyarrow",
+    "dtype_backend": "pyarrow",
+    "dtype": SCHEMA,
+}
+
+
+def extract_movies(
+    use_cache: bool = False,
+    columns: Optional[list[str]] = None,
+    file_path: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    Extract the movies CSV file, optionally only the given columns.
 
-def extract_movies() -> pd.DataFrame:
+    file_path defaults to FILE_PATH and may be a glob of part files, which
+    can be compressed (for example part-*.csv.gz). The parts are parsed in
+    parallel and combined in path order.
+    """
+    file_path = file_path or FILE_PATH
     start_time = timeit.default_timer()
+    # Cached reads do not parse the CSV, so only their memory is measured
+    measurement = start_extract_measurement(None if use_cache else file_path)
 
     try:
-        movies = pd.read_csv(FILE_PATH)
+        if use_cache:
+            movies = read_sharded_csv(
+                file_path,
+                read_csv_with_parquet_cache,
+                columns=columns,
+                **READ_OPTIONS,
+            )
+        else:
+            movies = read_sharded_csv(
+                file_path, **get_read_options(READ_OPTIONS, columns)
+            )
         extract_movies_execution_time = timeit.default_timer() - start_time
         log_extract_success(
             logger,
             TYPE,
             movies.shape,
             extract_movies_execution_time,
-            EXPECTED_PERFORMANCE,
+            measurement,
         )
         return movies
     except Exception as e:
-        logger.setLevel(logging.ERROR)
-        logger.error(f"Error loading {FILE_PATH}: {e}")
-        raise Exception(f"Failed to load CSV file: {FILE_PATH}")
+        logger.error(f"Error loading {file_path}: {e}")
+        raise Exception(f"Failed to load CSV file: {file_path}")
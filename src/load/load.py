@@ -1,39 +1,102 @@
 import pandas as pd
+from typing import Optional
 from src.load.load_movies import load_movies
 from src.load.load_user_ratings import load_user_ratings
 from src.load.load_aggregated_user_ratings import load_aggregated_user_ratings
+from src.load.load_movie_genres import load_movie_genres
+from src.load.load_movie_keys import load_movie_keys
 from src.utils.logging_utils import setup_logger
 
 logger = setup_logger("load_data", "load_data.log")
 
+# Loaded tables and the extracted inputs each one is derived from. The
+# movies table is enriched with the user ratings, so it depends on them too.
+# The movie aliases consolidate the movies and the movies of the user
+# ratings, so every table depends on them
+LOAD_DEPENDENCIES = {
+    "movies": [
+        "movies", "movies_with_ratings", "user_ratings", "movie_aliases"
+    ],
+    "user_ratings": ["user_ratings", "movie_aliases"],
+    "aggregated_user_ratings": ["user_ratings", "movie_aliases"],
+    "movie_genres": ["movies", "movies_with_ratings", "movie_aliases"],
+    # Every movie keyed by the movies or the user ratings
+    "movie_keys": [
+        "movies", "movies_with_ratings", "user_ratings", "movie_aliases"
+    ],
+}
 
-def load_data_to_db(data) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+
+def load_data_to_db(
+    data, tables: Optional[set[str]] = None
+) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame,
+           pd.DataFrame]:
+    """
+    Load the transformed movies, user ratings, aggregated user ratings,
+    movie genres and movie keys.
+
+    When tables is given, only those tables (named as in LOAD_DEPENDENCIES)
+    are replaced, and None is returned in place of the tables that were
+    left as they are.
+    """
     try:
         logger.info("Starting loading process")
+        tables = set(LOAD_DEPENDENCIES) if tables is None else tables
+        loaded_movies = None
+        loaded_user_ratings = None
+        loaded_aggregated_user_ratings = None
+        loaded_movie_genres = None
+        loaded_movie_keys = None
         # Load enriched movies DataFrame into database
-        logger.info("Loading movies data...")
-        loaded_movies = load_movies(data[0])
-        logger.info("Movies data loaded successfully.")
+        if "movies" in tables:
+            logger.info("Loading movies data...")
+            loaded_movies = load_movies(data[0])
+            logger.info("Movies data loaded successfully.")
         # Load cleaned user ratings DataFrame into database
-        logger.info("Loading user ratings data...")
-        loaded_user_ratings = load_user_ratings(data[1])
-        logger.info("User ratings data loaded successfully.")
+        if "user_ratings" in tables:
+            logger.info("Loading user ratings data...")
+            loaded_user_ratings = load_user_ratings(data[1])
+            logger.info("User ratings data loaded successfully.")
         # Load aggregated user ratings DataFrame into database
-        logger.info("Loading aggregated user ratings data...")
-        loaded_aggregated_user_ratings = load_aggregated_user_ratings(data[2])
-        logger.info("Aggregated user ratings data loaded successfully.")
+        if "aggregated_user_ratings" in tables:
+            logger.info("Loading aggregated user ratings data...")
+            loaded_aggregated_user_ratings = load_aggregated_user_ratings(
+                data[2]
+            )
+            logger.info("Aggregated user ratings data loaded successfully.")
+        # Load the movie genres bridge table into database
+        if "movie_genres" in tables:
+            logger.info("Loading movie genres data...")
+            loaded_movie_genres = load_movie_genres(data[3])
+            logger.info("Movie genres data loaded successfully.")
+        # Load the movie dimension, which every movie_key refers to
+        if "movie_keys" in tables:
+            logger.info("Loading movie keys data...")
+            loaded_movie_keys = load_movie_keys(data[4])
+            logger.info("Movie keys data loaded successfully.")
 
         logger.info(
             f"Data loading completed successfully - "
-            f"Movies: {loaded_movies.shape}, "
-            f"User Ratings: {loaded_user_ratings.shape}, "
-            f"Aggregated User Ratings: {loaded_aggregated_user_ratings.shape}"
+            f"Movies: {describe_loaded(loaded_movies)}, "
+            f"User Ratings: {describe_loaded(loaded_user_ratings)}, "
+            f"Aggregated User Ratings: "
+            f"{describe_loaded(loaded_aggregated_user_ratings)}, "
+            f"Movie Genres: {describe_loaded(loaded_movie_genres)}, "
+            f"Movie Keys: {describe_loaded(loaded_movie_keys)}"
         )
 
         return (
-            loaded_movies, loaded_user_ratings, loaded_aggregated_user_ratings
+            loaded_movies,
+            loaded_user_ratings,
+            loaded_aggregated_user_ratings,
+            loaded_movie_genres,
+            loaded_movie_keys,
         )
 
     except Exception as e:
         logger.error(f"Data loading failed: {str(e)}")
         raise
+
+
+def describe_loaded(df: Optional[pd.DataFrame]) -> str:
+    return "unchanged" if df is None else str(df.shape)
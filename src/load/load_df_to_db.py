@@ -1,7 +1,10 @@
 import logging
 import pandas as pd
+from typing import Optional
+from sqlalchemy import text
 from config.db_config import load_db_config
 from src.utils.db_utils import get_db_connection
+from src.utils.list_utils import is_string_list_column, to_python_lists
 
 logger = logging.getLogger(__name__)
 
@@ -9,19 +12,40 @@ logger = logging.getLogger(__name__)
 def load_dataframe_to_db(
     df: pd.DataFrame,
     table_name: str,
+    index_columns: Optional[list[str]] = None,
 ):
     try:
         connection_details = load_db_config()["target_database"]
         print(connection_details)
         connection = get_db_connection(connection_details)
         logger.info(f"Loading DataFrame to table '{table_name}' in database.")
+        # The database driver adapts Python lists to arrays, not Arrow lists
+        list_columns = [
+            column for column in df.columns
+            if is_string_list_column(df[column])
+        ]
+        if list_columns:
+            df = df.assign(
+                **{column: to_python_lists(df[column])
+                   for column in list_columns}
+            )
+        schema = connection_details["schema"]
         df.to_sql(
             table_name,
             connection,
-            schema="de_2506_a",
+            schema=schema,
             index=False,
             if_exists="replace"
         )
+        # The table is recreated on every load, so are its indexes
+        for column in index_columns or []:
+            connection.execute(
+                text(
+                    f"CREATE INDEX {table_name}_{column}_idx "
+                    f"ON {schema}.{table_name} ({column})"
+                )
+            )
+        connection.commit()
         connection.close()
         logger.info(
             f"Successfully loaded table '{table_name}' with {len(df)} records."
@@ -0,0 +1,11 @@
+import pandas as pd
+from src.load.load_df_to_db import load_dataframe_to_db
+
+
+def load_movie_keys(movie_keys_df: pd.DataFrame) -> pd.DataFrame:
+    load_dataframe_to_db(
+        movie_keys_df,
+        table_name="rf_movie_keys",
+        index_columns=["movie_key"]
+    )
+    return movie_keys_df
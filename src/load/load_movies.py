@@ -3,5 +3,9 @@ from src.load.load_df_to_db import load_dataframe_to_db
 
 
 def load_movies(movies_df: pd.DataFrame) -> pd.DataFrame:
-    load_dataframe_to_db(movies_df, table_name="rf_movies")
+    load_dataframe_to_db(
+        movies_df,
+        table_name="rf_movies",
+        index_columns=["movie_key"]
+    )
     return movies_df
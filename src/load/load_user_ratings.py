@@ -3,5 +3,9 @@ from src.load.load_df_to_db import load_dataframe_to_db
 
 
 def load_user_ratings(user_ratings_df: pd.DataFrame) -> pd.DataFrame:
-    load_dataframe_to_db(user_ratings_df, table_name="rf_user_ratings")
+    load_dataframe_to_db(
+        user_ratings_df,
+        table_name="rf_user_ratings",
+        index_columns=["movie_key"]
+    )
     return user_ratings_df
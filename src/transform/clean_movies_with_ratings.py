@@ -1,41 +1,53 @@
 import pandas as pd
-from src.utils.file_utils import save_dataframe_to_csv
+from pandas.api.types import is_integer_dtype
+from src.transform.cleaning_steps import run_cleaning_steps
+from src.utils.snapshot_utils import save_snapshot
 
 
 def clean_movies_with_ratings(
-    movies_with_ratings: pd.DataFrame
+    movies_with_ratings: pd.DataFrame, memory_report: list = None
 ) -> pd.DataFrame:
-    # Task 1 - Drop id column
-    movies_with_ratings = drop_id_column(movies_with_ratings)
-    # Task 2 - Convert date to integer type
-    movies_with_ratings = convert_date_to_int(movies_with_ratings)
-    # Task 3 - Convert minute to integer type
-    movies_with_ratings = convert_minute_to_int(movies_with_ratings)
-    # Task 4 - Standardise ratings
-    movies_with_ratings = standardise_ratings(movies_with_ratings)
-    # Reset index
-    movies_with_ratings.reset_index(drop=True, inplace=True)
+    """
+    Clean the movies with ratings, leaving the frame passed in unchanged.
 
-    # Save the dataframe as a CSV for logging purposes
-    # Ensure the directory exists
+    Args:
+        movies_with_ratings (pd.DataFrame): The extracted movies with
+        ratings.
+        memory_report (list, optional): When given, a record of the memory
+        used by each cleaning step is appended to it.
+
+    Returns:
+        pd.DataFrame: The cleaned movies with ratings.
+    """
+    movies_with_ratings = run_cleaning_steps(
+        movies_with_ratings, CLEAN_MOVIES_WITH_RATINGS_STEPS, memory_report
+    )
+
+    # Save the dataframe to the processed data
     output_dir = "data/processed"
-    file_name = "cleaned_movies_with_ratings.csv"
-    save_dataframe_to_csv(movies_with_ratings, output_dir, file_name)
+    table_name = "cleaned_movies_with_ratings"
+    save_snapshot(movies_with_ratings, output_dir, table_name)
 
     return movies_with_ratings
 
 
 def convert_date_to_int(movies_with_ratings: pd.DataFrame) -> pd.DataFrame:
-    # Convert the date column to a integer format
-    movies_with_ratings['date'] = movies_with_ratings['date'].astype('Int64')
+    # Convert the date column to a integer format, unless it was already
+    # parsed as one on extraction
+    if not is_integer_dtype(movies_with_ratings['date']):
+        movies_with_ratings['date'] = movies_with_ratings['date'].astype(
+            'Int64'
+        )
     return movies_with_ratings
 
 
 def convert_minute_to_int(movies_with_ratings: pd.DataFrame) -> pd.DataFrame:
-    # Convert the minute column to a integer format
-    movies_with_ratings['minute'] = movies_with_ratings['minute'].astype(
-        'Int64'
-    )
+    # Convert the minute column to a integer format, unless it was already
+    # parsed as one on extraction
+    if not is_integer_dtype(movies_with_ratings['minute']):
+        movies_with_ratings['minute'] = movies_with_ratings['minute'].astype(
+            'Int64'
+        )
     return movies_with_ratings
 
 
@@ -47,5 +59,22 @@ def standardise_ratings(movies_with_ratings: pd.DataFrame) -> pd.DataFrame:
 
 
 def drop_id_column(movies_with_ratings: pd.DataFrame) -> pd.DataFrame:
-    # Drop the id column
-    return movies_with_ratings.drop(columns=["id"])
+    # Drop the id column, if it was extracted at all
+    return movies_with_ratings.drop(columns=["id"], errors="ignore")
+
+
+def reset_index(movies_with_ratings: pd.DataFrame) -> pd.DataFrame:
+    return movies_with_ratings.reset_index(drop=True)
+
+
+CLEAN_MOVIES_WITH_RATINGS_STEPS = [
+    # Task 1 - Drop id column
+    ("drop_id_column", drop_id_column),
+    # Task 2 - Convert date to integer type
+    ("convert_date_to_int", convert_date_to_int),
+    # Task 3 - Convert minute to integer type
+    ("convert_minute_to_int", convert_minute_to_int),
+    # Task 4 - Standardise ratings
+    ("standardise_ratings", standardise_ratings),
+    ("reset_index", reset_index),
+]
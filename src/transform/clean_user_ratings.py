@@ -1,57 +1,94 @@
+import numpy as np
 import pandas as pd
-from src.utils.file_utils import save_dataframe_to_csv
+from typing import Iterable, Optional, Union
+from src.utils.snapshot_utils import save_processed_table
+from src.transform.movie_aliases import apply_movie_aliases
+from src.transform.movie_keys import replace_movie_ids_with_keys
+from src.utils.id_mapping_utils import map_to_persistent_ids
 
+# Columns of the ratings that the fused consolidation packs into one key,
+# with the rating, from the highest bits down
+RATING_KEY_COLUMNS = ["movie_key", "user_id"]
+PACKED_KEY_BITS = 64
 
-def clean_user_ratings(user_ratings: pd.DataFrame) -> pd.DataFrame:
-    # Task 1 - Remove rows with missing data
-    cleaned_user_ratings = remove_missing_values(user_ratings)
-    # Task 2 - Anonymise user_id
-    cleaned_user_ratings = anonymise_user_id(cleaned_user_ratings)
-    # Task 3 - Consolidate duplicated movies
-    cleaned_user_ratings = consolidate_duplicated_movies(cleaned_user_ratings)
-    # Task 4 - Remove duplicate rows
-    cleaned_user_ratings = cleaned_user_ratings.drop_duplicates()
+
+def clean_user_ratings(
+    user_ratings: Union[pd.DataFrame, Iterable[pd.DataFrame]]
+) -> pd.DataFrame:
+    # Tasks 1 to 3, and keying the ratings by movie_key
+    cleaned_user_ratings = prepare_user_ratings(user_ratings)
+    # Task 4 - Remove duplicate rows, and
     # Task 5 - Consolidate ratings for same movie rated differently by a user
-    cleaned_user_ratings = consolidate_ratings_for_same_movie(
+    cleaned_user_ratings = deduplicate_and_consolidate_ratings(
         cleaned_user_ratings
     )
     # Reset index
     cleaned_user_ratings.reset_index(drop=True, inplace=True)
 
-    # Save the dataframe as a CSV for logging purposes
-    # Ensure the directory exists
-    output_dir = "data/processed"
-    file_name = "cleaned_user_ratings.csv"
-    save_dataframe_to_csv(cleaned_user_ratings, output_dir, file_name)
+    save_cleaned_user_ratings(cleaned_user_ratings)
 
     return cleaned_user_ratings
 
 
+def prepare_user_ratings(
+    user_ratings: Union[pd.DataFrame, Iterable[pd.DataFrame]]
+) -> pd.DataFrame:
+    # The steps that rely on the persisted id mappings, which run before the
+    # ratings can be split up
+    # Task 1 - Remove rows with missing data
+    if isinstance(user_ratings, pd.DataFrame):
+        prepared_user_ratings = remove_missing_values(user_ratings)
+    else:
+        # Streamed user ratings are filtered chunk by chunk so that only the
+        # rows which survive the filter are kept in memory
+        prepared_user_ratings = pd.concat(
+            (remove_missing_values(chunk) for chunk in user_ratings),
+            ignore_index=True,
+        )
+    # Task 2 - Anonymise user_id
+    prepared_user_ratings = anonymise_user_id(prepared_user_ratings)
+    # Task 3 - Consolidate duplicated movies
+    prepared_user_ratings = consolidate_duplicated_movies(
+        prepared_user_ratings
+    )
+    # Key the ratings by the integer movie key rather than the slug
+    return replace_movie_ids_with_keys(prepared_user_ratings)
+
+
+def save_cleaned_user_ratings(cleaned_user_ratings: pd.DataFrame) -> None:
+    # Save the dataframe to the processed data
+    output_dir = "data/processed"
+    table_name = "cleaned_user_ratings"
+    save_processed_table(cleaned_user_ratings, output_dir, table_name)
+
+
 def remove_missing_values(user_ratings: pd.DataFrame) -> pd.DataFrame:
     # Remove rows with missing values
     return user_ratings.dropna()
 
 
-def anonymise_user_id(user_ratings: pd.DataFrame) -> pd.DataFrame:
-    # Anonymise the user_id column by replacing it with a serialised number
-    user_mapping = {uid: i for i, uid in enumerate(user_ratings[
-        'user_id'
-    ].unique(), start=1)}
-    user_ratings['user_id'] = user_ratings['user_id'].map(user_mapping)
-    return user_ratings
+def anonymise_user_id(
+    user_ratings: pd.DataFrame, mapping_dir: str = None
+) -> pd.DataFrame:
+    # Anonymise the user_id column by replacing it with a serialised number.
+    # The numbers are kept in a persisted mapping, so a user keeps the same
+    # number across runs and new users are numbered after the known ones
+    return user_ratings.assign(
+        user_id=map_to_persistent_ids(
+            user_ratings["user_id"], "user_id", mapping_dir
+        )
+    )
 
 
-def consolidate_duplicated_movies(user_ratings: pd.DataFrame) -> pd.DataFrame:
+def consolidate_duplicated_movies(
+    user_ratings: pd.DataFrame, aliases: pd.Series = None
+) -> pd.DataFrame:
     # Consolidate duplicated movies
     # (same movie with different movie_id, where both movie_ids have ratings)
-    # into one record
-    user_ratings.loc[
-        user_ratings["movie_id"] == "ex-machina-2014", "movie_id"
-    ] = "ex-machina-2015"
-    user_ratings.loc[
-        user_ratings["movie_id"] == "black-panther", "movie_id"
-    ] = "black-panther-2018"
-    return user_ratings
+    # into one record, as listed in the movie alias table
+    return user_ratings.assign(
+        movie_id=apply_movie_aliases(user_ratings["movie_id"], aliases)
+    )
 
 
 def consolidate_ratings_for_same_movie(
@@ -60,8 +97,159 @@ def consolidate_ratings_for_same_movie(
     # Consolidate ratings for the same movie rated differently by a user
     cleaned_user_ratings = (
         cleaned_user_ratings.groupby(
-            ["movie_id", "user_id"],
+            ["movie_key", "user_id"],
             as_index=False
         )["rating_val"].mean()
     )
     return cleaned_user_ratings
+
+
+def deduplicate_and_consolidate_ratings(
+    user_ratings: pd.DataFrame
+) -> pd.DataFrame:
+    """
+    Remove duplicate ratings and average the different ratings a user gave
+    the same movie, with the same result as drop_duplicates followed by
+    consolidate_ratings_for_same_movie.
+
+    The movie_key, the user_id and the rank of the rating among the
+    distinct ratings are packed into one 64-bit integer, so both steps come
+    down to sorting a single integer array rather than hashing several
+    columns twice. Ratings whose keys do not fit in 64 bits are left to
+    the two separate steps.
+
+    Args:
+        user_ratings (pd.DataFrame): The ratings, with the movie_key,
+        user_id and rating_val columns.
+
+    Returns:
+        pd.DataFrame: One rating per movie_key and user_id, sorted by them.
+    """
+    packing = plan_rating_key_packing(user_ratings)
+    if packing is None:
+        return consolidate_ratings_for_same_movie(
+            user_ratings.drop_duplicates()
+        )
+    user_id_shift, rating_bits, rating_values = packing
+    packed_keys = pack_rating_keys(
+        user_ratings, user_id_shift, rating_bits, rating_values
+    )
+
+    # Sorted, exact duplicates are next to each other, as are the
+    # different ratings of the same movie by the same user
+    sorted_keys = np.sort(packed_keys)
+    distinct = np.ones(len(sorted_keys), dtype=bool)
+    distinct[1:] = sorted_keys[1:] != sorted_keys[:-1]
+    sorted_keys = sorted_keys[distinct]
+
+    pair_keys = sorted_keys >> np.uint64(rating_bits)
+    starts = np.flatnonzero(
+        np.concatenate(([True], pair_keys[1:] != pair_keys[:-1]))
+    )
+    counts = np.diff(np.append(starts, len(pair_keys)))
+    ratings = rating_values[
+        (sorted_keys & np.uint64(2**rating_bits - 1)).astype(np.intp)
+    ]
+    means = np.add.reduceat(ratings, starts) / counts
+    pair_keys = pair_keys[starts]
+
+    # The sum of one or two ratings does not depend on their order, but a
+    # longer sum does, so the rare pairs with more than two different
+    # ratings are averaged by groupby in their original order
+    many = counts > 2
+    if many.any():
+        rows = pd.Series(packed_keys >> np.uint64(rating_bits)).isin(
+            pair_keys[many]
+        ).to_numpy()
+        means[many] = consolidate_ratings_for_same_movie(
+            user_ratings[rows].drop_duplicates()
+        )["rating_val"].to_numpy(dtype=np.float64)
+
+    return pd.DataFrame(
+        {
+            "movie_key": (pair_keys >> np.uint64(user_id_shift)).astype(
+                user_ratings["movie_key"].dtype
+            ),
+            "user_id": (
+                pair_keys & np.uint64(2**user_id_shift - 1)
+            ).astype(user_ratings["user_id"].dtype),
+            "rating_val": to_rating_array(
+                means, get_consolidated_rating_dtype(user_ratings)
+            ),
+        }
+    )
+
+
+def to_rating_array(means: np.ndarray, dtype):
+    # The averages have no missing values, so the nullable array is built
+    # without checking them
+    if dtype == pd.Float64Dtype():
+        return pd.arrays.FloatingArray(
+            means, np.zeros(len(means), dtype=bool)
+        )
+    return means
+
+
+def get_consolidated_rating_dtype(user_ratings: pd.DataFrame):
+    # The dtype groupby gives the averaged ratings
+    return consolidate_ratings_for_same_movie(
+        user_ratings.head(0)
+    )["rating_val"].dtype
+
+
+def plan_rating_key_packing(
+    user_ratings: pd.DataFrame
+) -> Optional[tuple[int, int, np.ndarray]]:
+    """
+    Work out how the ratings pack into 64-bit keys.
+
+    Returns:
+        tuple[int, int, np.ndarray]: The bits taken by the user_id, the bits
+        taken by the rating rank, and the distinct ratings in ascending
+        order. None when the ratings cannot be packed: when they have other
+        columns, which take part in finding duplicate rows, keys that are
+        not small non-negative integers, missing values, or averages that
+        groupby would not give as float64.
+    """
+    if user_ratings.empty or sorted(user_ratings.columns) != sorted(
+        RATING_KEY_COLUMNS + ["rating_val"]
+    ):
+        return None
+    key_bits = []
+    for column in RATING_KEY_COLUMNS:
+        keys = user_ratings[column]
+        if not pd.api.types.is_integer_dtype(keys.dtype) or keys.hasnans:
+            return None
+        if keys.min() < 0:
+            return None
+        key_bits.append(int(keys.max()).bit_length())
+    ratings = user_ratings["rating_val"]
+    if (
+        not pd.api.types.is_numeric_dtype(ratings.dtype)
+        or ratings.hasnans
+        or get_consolidated_rating_dtype(user_ratings)
+        not in (np.float64, pd.Float64Dtype())
+    ):
+        return None
+    rating_values = np.sort(pd.unique(ratings.to_numpy(dtype=np.float64)))
+    rating_bits = (len(rating_values) - 1).bit_length()
+    if sum(key_bits) + rating_bits > PACKED_KEY_BITS:
+        return None
+    return key_bits[1], rating_bits, rating_values
+
+
+def pack_rating_keys(
+    user_ratings: pd.DataFrame,
+    user_id_shift: int,
+    rating_bits: int,
+    rating_values: np.ndarray,
+) -> np.ndarray:
+    # The movie_key in the high bits, then the user_id, then the rank of
+    # the rating, so the packed keys sort as groupby orders the pairs
+    movie_keys = user_ratings["movie_key"].to_numpy(dtype=np.uint64)
+    user_ids = user_ratings["user_id"].to_numpy(dtype=np.uint64)
+    rating_ranks = np.searchsorted(
+        rating_values, user_ratings["rating_val"].to_numpy(dtype=np.float64)
+    ).astype(np.uint64)
+    pair_keys = (movie_keys << np.uint64(user_id_shift)) | user_ids
+    return (pair_keys << np.uint64(rating_bits)) | rating_ranks
@@ -0,0 +1,84 @@
+import pandas as pd
+from typing import Callable
+from src.utils.metrics_utils import measure_peak_memory
+
+# A named cleaning step, which takes the frame and returns the cleaned frame
+CleaningStep = tuple[str, Callable[[pd.DataFrame], pd.DataFrame]]
+
+
+def run_cleaning_steps(
+    df: pd.DataFrame, steps: list[CleaningStep], memory_report: list = None
+) -> pd.DataFrame:
+    """
+    Run cleaning steps one after the other with copy-on-write enabled.
+
+    The steps work on a shallow copy of df, and copy-on-write means a
+    column is only copied when it is written to while another frame still
+    shares it. Steps can therefore assign columns in place without ever
+    writing into df, and filters that keep every row can return the frame
+    as it is rather than a copy.
+
+    Args:
+        df (pd.DataFrame): The frame to clean, which is left unchanged.
+        steps (list[CleaningStep]): The name and function of each step.
+        memory_report (list, optional): When given, the memory used by each
+        step is measured and a record appended for it, with the peak and
+        retained memory and the peak as a number of copies of the frame
+        the step started from. A record for the whole run follows, named
+        total.
+
+    Returns:
+        pd.DataFrame: The cleaned frame.
+    """
+    with pd.option_context("mode.copy_on_write", True):
+        frame_bytes = get_frame_bytes(df) if memory_report is not None else 0
+        df = df.copy(deep=False)
+        retained_bytes = 0
+        total_peak_bytes = 0
+        for name, step in steps:
+            if memory_report is None:
+                df = step(df)
+                continue
+            step_frame_bytes = get_frame_bytes(df)
+            with measure_peak_memory() as memory:
+                df = step(df)
+            memory_report.append(
+                build_step_memory_record(name, memory, step_frame_bytes)
+            )
+            # The peak of the run is reached during one of the steps, on
+            # top of what the steps before it kept
+            total_peak_bytes = max(
+                total_peak_bytes, retained_bytes + memory["peak_bytes"]
+            )
+            retained_bytes += memory["retained_bytes"]
+        if memory_report is not None:
+            memory_report.append(
+                build_step_memory_record(
+                    "total",
+                    {
+                        "peak_bytes": total_peak_bytes,
+                        "retained_bytes": retained_bytes,
+                    },
+                    frame_bytes,
+                )
+            )
+    return df
+
+
+def get_frame_bytes(df: pd.DataFrame) -> int:
+    # Including the strings held by object columns
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def build_step_memory_record(
+    name: str, memory: dict, frame_bytes: int
+) -> dict:
+    return {
+        "step": name,
+        "frame_mb": frame_bytes / 1e6,
+        "peak_mb": memory["peak_bytes"] / 1e6,
+        "retained_mb": memory["retained_bytes"] / 1e6,
+        "peak_copies": (
+            memory["peak_bytes"] / frame_bytes if frame_bytes else None
+        ),
+    }
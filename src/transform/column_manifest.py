@@ -0,0 +1,20 @@
+# Columns of each raw source that the transform stage reads. The extract
+# stage only parses these columns, so a transform that starts using another
+# column must add it here.
+COLUMN_MANIFEST = {
+    # Every movie column is carried through to the loaded movies table
+    "movies": [
+        "movie_id",
+        "movie_title",
+        "genres",
+        "original_language",
+        "image_url",
+        "runtime",
+        "spoken_languages",
+        "year_released",
+    ],
+    # The id column is dropped on cleaning, and only name, date and rating
+    # are used when merging with the movies
+    "movies_with_ratings": ["name", "date", "minute", "rating"],
+    "user_ratings": ["movie_id", "rating_val", "user_id"],
+}
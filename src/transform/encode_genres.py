@@ -0,0 +1,159 @@
+import numpy as np
+import pandas as pd
+import pyarrow.compute as pc
+from src.utils.id_mapping_utils import load_id_mapping, map_to_persistent_ids
+from src.utils.snapshot_utils import save_processed_table
+from src.utils.list_utils import is_string_list_column, to_arrow_lists
+
+# Genres in the order of their bit in the genre mask, so the ids stay the
+# same from one run to the next. Genres that are not listed here are given
+# the following bits the first time they are seen, in alphabetical order
+# within a run, and keep them through the persisted genre mapping
+GENRES = [
+    "Action",
+    "Adventure",
+    "Animation",
+    "Comedy",
+    "Crime",
+    "Documentary",
+    "Drama",
+    "Family",
+    "Fantasy",
+    "History",
+    "Horror",
+    "Music",
+    "Mystery",
+    "Romance",
+    "Science Fiction",
+    "TV Movie",
+    "Thriller",
+    "War",
+    "Western",
+]
+
+# The persisted id mapping of the genres that are not listed
+GENRE_MAPPING_NAME = "genre"
+
+GENRE_MASK_DTYPE = np.int32
+
+# The sign bit is left unused so the masks stay positive in the database
+MAX_GENRES = np.iinfo(GENRE_MASK_DTYPE).bits - 1
+
+
+def encode_genres(
+    merged_data: pd.DataFrame
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Encode the genres of each movie as a bridge table with one row per
+    movie and genre, and as a genre_mask column on the movies, where bit n
+    is set when the movie has the genre with genre_id n.
+
+    Args:
+        merged_data (pd.DataFrame): The merged movies, with their movie
+        keys and the genres parsed into lists.
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame]: The movies with the genre_mask
+        column, and the movie_genres bridge table of movie_key, genre_id
+        and genre.
+    """
+    movie_genres = build_movie_genres(merged_data)
+    merged_data = merged_data.assign(
+        genre_mask=encode_genre_mask(movie_genres, merged_data["movie_key"])
+    )
+    # Save the bridge table to the processed data
+    output_dir = "data/processed/"
+    table_name = "movie_genres"
+    save_processed_table(movie_genres, output_dir, table_name)
+    return merged_data, movie_genres
+
+
+def get_genre_ids(
+    genres: pd.Series, mapping_dir: str = None
+) -> dict[str, int]:
+    # The known genres keep their position, and other genres keep the bit
+    # they were given when first seen, so earlier masks stay valid
+    other_genres = pd.Series(
+        sorted(set(genres.dropna()) - set(GENRES)), dtype=object
+    )
+    mapped_genres = load_id_mapping(GENRE_MAPPING_NAME, mapping_dir)["key"]
+    genre_count = len(GENRES) + len(set(mapped_genres) | set(other_genres))
+    if genre_count > MAX_GENRES:
+        raise ValueError(
+            f"Too many genres for the genre mask: {genre_count}, "
+            f"at most {MAX_GENRES} are supported"
+        )
+    # Mapped ids start at 1
+    other_ids = map_to_persistent_ids(
+        other_genres, GENRE_MAPPING_NAME, mapping_dir
+    ) + len(GENRES) - 1
+    return {
+        **{genre: genre_id for genre_id, genre in enumerate(GENRES)},
+        **dict(zip(other_genres, other_ids.tolist())),
+    }
+
+
+def build_movie_genres(movies: pd.DataFrame) -> pd.DataFrame:
+    """
+    Build the movie_genres bridge table from the genres lists, without
+    exploding them in Python.
+
+    Args:
+        movies (pd.DataFrame): The movies, with their movie keys and the
+        genres parsed into lists.
+
+    Returns:
+        pd.DataFrame: One row per movie and genre, with the movie_key, the
+        genre_id (the bit of the genre in the genre mask) and the genre.
+    """
+    if is_string_list_column(movies["genres"]):
+        lists = to_arrow_lists(movies["genres"])
+        rows = pc.list_parent_indices(lists).to_numpy()
+        genres = pd.Series(
+            pc.list_flatten(lists).to_numpy(zero_copy_only=False),
+            dtype=object,
+        )
+    else:
+        # Lists that were parsed in Python
+        exploded = movies["genres"].reset_index(drop=True).explode()
+        exploded = exploded.dropna()
+        rows = exploded.index.to_numpy()
+        genres = exploded.reset_index(drop=True)
+
+    genre_ids = get_genre_ids(genres)
+    movie_genres = pd.DataFrame(
+        {
+            "movie_key": movies["movie_key"].to_numpy()[rows],
+            "genre_id": genres.map(genre_ids).to_numpy(dtype=np.int8),
+            "genre": genres.to_numpy(),
+        }
+    )
+    movie_genres = movie_genres.drop_duplicates(subset=["movie_key", "genre"])
+    movie_genres.reset_index(drop=True, inplace=True)
+    return movie_genres
+
+
+def encode_genre_mask(
+    movie_genres: pd.DataFrame, movie_keys: pd.Series
+) -> pd.Series:
+    """
+    Combine the genres of each movie in the bridge table into a bitmask.
+
+    Args:
+        movie_genres (pd.DataFrame): The movie_genres bridge table.
+        movie_keys (pd.Series): The movies to encode the genres of.
+
+    Returns:
+        pd.Series: The genre mask of each movie, 0 for movies without
+        genres, with the index of movie_keys.
+    """
+    rows = pd.Index(movie_keys).get_indexer(movie_genres["movie_key"])
+    masks = np.zeros(len(movie_keys), dtype=GENRE_MASK_DTYPE)
+    np.bitwise_or.at(
+        masks,
+        rows,
+        np.left_shift(
+            1, movie_genres["genre_id"].to_numpy(dtype=GENRE_MASK_DTYPE)
+        ),
+    )
+    return pd.Series(masks, index=movie_keys.index, name="genre_mask")
@@ -0,0 +1,419 @@
+import glob
+import json
+import os
+import shutil
+import time
+import numpy as np
+import pandas as pd
+from typing import Optional
+from src.transform.clean_user_ratings import RATING_KEY_COLUMNS
+from src.transform.rating_statistics import compute_rating_statistics
+from src.utils.aggregation_utils import combine_aggregates
+from src.utils.logging_utils import setup_logger
+from src.utils.watermark_utils import STATE_DIR
+
+logger = setup_logger("transform_data", "transform_data.log")
+
+# Directory of the persisted aggregate state: the rating each user gave each
+# movie, and the rating count and sum of every movie and of every user
+AGGREGATE_STATE_DIR = os.path.join(STATE_DIR, "rating_aggregates")
+
+# Names the version of the state that is current. Each save writes a new
+# version directory and then replaces this file, so a run that fails part
+# way through leaves the previous state intact
+CURRENT_STATE_NAME = "current.json"
+
+# The tables of the state, each saved as a Parquet file of that name
+STATE_TABLES = ["ratings", "movie_key", "user_id"]
+
+# Sums that are updated rather than recomputed drift from the recomputed
+# ones by rounding error only
+VERIFY_TOLERANCE = 1e-9
+
+# The movie_key and user_id of a rating are packed into one int64, the
+# user_id in the low bits, which sorts the ratings by movie then user
+USER_ID_BITS = 32
+
+
+def load_aggregate_state(state_dir: str = None) -> Optional[dict]:
+    """
+    Load the current aggregate state.
+
+    Returns:
+        dict | None: The ratings, and the count and sum per movie_key and
+        per user_id, by table name. None when no state has been saved.
+    """
+    state_dir = state_dir or AGGREGATE_STATE_DIR
+    current_path = os.path.join(state_dir, CURRENT_STATE_NAME)
+    if not os.path.exists(current_path):
+        return None
+    with open(current_path) as current_file:
+        version = json.load(current_file)["version"]
+    return {
+        table: pd.read_parquet(
+            os.path.join(state_dir, version, f"{table}.parquet")
+        )
+        for table in STATE_TABLES
+    }
+
+
+def save_aggregate_state(state: dict, state_dir: str = None) -> str:
+    # Write the state as a new version, switch to it, then remove the
+    # versions it replaced
+    state_dir = state_dir or AGGREGATE_STATE_DIR
+    version = f"version-{time.time_ns()}"
+    version_dir = os.path.join(state_dir, version)
+    os.makedirs(version_dir)
+    for table in STATE_TABLES:
+        state[table].to_parquet(
+            os.path.join(version_dir, f"{table}.parquet"), index=False
+        )
+    current_path = os.path.join(state_dir, CURRENT_STATE_NAME)
+    with open(f"{current_path}.tmp", "w") as current_file:
+        json.dump({"version": version}, current_file)
+    os.replace(f"{current_path}.tmp", current_path)
+    for old_version_dir in glob.glob(os.path.join(state_dir, "version-*")):
+        if os.path.basename(old_version_dir) != version:
+            shutil.rmtree(old_version_dir)
+    return version
+
+
+def fingerprint_aggregate_state(state_dir: str = None) -> str:
+    # Every save writes a new version, which names the state
+    current_path = os.path.join(
+        state_dir or AGGREGATE_STATE_DIR, CURRENT_STATE_NAME
+    )
+    if not os.path.exists(current_path):
+        return ""
+    with open(current_path) as current_file:
+        return json.load(current_file)["version"]
+
+
+def build_aggregate_state(cleaned_user_ratings: pd.DataFrame) -> dict:
+    # The state of a full recompute over the cleaned user ratings
+    movie_statistics, user_statistics = compute_rating_statistics(
+        cleaned_user_ratings
+    )
+    ratings, _ = sort_by_pair_keys(get_rating_values(cleaned_user_ratings))
+    return {
+        "ratings": ratings,
+        "movie_key": movie_statistics[["movie_key", "count", "sum"]],
+        "user_id": user_statistics[["user_id", "count", "sum"]],
+    }
+
+
+def get_rating_values(ratings: pd.DataFrame) -> pd.DataFrame:
+    # The ratings with plain float values, which compare and sum without
+    # missing value handling
+    return pd.DataFrame(
+        {
+            **{column: ratings[column].to_numpy()
+               for column in RATING_KEY_COLUMNS},
+            "rating_val": ratings["rating_val"].to_numpy(
+                dtype=np.float64, na_value=np.nan
+            ),
+        }
+    )
+
+
+def pack_pair_keys(ratings: pd.DataFrame) -> np.ndarray:
+    """
+    Pack the movie_key and user_id of each rating into one int64, which
+    sorts the same way as the two columns.
+
+    Raises:
+        ValueError: If a movie_key or user_id is negative, or a user_id
+        does not fit in USER_ID_BITS bits.
+    """
+    movie_keys = ratings["movie_key"].to_numpy().astype(np.int64)
+    user_ids = ratings["user_id"].to_numpy().astype(np.int64)
+    if len(ratings) and (
+        movie_keys.min() < 0
+        or user_ids.min() < 0
+        or user_ids.max() >= 2**USER_ID_BITS
+    ):
+        raise ValueError("Rating keys no longer fit in a packed int64 key")
+    return (movie_keys << USER_ID_BITS) | user_ids
+
+
+def sort_by_pair_keys(
+    ratings: pd.DataFrame
+) -> tuple[pd.DataFrame, np.ndarray]:
+    # The ratings in packed key order, which the cleaned ratings usually
+    # already are
+    keys = pack_pair_keys(ratings)
+    if (keys[1:] < keys[:-1]).any():
+        order = np.argsort(keys, kind="stable")
+        ratings = ratings.iloc[order].reset_index(drop=True)
+        keys = keys[order]
+    return ratings, keys
+
+
+def find_keys(
+    sorted_keys: np.ndarray, keys: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    # The position of each key in the sorted keys, and whether it is there
+    positions = np.searchsorted(sorted_keys, keys)
+    found = positions < len(sorted_keys)
+    found[found] = sorted_keys[positions[found]] == keys[found]
+    return positions, found
+
+
+def diff_ratings(
+    previous_ratings: pd.DataFrame, cleaned_user_ratings: pd.DataFrame
+) -> pd.DataFrame:
+    """
+    Find the ratings that are new or changed since the state was saved, and
+    the ratings that are gone.
+
+    Args:
+        previous_ratings (pd.DataFrame): The ratings of the state, sorted by
+        movie_key and user_id.
+        cleaned_user_ratings (pd.DataFrame): The ratings of this run, one
+        per movie_key and user_id.
+
+    Returns:
+        pd.DataFrame: A batch for apply_rating_batch, with the new rating of
+        each new or changed movie_key and user_id, and a missing rating for
+        each one that is gone.
+    """
+    current_ratings, current_keys = sort_by_pair_keys(
+        get_rating_values(cleaned_user_ratings)
+    )
+    previous_keys = pack_pair_keys(previous_ratings)
+    previous_values = previous_ratings["rating_val"].to_numpy()
+    current_values = current_ratings["rating_val"].to_numpy()
+
+    positions, found = find_keys(previous_keys, current_keys)
+    matched_values = np.full(len(current_keys), np.nan)
+    matched_values[found] = previous_values[positions[found]]
+    # A missing previous value never equals the current one
+    changed = ~(matched_values == current_values)
+    _, still_rated = find_keys(current_keys, previous_keys)
+    return pd.concat(
+        [
+            current_ratings[changed],
+            previous_ratings[~still_rated].assign(rating_val=np.nan),
+        ],
+        ignore_index=True,
+    )
+
+
+def apply_rating_batch(
+    state: dict, batch: pd.DataFrame
+) -> tuple[dict, pd.DataFrame, pd.DataFrame]:
+    """
+    Apply a batch of new, changed and retracted ratings to the aggregate
+    state by adjusting the counts and sums of the movies and users they
+    belong to, without revisiting the other ratings.
+
+    A rating that replaces an earlier rating of the same movie by the same
+    user retracts the earlier one from the count and sum first, so a user
+    who re-rates a film is still counted once.
+
+    Args:
+        state (dict): The aggregate state, as load_aggregate_state returns
+        it.
+        batch (pd.DataFrame): The movie_key, user_id and new rating_val of
+        each rating, with a missing rating_val to retract a rating. The
+        last row of a movie_key and user_id wins.
+
+    Returns:
+        tuple[dict, pd.DataFrame, pd.DataFrame]: The new state, and the
+        count, sum and mean of each movie_key and each user_id whose
+        aggregates changed. Movies and users left without ratings are
+        included with a count of 0.
+    """
+    batch, batch_keys = sort_by_pair_keys(
+        get_rating_values(
+            batch.drop_duplicates(subset=RATING_KEY_COLUMNS, keep="last")
+        )
+    )
+    ratings = state["ratings"]
+    rating_keys = pack_pair_keys(ratings)
+    positions, found = find_keys(rating_keys, batch_keys)
+    previous_values = np.full(len(batch), np.nan)
+    previous_values[found] = ratings["rating_val"].to_numpy()[
+        positions[found]
+    ]
+    values = batch["rating_val"].to_numpy()
+
+    # Each earlier rating is taken back out and each new rating added in
+    retracted = ~np.isnan(previous_values)
+    added = ~np.isnan(values)
+    deltas = pd.concat(
+        [
+            batch.loc[retracted, RATING_KEY_COLUMNS].assign(
+                count=-1, sum=-previous_values[retracted]
+            ),
+            batch.loc[added, RATING_KEY_COLUMNS].assign(
+                count=1, sum=values[added]
+            ),
+        ],
+        ignore_index=True,
+    )
+
+    new_state = {
+        "ratings": replace_ratings(
+            ratings, rating_keys, positions[found], batch[added],
+            batch_keys[added],
+        )
+    }
+    changed = {}
+    for key in ["movie_key", "user_id"]:
+        key_deltas = deltas[[key, "count", "sum"]]
+        aggregates = combine_aggregates([state[key], key_deltas])
+        new_state[key] = aggregates[[key, "count", "sum"]]
+        changed[key] = select_changed_aggregates(aggregates, key_deltas)
+    return new_state, changed["movie_key"], changed["user_id"]
+
+
+def replace_ratings(
+    ratings: pd.DataFrame,
+    rating_keys: np.ndarray,
+    replaced: np.ndarray,
+    new_ratings: pd.DataFrame,
+    new_keys: np.ndarray,
+) -> pd.DataFrame:
+    # Drop the replaced positions and insert the new ratings where they
+    # sort, which keeps the ratings in key order without sorting them again
+    kept = np.ones(len(ratings), dtype=bool)
+    kept[replaced] = False
+    insert_positions = np.searchsorted(rating_keys[kept], new_keys)
+    return pd.DataFrame(
+        {
+            column: np.insert(
+                ratings[column].to_numpy()[kept],
+                insert_positions,
+                new_ratings[column].to_numpy(),
+            )
+            for column in ratings.columns
+        }
+    )
+
+
+def select_changed_aggregates(
+    aggregates: pd.DataFrame, deltas: pd.DataFrame
+) -> pd.DataFrame:
+    # The aggregates of the keys whose count or sum the deltas changed,
+    # with keys left without ratings given a count of 0
+    key = aggregates.columns[0]
+    net_deltas = deltas.groupby(key)[["count", "sum"]].sum()
+    changed_keys = net_deltas.index[
+        (net_deltas["count"] != 0) | (net_deltas["sum"] != 0)
+    ]
+    changed = pd.DataFrame({key: changed_keys.to_numpy()}).merge(
+        aggregates, on=key, how="left"
+    )
+    return changed.assign(
+        count=changed["count"].fillna(0).astype(np.int64),
+        sum=changed["sum"].fillna(0.0),
+    )
+
+
+def update_rating_statistics(
+    cleaned_user_ratings: pd.DataFrame,
+    verify: bool = False,
+    state_dir: str = None,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Compute the rating count, sum and mean of every movie and of every user
+    by updating the persisted aggregate state with the ratings that changed
+    since the last run, rather than from every rating.
+
+    The first run, or a run without a state, computes the aggregates in
+    full and saves them as the state. The changes are found by diffing
+    every cleaned rating against the state, which with the rewrite of the
+    state takes longer than compute_rating_statistics, so transform_data
+    only updates the statistics this way when asked to.
+
+    Args:
+        cleaned_user_ratings (pd.DataFrame): The cleaned user ratings, keyed
+        by movie_key and user_id.
+        verify (bool, optional): Check the updated aggregates against a
+        full recompute.
+        state_dir (str, optional): The directory holding the state.
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame]: The statistics per movie_key and
+        per user_id, as compute_rating_statistics returns them.
+
+    Raises:
+        ValueError: If verify is set and the updated aggregates differ from
+        the full recompute.
+    """
+    state = load_aggregate_state(state_dir)
+    if state is None:
+        logger.info("No rating aggregate state, computing it in full")
+        state = build_aggregate_state(cleaned_user_ratings)
+    else:
+        batch = diff_ratings(state["ratings"], cleaned_user_ratings)
+        state, changed_movies, changed_users = apply_rating_batch(
+            state, batch
+        )
+        logger.info(
+            f"Applied {len(batch)} changed ratings to the rating "
+            f"aggregates: {len(changed_movies)} movies and "
+            f"{len(changed_users)} users changed"
+        )
+
+    movie_statistics = with_means(state["movie_key"])
+    user_statistics = with_means(state["user_id"])
+    if verify:
+        verify_rating_statistics(
+            cleaned_user_ratings, movie_statistics, user_statistics
+        )
+    save_aggregate_state(state, state_dir)
+    return movie_statistics, user_statistics
+
+
+def with_means(aggregates: pd.DataFrame) -> pd.DataFrame:
+    return aggregates.assign(mean=aggregates["sum"] / aggregates["count"])
+
+
+def verify_rating_statistics(
+    cleaned_user_ratings: pd.DataFrame,
+    movie_statistics: pd.DataFrame,
+    user_statistics: pd.DataFrame,
+) -> None:
+    """
+    Check incrementally maintained statistics against a full recompute from
+    the cleaned user ratings. Counts must match exactly, and sums and
+    means to within VERIFY_TOLERANCE.
+
+    Raises:
+        ValueError: If a movie or user is missing, extra or differs.
+    """
+    recomputed = compute_rating_statistics(cleaned_user_ratings)
+    for statistics, expected in zip(
+        [movie_statistics, user_statistics], recomputed
+    ):
+        key = expected.columns[0]
+        compared = expected.merge(
+            statistics,
+            on=key,
+            how="outer",
+            suffixes=("_expected", ""),
+            indicator=True,
+        )
+        mismatched = (compared["_merge"] != "both") | (
+            compared["count"] != compared["count_expected"]
+        )
+        for column in ["sum", "mean"]:
+            mismatched |= ~np.isclose(
+                compared[column],
+                compared[f"{column}_expected"],
+                rtol=VERIFY_TOLERANCE,
+                atol=VERIFY_TOLERANCE,
+            )
+        if mismatched.any():
+            logger.error(
+                f"Incremental rating statistics differ from a full "
+                f"recompute for {int(mismatched.sum())} {key} values, such "
+                f"as {compared.loc[mismatched, key].head(5).tolist()}"
+            )
+            raise ValueError(
+                f"Incremental rating statistics per {key} differ from a "
+                "full recompute"
+            )
+    logger.info("Incremental rating statistics match a full recompute")
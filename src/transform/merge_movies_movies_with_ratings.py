@@ -1,31 +1,53 @@
+import numpy as np
 import pandas as pd
+from src.transform.movie_aliases import remove_aliased_movies
+
+# Bits of the join key holding the year released, below the title code
+YEAR_BITS = 32
+MISSING_YEAR = -1
 
 
 def merge_movies_and_movies_with_ratings(
-    cleaned_movies: pd.DataFrame, cleaned_movies_with_ratings: pd.DataFrame
+    cleaned_movies: pd.DataFrame,
+    cleaned_movies_with_ratings: pd.DataFrame,
+    aliases: pd.Series = None,
 ) -> pd.DataFrame:
-    # Merge movies with movies_with_ratings on movie title and year released
-    merged_data = cleaned_movies.merge(
-        cleaned_movies_with_ratings[['name', 'date', 'rating']],
-        left_on=['movie_title', 'year_released'],
-        right_on=['name', 'date'],
-        how='left'
+    # Look up the Letterboxd rating of each movie by movie title and year
+    # released. Where several movies_with_ratings rows share a title and
+    # year, the best rated one is used, so every movie matches one row at
+    # most and the movies are never duplicated by the join
+    movie_keys, rating_keys = key_titles_and_years(
+        cleaned_movies['movie_title'],
+        cleaned_movies['year_released'],
+        cleaned_movies_with_ratings['name'],
+        cleaned_movies_with_ratings['date'],
+    )
+    best_ratings = cleaned_movies_with_ratings['rating'].groupby(
+        rating_keys
+    ).max()
+    positions = best_ratings.index.get_indexer(movie_keys)
+    ratings = best_ratings.take(positions.clip(min=0)).to_numpy(
+        dtype=np.float64, na_value=np.nan
+    )
+    merged_data = cleaned_movies.assign(
+        rating=pd.Series(
+            np.where(positions >= 0, ratings, np.nan),
+            index=cleaned_movies.index,
+            dtype=cleaned_movies_with_ratings['rating'].dtype,
+        )
     )
-    # Drop the extra columns from movies_with_ratings
-    merged_data = merged_data.drop(columns=['name', 'date'])
-    # Some duplicates introduced due to joining method
-    # Drop duplicated movie records without rating and keep only the movie
-    # with rating data
-    merged_data = merged_data.sort_values(by='rating', ascending=False)
-    # Drop duplicates based on movie_id, keeping the first occurrence
-    # (the one with a rating)
+    # Order the movies from the best rated, as before. The sort is stable,
+    # so movies with the same rating keep the order of the movies table
+    merged_data = merged_data.sort_values(
+        by='rating', ascending=False, kind='stable'
+    )
+    # Keep the best rated record of any movie_id listed more than once
     merged_data = merged_data.drop_duplicates(
         subset=['movie_id'], keep='first'
     )
-    # Remove same movies with different movie_id
-    # ("Ex Machina" and "Black Panther")
-    merged_data = merged_data[merged_data["movie_id"] != "ex-machina-2014"]
-    merged_data = merged_data[merged_data["movie_id"] != "black-panther"]
+    # Remove same movies with different movie_id, as listed in the movie
+    # alias table (such as "Ex Machina" and "Black Panther")
+    merged_data = remove_aliased_movies(merged_data, aliases)
     # Drop records without rating data
     merged_data = merged_data.dropna(subset=['rating'])
     # Reset index
@@ -33,3 +55,35 @@ def merge_movies_and_movies_with_ratings(
     # Merged data ready to be enriched by user ratings data
 
     return merged_data
+
+
+def key_titles_and_years(
+    titles: pd.Series,
+    years: pd.Series,
+    other_titles: pd.Series,
+    other_years: pd.Series,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Give each title and year on both sides of a join the same 64-bit key:
+    the code a hash table gives the title, above the year. Missing titles
+    or years match each other, as they do in a merge.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The keys of each side.
+    """
+    title_codes, _ = pd.factorize(
+        pd.concat([titles, other_titles], ignore_index=True)
+    )
+    title_codes = title_codes.astype(np.int64) << YEAR_BITS
+    keys = [
+        title_codes[:len(titles)] | encode_years(years),
+        title_codes[len(titles):] | encode_years(other_years),
+    ]
+    return keys[0], keys[1]
+
+
+def encode_years(years: pd.Series) -> np.ndarray:
+    years = pd.array(years, dtype="Int64").to_numpy(
+        dtype=np.int64, na_value=MISSING_YEAR
+    )
+    return years & (2**YEAR_BITS - 1)
@@ -0,0 +1,147 @@
+import os
+import numpy as np
+import pandas as pd
+from src.utils.file_utils import ROOT_DIR
+
+# Movies listed under more than one id. Each alias_movie_id is rewritten to
+# the movie_id kept for the movie
+MOVIE_ALIASES_PATH = os.path.join(
+    ROOT_DIR, "data", "reference", "movie_aliases.csv"
+)
+
+# Releases of the same title at most this many years apart are reported as
+# possible duplicates, such as a festival premiere and the theatrical release
+YEAR_TOLERANCE = 1
+
+
+def load_movie_aliases(file_path: str = None) -> pd.Series:
+    """
+    Load the movie alias table.
+
+    Args:
+        file_path (str, optional): The alias table, a CSV file with the
+        alias_movie_id and movie_id columns.
+
+    Returns:
+        pd.Series: The movie_id to use for each alias, indexed by alias.
+
+    Raises:
+        ValueError: If an alias is listed twice or points to another alias.
+    """
+    aliases = pd.read_csv(file_path or MOVIE_ALIASES_PATH, dtype=str)
+    if aliases["alias_movie_id"].duplicated().any():
+        raise ValueError("Movie aliases are listed more than once")
+    if aliases["movie_id"].isin(aliases["alias_movie_id"]).any():
+        raise ValueError("Movie aliases must point to a movie_id to keep")
+    return pd.Series(
+        aliases["movie_id"].to_numpy(),
+        index=pd.Index(aliases["alias_movie_id"]),
+        name="movie_id",
+    )
+
+
+def apply_movie_aliases(
+    movie_ids: pd.Series, aliases: pd.Series = None
+) -> pd.Series:
+    # Rewrite every alias to its movie_id with one hash lookup per row
+    aliases = load_movie_aliases() if aliases is None else aliases
+    positions = aliases.index.get_indexer(movie_ids)
+    aliased = positions >= 0
+    if not aliased.any():
+        return movie_ids
+    remapped = movie_ids.to_numpy(dtype=object, copy=True)
+    remapped[aliased] = aliases.to_numpy()[positions[aliased]]
+    return pd.Series(
+        remapped, index=movie_ids.index, name=movie_ids.name
+    ).astype(movie_ids.dtype)
+
+
+def remove_aliased_movies(
+    movies: pd.DataFrame, aliases: pd.Series = None
+) -> pd.DataFrame:
+    # The movies table keeps only the row of the movie_id each alias
+    # points to
+    aliases = load_movie_aliases() if aliases is None else aliases
+    return movies[~movies["movie_id"].isin(aliases.index)]
+
+
+def normalise_titles(titles: pd.Series) -> pd.Series:
+    # Compare titles without case, accents or punctuation
+    return (
+        titles.astype(str)
+        .str.normalize("NFKD")
+        .str.encode("ascii", errors="ignore")
+        .str.decode("ascii")
+        .str.casefold()
+        .str.replace(r"[^0-9a-z]+", " ", regex=True)
+        .str.strip()
+    )
+
+
+def find_duplicate_movies(
+    movies: pd.DataFrame,
+    aliases: pd.Series = None,
+    year_tolerance: int = YEAR_TOLERANCE,
+) -> pd.DataFrame:
+    """
+    Find movies that are listed under more than one id, by the same
+    normalised title released within year_tolerance years.
+
+    Movies are matched through a hash join on the normalised title, so only
+    movies sharing a title are ever compared.
+
+    Args:
+        movies (pd.DataFrame): The movies, with movie_id, movie_title and
+        year_released.
+        aliases (pd.Series, optional): Known aliases, which are not reported
+        again. Defaults to the alias table.
+        year_tolerance (int, optional): How many years apart the releases
+        of a duplicate may be.
+
+    Returns:
+        pd.DataFrame: One row per candidate, in the form of the alias table
+        with the title and both release years. The movie_id suggested to
+        keep is the later release, or the longer id of the same release,
+        as ids without a year are usually the older listing.
+    """
+    aliases = load_movie_aliases() if aliases is None else aliases
+    candidates = movies[["movie_id", "movie_title", "year_released"]]
+    candidates = candidates.dropna().drop_duplicates(subset=["movie_id"])
+    candidates = candidates.assign(
+        title_key=normalise_titles(candidates["movie_title"])
+    )
+    pairs = candidates.merge(
+        candidates, on="title_key", suffixes=("_alias", "_kept")
+    )
+    kept_is_later = pairs["year_released_kept"] > pairs["year_released_alias"]
+    kept_id_is_longer = pairs["movie_id_kept"].str.len() > (
+        pairs["movie_id_alias"].str.len()
+    )
+    same_length_ids = pairs["movie_id_kept"].str.len() == (
+        pairs["movie_id_alias"].str.len()
+    )
+    # Ties are broken on the id so each pair is reported once
+    kept_id_wins = kept_id_is_longer | (
+        same_length_ids & (pairs["movie_id_kept"] > pairs["movie_id_alias"])
+    )
+    same_year = pairs["year_released_kept"] == pairs["year_released_alias"]
+    pairs = pairs[
+        (kept_is_later | (same_year & kept_id_wins))
+        & (
+            (pairs["year_released_kept"] - pairs["year_released_alias"])
+            <= year_tolerance
+        )
+        & ~pairs["movie_id_alias"].isin(aliases.index)
+    ]
+    duplicates = pd.DataFrame(
+        {
+            "alias_movie_id": pairs["movie_id_alias"].to_numpy(),
+            "movie_id": pairs["movie_id_kept"].to_numpy(),
+            "movie_title": pairs["movie_title_kept"].to_numpy(),
+            "alias_year_released": pairs["year_released_alias"].to_numpy(),
+            "year_released": pairs["year_released_kept"].to_numpy(),
+        }
+    )
+    return duplicates.sort_values(
+        ["movie_title", "alias_movie_id"], ignore_index=True
+    ).astype({"alias_year_released": np.int64, "year_released": np.int64})
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+from src.utils.id_mapping_utils import load_id_mapping, map_to_persistent_ids
+from src.utils.snapshot_utils import save_processed_table
+
+# Movies are keyed by a dense integer in place of their slug everywhere but
+# in the movies table itself
+MOVIE_KEY_DTYPE = np.int32
+
+
+def get_movie_keys(movie_ids: pd.Series) -> pd.Series:
+    """
+    Look up the surrogate key of each movie slug. The keys come from a
+    persisted mapping, so a movie keeps its key from one run to the next
+    and the keys of the user ratings and the movies agree.
+
+    Args:
+        movie_ids (pd.Series): The movie slugs, such as insomnia-2002.
+
+    Returns:
+        pd.Series: The int32 movie keys, with the index of movie_ids.
+    """
+    keys = map_to_persistent_ids(movie_ids, "movie_id")
+    if len(keys) and keys.max() > np.iinfo(MOVIE_KEY_DTYPE).max:
+        raise ValueError(
+            f"Movie keys no longer fit in {np.dtype(MOVIE_KEY_DTYPE).name}"
+        )
+    return keys.astype(MOVIE_KEY_DTYPE).rename("movie_key")
+
+
+def add_movie_keys(movies: pd.DataFrame) -> pd.DataFrame:
+    # The movies table keeps the slug next to its key
+    movies = movies.copy()
+    movies.insert(0, "movie_key", get_movie_keys(movies["movie_id"]))
+    return movies
+
+
+def replace_movie_ids_with_keys(df: pd.DataFrame) -> pd.DataFrame:
+    # Other tables only carry the key, in place of the slug
+    position = df.columns.get_loc("movie_id")
+    keys = get_movie_keys(df["movie_id"])
+    df = df.drop(columns=["movie_id"])
+    df.insert(position, "movie_key", keys)
+    return df
+
+
+def build_movie_dimension(mapping_dir: str = None) -> pd.DataFrame:
+    """
+    Build the movie dimension: the slug of every movie key handed out so
+    far. The movies table only holds the movies that survive the merge, so
+    the keys of the other rated movies are only resolved here.
+
+    Args:
+        mapping_dir (str, optional): The directory holding the mappings.
+
+    Returns:
+        pd.DataFrame: The movie_key and movie_id of every keyed movie, in
+        key order.
+    """
+    mapping = load_id_mapping("movie_id", mapping_dir)
+    movie_dimension = pd.DataFrame(
+        {
+            "movie_key": mapping["id"].to_numpy().astype(MOVIE_KEY_DTYPE),
+            "movie_id": mapping["key"].to_numpy(),
+        }
+    )
+    # Save the dimension to the processed data
+    output_dir = "data/processed"
+    table_name = "movie_keys"
+    save_processed_table(movie_dimension, output_dir, table_name)
+    return movie_dimension
@@ -0,0 +1,38 @@
+import pandas as pd
+from src.utils.aggregation_utils import aggregate_by_key
+
+# Binned sums carry a little more rounding error than the compensated sums
+# groupby uses, enough to tip averages such as 5.525 over the rounding
+# boundary, so the error is rounded away first
+SUM_ERROR_DECIMALS = 10
+
+
+def compute_rating_statistics(
+    cleaned_user_ratings: pd.DataFrame, variance: bool = False
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Compute the rating count, sum and mean of every movie and of every user
+    from one read of the cleaned user ratings.
+
+    Args:
+        cleaned_user_ratings (pd.DataFrame): The DataFrame containing cleaned
+        user ratings data, keyed by movie_key and user_id.
+        variance (bool, optional): Also compute the variance of the ratings.
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame]: The statistics per movie_key and
+        the statistics per user_id.
+    """
+    ratings = cleaned_user_ratings["rating_val"]
+    movie_statistics = aggregate_by_key(
+        cleaned_user_ratings["movie_key"], ratings, variance
+    )
+    user_statistics = aggregate_by_key(
+        cleaned_user_ratings["user_id"], ratings, variance
+    )
+    return movie_statistics, user_statistics
+
+
+def round_average_rating(averages: pd.Series) -> pd.Series:
+    # Round the average ratings to two decimal places
+    return averages.round(SUM_ERROR_DECIMALS).round(2)
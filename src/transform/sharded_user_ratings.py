@@ -0,0 +1,196 @@
+import multiprocessing
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Union
+from src.transform.clean_user_ratings import (
+    deduplicate_and_consolidate_ratings,
+    prepare_user_ratings,
+    save_cleaned_user_ratings,
+)
+from src.transform.rating_statistics import compute_rating_statistics
+from src.utils.aggregation_utils import combine_aggregates
+from src.utils.logging_utils import setup_logger
+
+logger = setup_logger("transform_data", "transform_data.log")
+
+# More shards than workers, so a worker that finishes early picks up another
+# shard rather than waiting on the slowest one
+SHARDS_PER_WORKER = 4
+
+# A user with more ratings than this share of a shard is a hot user, whose
+# ratings are spread over every shard by movie rather than kept in one
+HOT_USER_SHARE = 0.5
+
+
+def transform_user_ratings_sharded(
+    user_ratings: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+    workers: int,
+    shard_count: int = None,
+    shard_dir: str = None,
+) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    Clean the user ratings and compute their statistics per movie and per
+    user on a pool of processes.
+
+    The ratings are hash partitioned by user_id into shards on disk. Each
+    worker deduplicates and consolidates the ratings of its shards and
+    returns the rating counts and sums of the shard, which are combined
+    into the statistics of all of the ratings. The ratings of hot users are
+    spread over the shards by movie, which keeps every rating of a movie by
+    a user in the same shard.
+
+    Args:
+        user_ratings (pd.DataFrame | Iterable[pd.DataFrame]): The user
+        ratings, or chunks of them.
+        workers (int): The number of worker processes.
+        shard_count (int, optional): The number of shards. Defaults to
+        SHARDS_PER_WORKER shards per worker.
+        shard_dir (str, optional): Where the shards are written. Defaults
+        to the temporary directory.
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]: The cleaned user
+        ratings, the statistics per movie_key and the statistics per
+        user_id, as clean_user_ratings and compute_rating_statistics
+        return them.
+    """
+    # Tasks 1 to 3 look up and extend the persisted id mappings, so they
+    # run once here before the ratings are split up
+    prepared_user_ratings = prepare_user_ratings(user_ratings)
+    if prepared_user_ratings.empty:
+        # No rating survived, so there are no shards whose results could be
+        # combined. Clean the empty ratings in process, which keeps the
+        # columns and dtypes of clean_user_ratings
+        logger.info("No user ratings to shard")
+        cleaned_user_ratings = deduplicate_and_consolidate_ratings(
+            prepared_user_ratings
+        )
+        cleaned_user_ratings.reset_index(drop=True, inplace=True)
+        save_cleaned_user_ratings(cleaned_user_ratings)
+        return (
+            cleaned_user_ratings,
+            *compute_rating_statistics(cleaned_user_ratings),
+        )
+    shard_count = shard_count or workers * SHARDS_PER_WORKER
+    shards = assign_shards(prepared_user_ratings, shard_count)
+
+    with tempfile.TemporaryDirectory(
+        prefix="user_ratings_shards_", dir=shard_dir
+    ) as directory:
+        shard_paths = write_shards(prepared_user_ratings, shards, directory)
+        del prepared_user_ratings
+        logger.info(
+            f"Transforming {len(shard_paths)} user ratings shards on "
+            f"{workers} workers"
+        )
+        # The transform steps run on threads, which a forked process could
+        # inherit held locks from, so the workers come from a fork server
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("forkserver"),
+        ) as executor:
+            results = list(executor.map(transform_shard, shard_paths))
+
+        cleaned_user_ratings = pd.concat(
+            (pd.read_parquet(path) for path, _, _ in results),
+            ignore_index=True,
+        )
+
+    # Restore the order of clean_user_ratings
+    cleaned_user_ratings.sort_values(
+        ["movie_key", "user_id"], kind="stable", inplace=True
+    )
+    cleaned_user_ratings.reset_index(drop=True, inplace=True)
+    save_cleaned_user_ratings(cleaned_user_ratings)
+
+    movie_statistics = combine_aggregates(
+        [movie_partial for _, movie_partial, _ in results], "movie_key"
+    )
+    user_statistics = combine_aggregates(
+        [user_partial for _, _, user_partial in results], "user_id"
+    )
+    return cleaned_user_ratings, movie_statistics, user_statistics
+
+
+def assign_shards(user_ratings: pd.DataFrame, shard_count: int) -> np.ndarray:
+    """
+    Give each rating the shard of its user, or for the ratings of hot users
+    the shard of its user and movie.
+
+    Args:
+        user_ratings (pd.DataFrame): The ratings, keyed by movie_key and
+        user_id.
+        shard_count (int): The number of shards.
+
+    Returns:
+        np.ndarray: The shard number of each rating.
+    """
+    user_ids = user_ratings["user_id"]
+    shards = pd.util.hash_array(user_ids.to_numpy()) % np.uint64(shard_count)
+
+    rating_counts = user_ids.value_counts(sort=False)
+    hot_user_ratings = max(
+        1, int(len(user_ratings) / shard_count * HOT_USER_SHARE)
+    )
+    hot_users = rating_counts.index[rating_counts > hot_user_ratings]
+    if len(hot_users):
+        hot = user_ids.isin(hot_users).to_numpy()
+        logger.info(
+            f"Spreading the ratings of {len(hot_users)} hot users over the "
+            "shards"
+        )
+        shards[hot] = pd.util.hash_pandas_object(
+            user_ratings.loc[hot, ["user_id", "movie_key"]], index=False
+        ).to_numpy() % np.uint64(shard_count)
+    return shards.astype(np.intp)
+
+
+def write_shards(
+    user_ratings: pd.DataFrame, shards: np.ndarray, directory: str
+) -> list[str]:
+    # One parquet file per non-empty shard, read back by the workers
+    order = np.argsort(shards, kind="stable")
+    bounds = np.searchsorted(
+        shards[order], np.arange(shards.max(initial=0) + 2)
+    )
+    shard_paths = []
+    for shard, (start, stop) in enumerate(zip(bounds[:-1], bounds[1:])):
+        if start == stop:
+            continue
+        shard_path = os.path.join(directory, f"shard-{shard:04d}.parquet")
+        user_ratings.iloc[order[start:stop]].to_parquet(
+            shard_path, index=False
+        )
+        shard_paths.append(shard_path)
+    return shard_paths
+
+
+def transform_shard(
+    shard_path: str
+) -> tuple[str, pd.DataFrame, pd.DataFrame]:
+    """
+    Deduplicate and consolidate the ratings of one shard, and compute their
+    partial statistics. Runs in a worker process.
+
+    Args:
+        shard_path (str): The parquet file of the shard.
+
+    Returns:
+        tuple[str, pd.DataFrame, pd.DataFrame]: The parquet file the cleaned
+        ratings were written to, and the rating counts and sums per
+        movie_key and per user_id.
+    """
+    cleaned_shard = deduplicate_and_consolidate_ratings(
+        pd.read_parquet(shard_path)
+    )
+    cleaned_path = shard_path.replace(".parquet", "-cleaned.parquet")
+    cleaned_shard.to_parquet(cleaned_path, index=False)
+    movie_partial, user_partial = compute_rating_statistics(cleaned_shard)
+    return (
+        cleaned_path,
+        movie_partial[["movie_key", "count", "sum"]],
+        user_partial[["user_id", "count", "sum"]],
+    )
@@ -1,58 +1,255 @@
 import pandas as pd
+from functools import partial
+from typing import Optional
 from src.transform.clean_movies import clean_movies
 from src.transform.clean_movies_with_ratings import clean_movies_with_ratings
 from src.transform.clean_user_ratings import clean_user_ratings
+from src.transform.sharded_user_ratings import (
+    transform_user_ratings_sharded
+)
 from src.transform.merge_movies_movies_with_ratings import (
     merge_movies_and_movies_with_ratings
 )
+from src.transform.encode_genres import GENRE_MAPPING_NAME, encode_genres
+from src.transform.movie_keys import add_movie_keys, build_movie_dimension
+from src.transform.rating_statistics import compute_rating_statistics
+from src.transform.incremental_rating_statistics import (
+    fingerprint_aggregate_state,
+    update_rating_statistics,
+)
 from src.transform.enrich_merged_with_user_ratings import (
     enrich_movies_table_with_user_ratings_data
 )
 from src.transform.aggregate_user_ratings import (
     aggregate_user_ratings
 )
+from src.transform.movie_aliases import MOVIE_ALIASES_PATH
+from src.utils.cache_utils import hash_file
+from src.utils.dag_utils import run_dag
+from src.utils.id_mapping_utils import fingerprint_id_mapping
 from src.utils.logging_utils import setup_logger
+from src.utils.step_cache_utils import cache_step
 
 logger = setup_logger("transform_data", "transform_data.log")
 
+# The extracted data, in the order extract_data returns it
+TRANSFORM_INPUTS = ["movies", "movies_with_ratings", "user_ratings"]
+
+# The transformed tables, in the order load_data_to_db takes them
+TRANSFORM_OUTPUTS = [
+    "enriched_movies",
+    "cleaned_user_ratings",
+    "aggregated_user_ratings",
+    "movie_genres",
+    "movie_keys",
+]
+
+
+def fingerprint_aliases() -> str:
+    return hash_file(MOVIE_ALIASES_PATH)
+
+
+def fingerprint_user_ratings_state() -> str:
+    # The user ratings are keyed through both id mappings, and their movies
+    # consolidated through the alias table
+    return ";".join(
+        [
+            fingerprint_id_mapping("user_id"),
+            fingerprint_id_mapping("movie_id"),
+            fingerprint_aliases(),
+        ]
+    )
+
+
+def fingerprint_movie_keys_state() -> str:
+    return fingerprint_id_mapping("movie_id")
+
+
+def fingerprint_genres_state() -> str:
+    return fingerprint_id_mapping(GENRE_MAPPING_NAME)
+
 
-def transform_data(data) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+def get_transform_steps(
+    workers: int = 1,
+    incremental_statistics: bool = False,
+    verify_statistics: bool = False,
+) -> dict[str, dict]:
+    """
+    Describe the transform stage as a graph of steps, each with the
+    function it runs, the names of its inputs and of its outputs, as
+    run_dag takes them. Steps that read state other than their inputs name
+    a function fingerprinting it as their cache_state.
+
+    With more than one worker the user ratings are cleaned and their
+    statistics computed in shards on a process pool, in a single step.
+    Otherwise the statistics can be updated incrementally from the
+    persisted aggregate state, and checked against a full recompute.
+    """
+    if workers > 1:
+        user_ratings_steps = {
+            "clean_user_ratings": {
+                "function": partial(
+                    transform_user_ratings_sharded, workers=workers
+                ),
+                "inputs": ["user_ratings"],
+                "outputs": [
+                    "cleaned_user_ratings",
+                    "movie_rating_statistics",
+                    "user_rating_statistics",
+                ],
+                "cache_state": fingerprint_user_ratings_state,
+            },
+        }
+    else:
+        user_ratings_steps = {
+            "clean_user_ratings": {
+                "function": clean_user_ratings,
+                "inputs": ["user_ratings"],
+                "outputs": ["cleaned_user_ratings"],
+                "cache_state": fingerprint_user_ratings_state,
+            },
+            # Aggregate the user ratings per movie and per user in one pass
+            "compute_rating_statistics": {
+                "function": compute_rating_statistics,
+                "inputs": ["cleaned_user_ratings"],
+                "outputs": [
+                    "movie_rating_statistics",
+                    "user_rating_statistics",
+                ],
+            },
+        }
+        if incremental_statistics or verify_statistics:
+            # Or apply the ratings that changed to the persisted aggregates
+            user_ratings_steps["compute_rating_statistics"].update(
+                {
+                    "function": partial(
+                        update_rating_statistics, verify=verify_statistics
+                    ),
+                    "cache_state": fingerprint_aggregate_state,
+                }
+            )
+    return {
+        "clean_movies": {
+            "function": clean_movies,
+            "inputs": ["movies"],
+            "outputs": ["cleaned_movies"],
+        },
+        "clean_movies_with_ratings": {
+            "function": clean_movies_with_ratings,
+            "inputs": ["movies_with_ratings"],
+            "outputs": ["cleaned_movies_with_ratings"],
+        },
+        **user_ratings_steps,
+        "merge_movies_and_movies_with_ratings": {
+            "function": merge_movies_and_movies_with_ratings,
+            "inputs": ["cleaned_movies", "cleaned_movies_with_ratings"],
+            "outputs": ["merged_movies"],
+            "cache_state": fingerprint_aliases,
+        },
+        # Give each movie its integer key, which the other tables refer to.
+        # Keys are handed out in the order movies are first seen, so the
+        # movies of the user ratings are keyed first, as they always were
+        "add_movie_keys": {
+            "function": add_movie_keys,
+            "inputs": ["merged_movies"],
+            "outputs": ["keyed_movies"],
+            "after": ["clean_user_ratings"],
+            "cache_state": fingerprint_movie_keys_state,
+        },
+        # Encode the genres as a bridge table and a bitmask
+        "encode_genres": {
+            "function": encode_genres,
+            "inputs": ["keyed_movies"],
+            "outputs": ["encoded_movies", "movie_genres"],
+            "cache_state": fingerprint_genres_state,
+        },
+        "enrich_movies_table_with_user_ratings_data": {
+            "function": enrich_movies_table_with_user_ratings_data,
+            "inputs": ["encoded_movies", "movie_rating_statistics"],
+            "outputs": ["enriched_movies"],
+        },
+        "aggregate_user_ratings": {
+            "function": aggregate_user_ratings,
+            "inputs": ["user_rating_statistics"],
+            "outputs": ["aggregated_user_ratings"],
+        },
+        # The slug of every movie key, once both sources have been keyed
+        "build_movie_dimension": {
+            "function": build_movie_dimension,
+            "inputs": [],
+            "outputs": ["movie_keys"],
+            "after": ["clean_user_ratings", "add_movie_keys"],
+            "cache_state": fingerprint_movie_keys_state,
+        },
+    }
+
+
+def cache_transform_steps(steps: dict[str, dict]) -> dict[str, dict]:
+    # Run every step through the step cache
+    return {
+        name: {
+            **step,
+            "cache": cache_step(
+                name, step["function"], step.get("cache_state")
+            ),
+        }
+        for name, step in steps.items()
+    }
+
+
+def transform_data(
+    data,
+    workers: int = 1,
+    max_workers: Optional[int] = None,
+    use_cache: bool = False,
+    incremental_statistics: bool = False,
+    verify_statistics: bool = False,
+) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame,
+           pd.DataFrame]:
+    """
+    Transform the extracted data into the tables to load.
+
+    The steps of get_transform_steps run on a thread pool as soon as their
+    inputs are ready, so the three sources are cleaned at the same time.
+    The whole stage runs with copy-on-write enabled, as the cleaning steps
+    expect, so that no step switches it off while another one is running.
+
+    Args:
+        data (tuple): The movies, movies with ratings and user ratings, as
+        extract_data returns them.
+        workers (int, optional): The number of processes the user ratings
+        are transformed on.
+        max_workers (int, optional): The number of steps run at once.
+        Defaults to one per core.
+        use_cache (bool, optional): Reuse the outputs of steps whose inputs
+        and code have not changed since they were cached.
+        incremental_statistics (bool, optional): Update the rating
+        statistics of the movies and users from the ratings that changed
+        since the last run, rather than from every rating. Only applies
+        with a single worker.
+        verify_statistics (bool, optional): Update the rating statistics
+        incrementally and check them against a full recompute.
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame,
+        pd.DataFrame]: The enriched movies, cleaned user ratings, aggregated
+        user ratings, movie genres and movie keys.
+    """
     try:
         logger.info("Starting data transformation process...")
-        # Clean movies data
-        logger.info("Cleaning movies data...")
-        cleaned_movies = clean_movies(data[0])
-        logger.info("Movies data cleaned successfully.")
-        # Clean movies with ratings data
-        logger.info("Cleaning movies with ratings data...")
-        cleaned_movies_with_ratings = clean_movies_with_ratings(data[1])
-        logger.info("Movies with ratings data cleaned successfully.")
-        # Clean user ratings data
-        logger.info("Cleaning user ratings data...")
-        cleaned_user_ratings = clean_user_ratings(data[2])
-        logger.info("User ratings data cleaned successfully.")
-        # Enrich movies with ratings data
-        logger.info("Merging movies and movies_with_ratings data...")
-        merged_data = merge_movies_and_movies_with_ratings(
-            cleaned_movies, cleaned_movies_with_ratings
-        )
-        logger.info("Data merged successfully.")
-        # Enrich the merged data with user ratings data
-        logger.info("Enriching merged data with user ratings data...")
-        enriched_movies_data = enrich_movies_table_with_user_ratings_data(
-            merged_data, cleaned_user_ratings
-        )
-        logger.info(
-            "Merged data with user ratings data enriched successfully."
-        )
-        # Aggregate user ratings data to a new table
-        logger.info("Aggregating user ratings data...")
-        aggregated_user_ratings = aggregate_user_ratings(cleaned_user_ratings)
-        logger.info("User ratings data aggregated successfully.")
-
-        return (
-            enriched_movies_data, cleaned_user_ratings, aggregated_user_ratings
+        steps = get_transform_steps(
+            workers, incremental_statistics, verify_statistics
         )
+        if use_cache:
+            steps = cache_transform_steps(steps)
+        with pd.option_context("mode.copy_on_write", True):
+            values, _ = run_dag(
+                steps,
+                dict(zip(TRANSFORM_INPUTS, data)),
+                max_workers,
+            )
+        logger.info("Data transformation completed successfully.")
+        return tuple(values[output] for output in TRANSFORM_OUTPUTS)
     except Exception as e:
         logger.error(f"Data transformation failed: {str(e)}")
         raise
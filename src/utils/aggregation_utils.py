@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+
+# Integer keys are used as bin numbers directly while the largest key is at
+# most this many times the number of rows. Sparser keys are factorized first
+# so the bins stay proportional to the data
+DENSE_KEY_FACTOR = 4
+
+
+def encode_keys(keys: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # Turn the keys into bin numbers, and return the key of each bin
+    if (
+        np.issubdtype(keys.dtype, np.integer)
+        and len(keys)
+        and keys.min() >= 0
+        and keys.max() <= DENSE_KEY_FACTOR * len(keys)
+    ):
+        return (
+            keys.astype(np.intp, copy=False),
+            np.arange(keys.max() + 1, dtype=keys.dtype),
+        )
+    codes, uniques = pd.factorize(keys, sort=True)
+    return codes, np.asarray(uniques)
+
+
+def aggregate_by_key(
+    keys: pd.Series, values: pd.Series, variance: bool = False
+) -> pd.DataFrame:
+    """
+    Compute the count, sum and mean, and optionally the sample variance, of
+    the values for each key in one pass, by counting into bins rather than
+    grouping.
+
+    Args:
+        keys (pd.Series): The key of each row, such as movie_key.
+        values (pd.Series): The values to aggregate. Missing values are
+        left out, as groupby does.
+        variance (bool, optional): Also compute the sample variance, which
+        takes a second pass over the values.
+
+    Returns:
+        pd.DataFrame: One row per key in ascending order, with the key
+        column named after keys and the count, sum, mean and variance
+        columns.
+    """
+    key_name = keys.name or "key"
+    keys = keys.to_numpy()
+    values = values.to_numpy(dtype=np.float64, na_value=np.nan)
+    present = ~np.isnan(values)
+    if not present.all():
+        keys, values = keys[present], values[present]
+
+    codes, bin_keys = encode_keys(keys)
+    counts = np.bincount(codes, minlength=len(bin_keys))
+    sums = np.bincount(codes, weights=values, minlength=len(bin_keys))
+    occupied = counts > 0
+    counts, sums = counts[occupied], sums[occupied]
+    means = sums / counts
+
+    aggregates = {
+        "count": counts,
+        "sum": sums,
+        "mean": means,
+    }
+    if variance:
+        # Summing the squared deviations from the mean keeps the variance
+        # accurate for values far from zero
+        bin_means = np.zeros(len(bin_keys))
+        bin_means[occupied] = means
+        squared_deviations = np.bincount(
+            codes,
+            weights=np.square(values - bin_means[codes]),
+            minlength=len(bin_keys),
+        )[occupied]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            aggregates["variance"] = np.where(
+                counts > 1, squared_deviations / (counts - 1), np.nan
+            )
+    return pd.DataFrame({key_name: bin_keys[occupied], **aggregates})
+
+
+def combine_aggregates(
+    partials: list[pd.DataFrame], key_name: str = "key"
+) -> pd.DataFrame:
+    """
+    Combine the counts and sums that aggregate_by_key computed over
+    separate parts of the rows, such as shards, into the aggregates of all
+    of the rows.
+
+    Args:
+        partials (list[pd.DataFrame]): The aggregates of each part, keyed by
+        the same column first, with the count and sum columns.
+        key_name (str, optional): The name of the key column when there are
+        no partials to take it from.
+
+    Returns:
+        pd.DataFrame: One row per key in ascending order, with the combined
+        count, sum and mean columns.
+    """
+    if not partials:
+        return pd.DataFrame(
+            {
+                key_name: np.array([], dtype=np.int64),
+                "count": np.array([], dtype=np.int64),
+                "sum": np.array([], dtype=np.float64),
+                "mean": np.array([], dtype=np.float64),
+            }
+        )
+    partials = pd.concat(partials, ignore_index=True)
+    key_name = partials.columns[0]
+    codes, bin_keys = encode_keys(partials[key_name].to_numpy())
+    counts = np.bincount(
+        codes, weights=partials["count"].to_numpy(), minlength=len(bin_keys)
+    ).astype(np.int64)
+    sums = np.bincount(
+        codes, weights=partials["sum"].to_numpy(), minlength=len(bin_keys)
+    )
+    occupied = counts > 0
+    counts, sums = counts[occupied], sums[occupied]
+    return pd.DataFrame(
+        {
+            key_name: bin_keys[occupied],
+            "count": counts,
+            "sum": sums,
+            "mean": sums / counts,
+        }
+    )
@@ -0,0 +1,188 @@
+import hashlib
+import json
+import logging
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from typing import Optional
+from src.utils.file_utils import ROOT_DIR, restore_arrow_string_categories
+from src.utils.logging_utils import setup_logger
+from src.utils.shard_utils import read_csv_file
+
+# Directory holding the typed Parquet copies of the raw CSV files
+CACHE_DIR = os.path.join(ROOT_DIR, "data", "cache", "raw")
+
+# Size of the blocks read when hashing a source file
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# Configure the logger
+logger = setup_logger(__name__, "extract_data.log", level=logging.DEBUG)
+
+
+def read_csv_with_parquet_cache(
+    file_path: str,
+    cache_dir: str = None,
+    columns: Optional[list[str]] = None,
+    **read_csv_kwargs,
+) -> pd.DataFrame:
+    """
+    Read a CSV file through a Parquet ingestion cache.
+
+    The first read parses the CSV and stores the typed result as Parquet,
+    along with a manifest recording the source path, size, modification
+    time and content hash, and the read options used. Later reads load the
+    Parquet file instead, unless the source or the read options changed.
+
+    The cache always holds every column of the file. When columns are
+    requested, only those are read back from Parquet.
+
+    Args:
+        file_path (str): The path of the CSV file to read, which may be
+        compressed.
+        cache_dir (str, optional): The directory holding the cache.
+        columns (list[str], optional): The columns to return.
+        **read_csv_kwargs: Options passed to pd.read_csv.
+
+    Returns:
+        pd.DataFrame: The contents of the CSV file.
+    """
+    cache_dir = cache_dir or CACHE_DIR
+    parquet_path, manifest_path = get_cache_paths(file_path, cache_dir)
+    options = describe_read_options(read_csv_kwargs)
+
+    manifest = load_manifest(manifest_path)
+    if manifest and is_cache_valid(
+        manifest, file_path, options, parquet_path
+    ):
+        logger.info(f"Loading {file_path} from cache {parquet_path}")
+        if manifest["mtime_ns"] != os.stat(file_path).st_mtime_ns:
+            # Touched but unchanged, so record the new mtime to keep the
+            # next lookup on the fast path
+            manifest["mtime_ns"] = os.stat(file_path).st_mtime_ns
+            save_manifest(manifest, manifest_path)
+        return read_parquet(parquet_path, columns)
+
+    logger.info(f"Cache miss for {file_path}, parsing CSV")
+    df = read_csv_file(file_path, **read_csv_kwargs)
+    try:
+        write_cache(df, file_path, options, parquet_path, manifest_path)
+    except Exception as e:
+        # The cache is only an optimisation, so a failed write must not
+        # fail the extraction
+        logger.warning(f"Failed to cache {file_path}: {e}")
+    return df if columns is None else df[columns]
+
+
+def get_cache_paths(file_path: str, cache_dir: str) -> tuple[str, str]:
+    # Key the cache entry on the absolute path of the source file, keeping
+    # the file name for readability
+    absolute_path = os.path.abspath(file_path)
+    path_hash = hashlib.sha256(absolute_path.encode()).hexdigest()[:12]
+    name = os.path.splitext(os.path.basename(file_path))[0]
+    base_path = os.path.join(cache_dir, f"{name}-{path_hash}")
+    return f"{base_path}.parquet", f"{base_path}.json"
+
+
+def describe_read_options(read_csv_kwargs: dict) -> str:
+    # A stable text form of the read options, so a schema change
+    # invalidates the cached copy
+    return json.dumps(read_csv_kwargs, sort_keys=True, default=str)
+
+
+def hash_file(file_path: str) -> str:
+    file_hash = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b""):
+            file_hash.update(block)
+    return file_hash.hexdigest()
+
+
+def load_manifest(manifest_path: str) -> dict:
+    if not os.path.exists(manifest_path):
+        return {}
+    try:
+        with open(manifest_path) as manifest_file:
+            return json.load(manifest_file)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable cache manifest: {e}")
+        return {}
+
+
+def save_manifest(manifest: dict, manifest_path: str) -> None:
+    temporary_path = f"{manifest_path}.tmp"
+    with open(temporary_path, "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+    os.replace(temporary_path, manifest_path)
+
+
+def is_cache_valid(
+    manifest: dict, file_path: str, options: str, parquet_path: str
+) -> bool:
+    """
+    Check a cache manifest against the current state of the source file.
+
+    The size and modification time are compared first. The content is only
+    hashed when the size matches but the modification time does not, so an
+    unchanged file is recognised without reading it.
+    """
+    if not os.path.exists(parquet_path):
+        return False
+    if manifest.get("options") != options:
+        return False
+    if manifest.get("path") != os.path.abspath(file_path):
+        return False
+    stat = os.stat(file_path)
+    if manifest.get("size") != stat.st_size:
+        return False
+    if manifest.get("mtime_ns") == stat.st_mtime_ns:
+        return True
+    return manifest.get("sha256") == hash_file(file_path)
+
+
+def write_cache(
+    df: pd.DataFrame,
+    file_path: str,
+    options: str,
+    parquet_path: str,
+    manifest_path: str,
+) -> None:
+    os.makedirs(os.path.dirname(parquet_path), exist_ok=True)
+    # Drop the old manifest first so that it can never describe the new
+    # Parquet file if this write is interrupted
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+    stat = os.stat(file_path)
+    # Write to a temporary file first so that an interrupted run never
+    # leaves a partial Parquet file behind a valid manifest
+    temporary_path = f"{parquet_path}.tmp"
+    df.to_parquet(temporary_path, index=False)
+    os.replace(temporary_path, parquet_path)
+    save_manifest(
+        {
+            "path": os.path.abspath(file_path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": hash_file(file_path),
+            "options": options,
+        },
+        manifest_path,
+    )
+    logger.info(f"Cached {file_path} as {parquet_path}")
+
+
+def read_parquet(
+    parquet_path: str, columns: Optional[list[str]] = None
+) -> pd.DataFrame:
+    # Keep string columns and categories in Arrow memory, as the pyarrow
+    # CSV reader does, so a cache hit returns the frame a miss returns
+    df = pq.read_table(parquet_path, columns=columns).to_pandas(
+        types_mapper=arrow_string_dtype
+    )
+    return restore_arrow_string_categories(df)
+
+
+def arrow_string_dtype(arrow_type: pa.DataType):
+    if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+        return pd.ArrowDtype(arrow_type)
+    return None
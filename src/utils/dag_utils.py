@@ -0,0 +1,219 @@
+import logging
+import os
+import timeit
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Optional
+from src.utils.logging_utils import setup_logger
+
+# Configure the logger
+logger = setup_logger(__name__, "transform_data.log", level=logging.DEBUG)
+
+
+def get_step_dependencies(steps: dict[str, dict]) -> dict[str, set[str]]:
+    """
+    Find the steps each step has to wait for: the steps producing its
+    inputs, and the steps it is declared to run after.
+
+    Each step is a dict with the function to run, the names of its inputs
+    and of its outputs, and optionally the names of steps it must run
+    after although it does not read their outputs. Inputs that no step
+    produces are given to run_dag. A step can also have a cache, as
+    step_cache_utils.cache_step returns, which is run in place of its
+    function.
+
+    Raises:
+        ValueError: If an output is produced by more than one step, a step
+        runs after an unknown step, or the steps form a cycle.
+    """
+    producers = {}
+    for name, step in steps.items():
+        for output in step["outputs"]:
+            if output in producers:
+                raise ValueError(
+                    f"{output} is produced by both {producers[output]} and "
+                    f"{name}"
+                )
+            producers[output] = name
+
+    dependencies = {}
+    for name, step in steps.items():
+        unknown = set(step.get("after", [])) - set(steps)
+        if unknown:
+            raise ValueError(f"{name} runs after unknown steps {unknown}")
+        dependencies[name] = {
+            producers[value]
+            for value in step["inputs"]
+            if value in producers
+        } | set(step.get("after", []))
+
+    # Remove the steps without dependencies until none are left, which
+    # leaves the steps of a cycle behind
+    remaining = {name: set(needed) for name, needed in dependencies.items()}
+    while remaining:
+        ready = [name for name, needed in remaining.items() if not needed]
+        if not ready:
+            raise ValueError(
+                f"The steps {sorted(remaining)} depend on each other"
+            )
+        for name in ready:
+            del remaining[name]
+        for needed in remaining.values():
+            needed.difference_update(ready)
+    return dependencies
+
+
+def run_step(
+    step: dict, values: dict[str, Any], keys: dict[str, str]
+) -> tuple[Any, Optional[list[str]], float]:
+    # Run a step on its inputs and return its result, the cache keys of its
+    # outputs and its duration
+    start_time = timeit.default_timer()
+    args = [values[value] for value in step["inputs"]]
+    if "cache" in step:
+        result, output_keys = step["cache"](
+            args, [keys.get(value) for value in step["inputs"]]
+        )
+    else:
+        result, output_keys = step["function"](*args), None
+    return result, output_keys, timeit.default_timer() - start_time
+
+
+def store_outputs(
+    step: dict,
+    result: Any,
+    output_keys: Optional[list[str]],
+    values: dict[str, Any],
+    keys: dict[str, str],
+) -> None:
+    # A step with several outputs returns them as a tuple, in order
+    outputs = result if len(step["outputs"]) > 1 else (result,)
+    for output, value in zip(step["outputs"], outputs):
+        values[output] = value
+    for output, key in zip(step["outputs"], output_keys or []):
+        keys[output] = key
+
+
+def run_dag(
+    steps: dict[str, dict],
+    inputs: dict[str, Any],
+    max_workers: Optional[int] = None,
+) -> tuple[dict[str, Any], dict[str, float]]:
+    """
+    Run the steps of a dependency graph, each as soon as the steps it
+    depends on have finished, on a thread pool.
+
+    If a step fails, the steps that have not started are cancelled and the
+    error is raised once the running steps have finished.
+
+    Args:
+        steps (dict[str, dict]): The steps by name, as described in
+        get_step_dependencies.
+        inputs (dict[str, Any]): The values the steps start from, by name.
+        max_workers (int, optional): The number of steps run at once.
+        Defaults to one per core.
+
+    Returns:
+        tuple[dict[str, Any], dict[str, float]]: The inputs together with
+        the outputs of every step, and the duration of each step in
+        seconds.
+    """
+    dependencies = get_step_dependencies(steps)
+    missing = {
+        value
+        for step in steps.values()
+        for value in step["inputs"]
+        if value not in inputs
+        and not any(value in other["outputs"] for other in steps.values())
+    }
+    if missing:
+        raise ValueError(f"Missing inputs for the steps: {sorted(missing)}")
+
+    values = dict(inputs)
+    keys = {}
+    durations = {}
+    waiting = {name: set(needed) for name, needed in dependencies.items()}
+    start_time = timeit.default_timer()
+    with ThreadPoolExecutor(
+        max_workers=max_workers or os.cpu_count() or 1,
+        thread_name_prefix="transform",
+    ) as executor:
+        running = {}
+        while waiting or running:
+            for name in [name for name, needed in waiting.items()
+                         if not needed]:
+                del waiting[name]
+                logger.info(f"Starting step {name}")
+                future = executor.submit(run_step, steps[name], values, keys)
+                running[future] = name
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                if future.exception() is not None:
+                    logger.error(f"Step {name} failed: {future.exception()}")
+                    for pending in running:
+                        pending.cancel()
+                    raise future.exception()
+                result, output_keys, durations[name] = future.result()
+                store_outputs(steps[name], result, output_keys, values, keys)
+                logger.info(
+                    f"Finished step {name} in {durations[name]:.3f} seconds"
+                )
+                for needed in waiting.values():
+                    needed.discard(name)
+
+    log_dag_timings(
+        dependencies, durations, timeit.default_timer() - start_time
+    )
+    return values, durations
+
+
+def find_critical_path(
+    dependencies: dict[str, set[str]], durations: dict[str, float]
+) -> tuple[list[str], float]:
+    """
+    Find the chain of dependent steps that took the longest in total,
+    which bounds how fast the graph can run however many workers it has.
+
+    Returns:
+        tuple[list[str], float]: The steps of the path in order, and their
+        summed duration.
+    """
+    finish_times = {}
+    previous = {}
+
+    def finish_time(name: str) -> float:
+        if name not in finish_times:
+            slowest = max(
+                dependencies[name], key=finish_time, default=None
+            )
+            previous[name] = slowest
+            finish_times[name] = durations[name] + (
+                finish_time(slowest) if slowest else 0.0
+            )
+        return finish_times[name]
+
+    if not dependencies:
+        return [], 0.0
+    last = max(dependencies, key=finish_time)
+    path = [last]
+    while previous[path[-1]]:
+        path.append(previous[path[-1]])
+    return path[::-1], finish_times[last]
+
+
+def log_dag_timings(
+    dependencies: dict[str, set[str]],
+    durations: dict[str, float],
+    wall_clock_time: float,
+) -> None:
+    critical_path, critical_time = find_critical_path(dependencies, durations)
+    summed_time = sum(durations.values())
+    speedup = summed_time / wall_clock_time if wall_clock_time else 1.0
+    logger.info(
+        f"Critical path: {' -> '.join(critical_path)} "
+        f"({critical_time:.3f} seconds)"
+    )
+    logger.info(
+        f"Wall-clock time: {wall_clock_time:.3f} seconds, summed per-step "
+        f"time: {summed_time:.3f} seconds (speedup {speedup:.2f}x)"
+    )
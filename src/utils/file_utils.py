@@ -1,5 +1,9 @@
+import json
 import os
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from src.utils.list_utils import format_string_lists, is_string_list_column
 
 
 def find_project_root(marker_file="README.md"):
@@ -26,6 +30,9 @@ ROOT_DIR = find_project_root()
 INDEXES_PATH = os.path.join(ROOT_DIR, "etl", "sql", "indexes")
 QUERY_PATH = os.path.join(ROOT_DIR, "etl", "sql")
 
+# Compression of the Parquet files of the processed tables
+PARQUET_COMPRESSION = "zstd"
+
 
 def save_dataframe_to_csv(
     df: pd.DataFrame, relative_output_dir: str, filename: str
@@ -40,5 +47,97 @@ def save_dataframe_to_csv(
     """
     output_dir = os.path.join(ROOT_DIR, relative_output_dir)
     os.makedirs(output_dir, exist_ok=True)
-    df.to_csv(os.path.join(output_dir, filename), index=False)
+    write_dataframe_to_csv(df, os.path.join(output_dir, filename))
+    print(f"Data saved to {os.path.join(output_dir, filename)}")
+
+
+def write_dataframe_to_csv(df: pd.DataFrame, output_path: str) -> None:
+    # Arrow list columns are written the way Python prints a list, as the
+    # object list columns they replaced were
+    list_columns = [
+        column for column in df.columns if is_string_list_column(df[column])
+    ]
+    if list_columns:
+        df = df.assign(
+            **{column: format_string_lists(df[column])
+               for column in list_columns}
+        )
+    df.to_csv(output_path, index=False)
+
+
+def save_dataframe_to_parquet(
+    df: pd.DataFrame, relative_output_dir: str, filename: str
+) -> None:
+    """
+    Save a pandas DataFrame to a compressed Parquet file, which keeps the
+    type of each column.
+
+    Args:
+        df (pd.DataFrame): The DataFrame to save.
+        output_dir (str): The directory to save the file to.
+        filename (str): The name of the file to save.
+    """
+    output_dir = os.path.join(ROOT_DIR, relative_output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    write_dataframe_to_parquet(df, os.path.join(output_dir, filename))
     print(f"Data saved to {os.path.join(output_dir, filename)}")
+
+
+def write_dataframe_to_parquet(df: pd.DataFrame, output_path: str) -> None:
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    # pandas cannot parse the type it records for Arrow list columns, so
+    # they are recorded as object columns, which pd.read_parquet reads as
+    # arrays and read_dataframe_from_parquet as Arrow lists again
+    pandas_metadata = table.schema.pandas_metadata
+    for column in pandas_metadata["columns"]:
+        if column["name"] in df and is_string_list_column(df[column["name"]]):
+            column["numpy_type"] = "object"
+    table = table.replace_schema_metadata(
+        {
+            **table.schema.metadata,
+            b"pandas": json.dumps(pandas_metadata).encode(),
+        }
+    )
+    pq.write_table(table, output_path, compression=PARQUET_COMPRESSION)
+
+
+def read_dataframe_from_parquet(file_path: str) -> pd.DataFrame:
+    """
+    Read a Parquet file written by save_dataframe_to_parquet, with list
+    and string columns as Arrow lists and strings, as the transform steps
+    produce them.
+
+    Args:
+        file_path (str): The Parquet file.
+
+    Returns:
+        pd.DataFrame: The saved DataFrame.
+    """
+    df = pq.read_table(file_path).to_pandas(
+        types_mapper=get_arrow_backed_dtype
+    )
+    return restore_arrow_string_categories(df)
+
+
+def restore_arrow_string_categories(df: pd.DataFrame) -> pd.DataFrame:
+    # The categories of categorical columns are read from Parquet as
+    # objects, where the pyarrow CSV reader gives them as Arrow strings
+    for column in df.columns:
+        if isinstance(df[column].dtype, pd.CategoricalDtype) and (
+            df[column].cat.categories.dtype == object
+        ):
+            df[column] = df[column].cat.rename_categories(
+                df[column].cat.categories.astype(pd.ArrowDtype(pa.string()))
+            )
+    return df
+
+
+def get_arrow_backed_dtype(arrow_type: pa.DataType):
+    # Lists and strings stay in Arrow memory rather than becoming objects
+    if (
+        pa.types.is_list(arrow_type)
+        or pa.types.is_string(arrow_type)
+        or pa.types.is_large_string(arrow_type)
+    ):
+        return pd.ArrowDtype(arrow_type)
+    return None
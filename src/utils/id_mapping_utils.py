@@ -0,0 +1,113 @@
+import glob
+import os
+import numpy as np
+import pandas as pd
+from src.utils.watermark_utils import STATE_DIR
+
+# Directory of the persisted id mappings, one subdirectory per mapping
+ID_MAPPING_DIR = os.path.join(STATE_DIR, "id_mappings")
+
+# Each run that assigns new ids appends them as a new part file, so ids that
+# were handed out are never rewritten
+PART_PATTERN = "part-*.parquet"
+
+ID_DTYPE = np.int64
+
+
+def get_mapping_dir(name: str, mapping_dir: str = None) -> str:
+    return os.path.join(mapping_dir or ID_MAPPING_DIR, name)
+
+
+def load_id_mapping(name: str, mapping_dir: str = None) -> pd.DataFrame:
+    """
+    Load every key and id assigned so far by a mapping.
+
+    Returns:
+        pd.DataFrame: The key and id columns, in the order the ids were
+        assigned. Empty when the mapping has not been used yet.
+    """
+    directory = get_mapping_dir(name, mapping_dir)
+    parts = sorted(glob.glob(os.path.join(directory, PART_PATTERN)))
+    if not parts:
+        return pd.DataFrame(
+            {
+                "key": pd.Series(dtype=object),
+                "id": pd.Series(dtype=ID_DTYPE),
+            }
+        )
+    return pd.concat(
+        (pd.read_parquet(part) for part in parts), ignore_index=True
+    )
+
+
+def append_id_mapping(
+    name: str, new_ids: pd.DataFrame, mapping_dir: str = None
+) -> str:
+    # Written under a hidden name first so a partly written part file is
+    # never read back
+    directory = get_mapping_dir(name, mapping_dir)
+    os.makedirs(directory, exist_ok=True)
+    part_number = len(glob.glob(os.path.join(directory, PART_PATTERN)))
+    part_path = os.path.join(directory, f"part-{part_number:06d}.parquet")
+    temporary_path = os.path.join(directory, f".part-{part_number:06d}.tmp")
+    new_ids.to_parquet(temporary_path, index=False)
+    os.replace(temporary_path, part_path)
+    return part_path
+
+
+def map_to_persistent_ids(
+    keys: pd.Series, name: str, mapping_dir: str = None
+) -> pd.Series:
+    """
+    Replace each key with the integer id the named mapping gave it. Keys
+    seen for the first time get the next free ids, in order of first
+    appearance, and are appended to the mapping, so a key keeps its id
+    from one run to the next.
+
+    The keys are factorized once and only the distinct keys are looked up
+    in the mapping, so the cost per row is an array take.
+
+    Args:
+        keys (pd.Series): The keys to map, without missing values.
+        name (str): The name of the mapping, such as user_id.
+        mapping_dir (str, optional): The directory holding the mappings.
+
+    Returns:
+        pd.Series: The ids, with the index of keys.
+    """
+    codes, uniques = pd.factorize(keys)
+    if (codes < 0).any():
+        raise ValueError(f"Cannot map missing {name} values to ids")
+    mapping = load_id_mapping(name, mapping_dir)
+    positions = pd.Index(mapping["key"]).get_indexer(uniques)
+    unique_ids = np.empty(len(uniques), dtype=ID_DTYPE)
+    known = positions >= 0
+    unique_ids[known] = mapping["id"].to_numpy()[positions[known]]
+
+    new_count = int((~known).sum())
+    if new_count:
+        next_id = int(mapping["id"].max()) + 1 if len(mapping) else 1
+        unique_ids[~known] = np.arange(
+            next_id, next_id + new_count, dtype=ID_DTYPE
+        )
+        append_id_mapping(
+            name,
+            pd.DataFrame(
+                {
+                    "key": np.asarray(uniques, dtype=object)[~known],
+                    "id": unique_ids[~known],
+                }
+            ),
+            mapping_dir,
+        )
+    return pd.Series(unique_ids[codes], index=keys.index, name=keys.name)
+
+
+def fingerprint_id_mapping(name: str, mapping_dir: str = None) -> str:
+    # The part files are only ever added, so their names and sizes tell
+    # every state of a mapping apart
+    directory = get_mapping_dir(name, mapping_dir)
+    parts = sorted(glob.glob(os.path.join(directory, PART_PATTERN)))
+    return ",".join(
+        f"{os.path.basename(part)}:{os.path.getsize(part)}" for part in parts
+    )
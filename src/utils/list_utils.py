@@ -0,0 +1,185 @@
+import ast
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+STRING_LIST_TYPE = pa.list_(pa.string())
+
+# A list of quoted strings without escapes or commas inside the quotes, as
+# written by the scraper (["Crime","Mystery"]) or by pandas when a list
+# column is saved to CSV (['Crime', 'Mystery']). Anything else is parsed
+# row by row
+SIMPLE_LIST_PATTERN = (
+    r"""^\[\s*(?:(?:"[^"\\,]*"|'[^'\\,]*')"""
+    r"""(?:\s*,\s*(?:"[^"\\,]*"|'[^'\\,]*'))*)?\s*\]$"""
+)
+
+
+def is_string_list_column(series: pd.Series) -> bool:
+    return isinstance(series.dtype, pd.ArrowDtype) and pa.types.is_list(
+        series.dtype.pyarrow_dtype
+    )
+
+
+def to_arrow_strings(series: pd.Series) -> pa.Array:
+    # Values that are not strings (missing values, or lists that were
+    # already parsed) are treated as missing, as literal_eval was only
+    # applied to strings
+    try:
+        strings = pa.array(series, type=pa.string(), from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        strings = pa.array(
+            series.where(series.map(lambda value: isinstance(value, str))),
+            type=pa.string(),
+            from_pandas=True,
+        )
+    if isinstance(strings, pa.ChunkedArray):
+        strings = strings.combine_chunks()
+    return strings.cast(pa.string())
+
+
+def parse_string_lists(
+    series: pd.Series, drop_empty: bool = False
+) -> pd.Series:
+    """
+    Parse a column of list literals such as ["Crime","Mystery"] into an
+    Arrow list column in one vectorised pass.
+
+    Missing values and empty strings become empty lists. Rows that are not
+    a plain list of quoted strings fall back to ast.literal_eval.
+
+    Args:
+        series (pd.Series): The list literals.
+        drop_empty (bool, optional): Remove empty strings from the lists.
+
+    Returns:
+        pd.Series: A list<string> column with the same index.
+    """
+    # Each intermediate array is released as soon as the next one is built,
+    # so only a couple of copies of the column are held at once
+    strings = to_arrow_strings(series)
+    strings = pc.fill_null(strings, "[]")
+    strings = pc.if_else(pc.equal(strings, ""), "[]", strings)
+    length = len(strings)
+
+    irregular = pc.invert(
+        pc.match_substring_regex(strings, SIMPLE_LIST_PATTERN)
+    )
+    irregular_lists = None
+    if pc.any(irregular).as_py():
+        irregular_lists = parse_irregular_lists(
+            strings, irregular, drop_empty
+        )
+
+    # Split the text between the brackets on commas, and strip the
+    # whitespace and the quotes around each item
+    parts = pc.split_pattern(
+        pc.utf8_slice_codeunits(pc.utf8_trim_whitespace(strings), 1, -1),
+        ",",
+    )
+    del strings
+    parent_indices = pc.list_parent_indices(parts)
+    items = pc.utf8_trim_whitespace(pc.list_flatten(parts))
+    del parts
+    # An empty list splits into a single blank item
+    keep = pc.greater(pc.utf8_length(items), 0)
+    values = pc.utf8_slice_codeunits(items, 1, -1)
+    del items
+    if drop_empty:
+        keep = pc.and_(keep, pc.greater(pc.utf8_length(values), 0))
+
+    lists = build_lists(parent_indices, values, keep, length)
+    del values
+    if irregular_lists is not None:
+        lists = pc.if_else(irregular, irregular_lists, lists)
+    return pd.Series(
+        pd.arrays.ArrowExtensionArray(lists), index=series.index
+    )
+
+
+def parse_irregular_lists(
+    strings: pa.Array, irregular: pa.Array, drop_empty: bool
+) -> pa.Array:
+    # Only the rows that need it are evaluated in Python
+    lists = [None] * len(strings)
+    for position in np.flatnonzero(irregular.to_numpy(zero_copy_only=False)):
+        items = ast.literal_eval(strings[position].as_py())
+        lists[position] = [
+            item for item in items if not (drop_empty and item == "")
+        ]
+    return pa.array(lists, type=STRING_LIST_TYPE)
+
+
+def build_lists(
+    parent_indices: pa.Array, values: pa.Array, keep: pa.Array, length: int
+) -> pa.ListArray:
+    # Assemble a list array from the kept items, given the row each item
+    # came from, by recomputing the offsets
+    row_counts = np.bincount(
+        pc.filter(parent_indices, keep).to_numpy(), minlength=length
+    )
+    offsets = np.zeros(length + 1, dtype=np.int32)
+    np.cumsum(row_counts, out=offsets[1:])
+    return pa.ListArray.from_arrays(
+        pa.array(offsets), pc.filter(values, keep)
+    )
+
+
+def to_arrow_lists(series: pd.Series) -> pa.ListArray:
+    lists = pa.array(series)
+    if isinstance(lists, pa.ChunkedArray):
+        lists = lists.combine_chunks()
+    return lists
+
+
+def remove_empty_strings(series: pd.Series) -> pd.Series:
+    # Filter the empty strings out of an Arrow list column
+    lists = to_arrow_lists(series)
+    values = pc.list_flatten(lists)
+    return pd.Series(
+        pd.arrays.ArrowExtensionArray(
+            build_lists(
+                pc.list_parent_indices(lists),
+                values,
+                pc.greater(pc.utf8_length(values), 0),
+                len(lists),
+            )
+        ),
+        index=series.index,
+    )
+
+
+def format_string_lists(series: pd.Series) -> pd.Series:
+    """
+    Write an Arrow list column in the form Python prints a list, such as
+    ['Crime', 'Mystery'], which is how list columns have always been saved
+    to CSV.
+    """
+    lists = to_arrow_lists(series)
+    formatted = pc.if_else(
+        pc.equal(pc.list_value_length(lists), 0),
+        "[]",
+        pc.binary_join_element_wise(
+            "['", pc.binary_join(lists, "', '"), "']", ""
+        ),
+    ).to_numpy(zero_copy_only=False)
+    # repr escapes items with quotes or backslashes, so those rows are
+    # formatted in Python
+    values = pc.list_flatten(lists)
+    escaped_rows = np.unique(
+        pc.filter(
+            pc.list_parent_indices(lists),
+            pc.match_substring_regex(values, r"['\\]"),
+        ).to_numpy()
+    )
+    for position in escaped_rows:
+        formatted[position] = repr(lists[position].as_py())
+    return pd.Series(formatted, index=series.index, dtype=object)
+
+
+def to_python_lists(series: pd.Series) -> pd.Series:
+    # Database drivers adapt Python lists, not Arrow ones
+    return pd.Series(
+        to_arrow_lists(series).to_pylist(), index=series.index, dtype=object
+    )
@@ -1,6 +1,12 @@
 from pathlib import Path
 import logging
 import os
+from config.metrics_config import load_extract_thresholds
+from src.utils.metrics_utils import (
+    build_extract_metrics,
+    check_extract_thresholds,
+    write_extract_metrics,
+)
 
 
 def _ensure_log_directory(base_path=None):
@@ -60,19 +66,56 @@ def setup_logger(name, log_file, level=logging.DEBUG, base_path=None):
     return logger
 
 
-def log_extract_success(logger, type, shape, execution_time, expected_rate):
-    logger.setLevel(logging.INFO)
+def log_extract_success(
+    logger, type, shape, execution_time, measurement=None, thresholds=None
+):
+    """
+    Log a successful extraction and record its metrics.
+
+    The metrics (throughput, I/O and parse time, memory growth) are
+    appended to the metrics file of the current run, and a warning is
+    logged for every configured threshold they breach.
+
+    Args:
+        logger: The logger of the extractor.
+        type (str): The extracted source.
+        shape (tuple): The number of rows and columns extracted.
+        execution_time (float): The extraction time in seconds.
+        measurement (dict, optional): The readings taken by
+        start_extract_measurement when the extraction started.
+        thresholds (dict, optional): The thresholds to check. Defaults to
+        the ones configured in the environment.
+
+    Returns:
+        dict: The metrics of the extraction.
+    """
+    metrics = build_extract_metrics(type, shape, execution_time, measurement)
+    write_extract_metrics(metrics)
+
     logger.info(f"Data extraction successful for {type}!")
     logger.info(f"Extracted {shape[0]} rows " f"and {shape[1]} columns")
     logger.info(f"Execution time: {execution_time} seconds")
-
-    if execution_time / shape[0] <= expected_rate:
+    if metrics["seconds_per_row"] is not None:
         logger.info(
-            "Execution time per row: " f"{execution_time / shape[0]} seconds"
+            f"Execution time per row: {metrics['seconds_per_row']} seconds"
         )
-    else:
-        logger.setLevel(logging.WARNING)
-        logger.warning(
-            f"Execution time per row exceeds {expected_rate}: "
-            f"{execution_time / shape[0]} seconds"
+    if metrics["rows_per_second"] is not None:
+        logger.info(f"Throughput: {metrics['rows_per_second']:.0f} rows/s")
+    if metrics["mb_per_second"] is not None:
+        logger.info(f"Throughput: {metrics['mb_per_second']:.1f} MB/s")
+    if metrics["io_seconds"] is not None:
+        logger.info(
+            f"I/O time: {metrics['io_seconds']:.3f} seconds, "
+            f"parse time: {metrics['parse_seconds']:.3f} seconds"
         )
+    if metrics["peak_rss_delta_mb"] is not None:
+        logger.info(
+            f"Resident memory growth: {metrics['rss_delta_mb']:.1f} MB, "
+            f"peak growth: {metrics['peak_rss_delta_mb']:.1f} MB"
+        )
+
+    if thresholds is None:
+        thresholds = load_extract_thresholds()
+    for breach in check_extract_thresholds(metrics, thresholds):
+        logger.warning(f"Extraction of {type} is below expectations: {breach}")
+    return metrics
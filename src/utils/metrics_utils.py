@@ -0,0 +1,312 @@
+import json
+import os
+import resource
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Iterator, Optional
+import psutil
+import pyarrow as pa
+from config.metrics_config import load_time_file_reads
+from src.utils.file_utils import ROOT_DIR
+from src.utils.shard_utils import resolve_input_files
+
+# Directory holding one metrics file per pipeline run
+METRICS_DIR = os.path.join(ROOT_DIR, "data", "metrics")
+
+# Size of the blocks read when timing the raw file reads
+READ_BLOCK_SIZE = 1024 * 1024
+
+# Files Linux reports and resets the peak resident memory of the process
+# through
+CLEAR_REFS_PATH = "/proc/self/clear_refs"
+PROC_STATUS_PATH = "/proc/self/status"
+
+# The run that metrics are currently recorded for. Extractors run on
+# several threads at once, so writes to the metrics file are serialised
+current_run = {"id": None}
+metrics_lock = threading.Lock()
+
+# The peak resident memory of the process, in kilobytes, from before
+# measure_peak_memory last reset it
+peak_rss_before_reset = {"kb": 0}
+
+
+def start_metrics_run(run_id: Optional[str] = None) -> str:
+    """
+    Start recording metrics for a new run, in a file of its own.
+
+    Returns:
+        str: The id of the run, which names its metrics file.
+    """
+    run_id = run_id or datetime.now(timezone.utc).strftime(
+        "%Y%m%dT%H%M%S%fZ"
+    )
+    current_run["id"] = run_id
+    return run_id
+
+
+def get_metrics_path(run_id: str, metrics_dir: str = None) -> str:
+    return os.path.join(
+        metrics_dir or METRICS_DIR, f"extract_metrics_{run_id}.jsonl"
+    )
+
+
+def time_file_reads(file_path: str) -> tuple[Optional[int], Optional[float]]:
+    # Read the raw bytes once so that the time spent on I/O can be told
+    # apart from the time spent parsing, which then reads the bytes from
+    # the page cache. The split is best effort, so unreadable inputs are
+    # reported as unknown and left for the parser to fail on
+    buffer = bytearray(READ_BLOCK_SIZE)
+    bytes_read = 0
+    start_time = time.perf_counter()
+    try:
+        for part in resolve_input_files(file_path):
+            with open(part, "rb", buffering=0) as file:
+                while True:
+                    block_size = file.readinto(buffer)
+                    if not block_size:
+                        break
+                    bytes_read += block_size
+    except OSError:
+        return None, None
+    return bytes_read, time.perf_counter() - start_time
+
+
+def get_input_bytes(file_path: str) -> Optional[int]:
+    # The size of every file a streamed source is parsed from
+    try:
+        return sum(
+            os.path.getsize(part) for part in resolve_input_files(file_path)
+        )
+    except OSError:
+        return None
+
+
+def start_extract_measurement(
+    file_path: Optional[str] = None, time_reads: Optional[bool] = None
+) -> dict:
+    """
+    Take the memory readings, and optionally time the raw file reads, at
+    the start of an extraction.
+
+    Resident memory is measured for the whole process, so sources that are
+    extracted at the same time share their memory deltas.
+
+    Args:
+        file_path (str, optional): The file, or glob of part files, about
+        to be parsed, whose size is recorded as the bytes read.
+        time_reads (bool, optional): Read the bytes of the file once more
+        to time the I/O apart from the parse. Defaults to the
+        EXTRACT_TIME_FILE_READS setting, which is off, as it doubles the
+        reads of every extraction.
+
+    Returns:
+        dict: The readings, to pass to log_extract_success.
+    """
+    measurement = {
+        "rss_bytes": psutil.Process().memory_info().rss,
+        "peak_rss_kb": get_process_peak_rss_kb(),
+        "bytes_read": None,
+        "io_seconds": None,
+    }
+    if not file_path:
+        return measurement
+    if time_reads is None:
+        time_reads = load_time_file_reads()
+    if time_reads:
+        measurement["bytes_read"], measurement["io_seconds"] = (
+            time_file_reads(file_path)
+        )
+    else:
+        measurement["bytes_read"] = get_input_bytes(file_path)
+    return measurement
+
+
+def build_extract_metrics(
+    source: str,
+    shape: tuple,
+    execution_time: float,
+    measurement: Optional[dict] = None,
+) -> dict:
+    """
+    Build the metrics record of an extraction.
+
+    Args:
+        source (str): The extracted source.
+        shape (tuple): The number of rows and columns extracted.
+        execution_time (float): The extraction time in seconds.
+        measurement (dict, optional): The readings taken by
+        start_extract_measurement, with any bytes_read or io_seconds the
+        extractor measured itself.
+
+    Returns:
+        dict: The throughput, time split and memory growth of the
+        extraction. Values that were not measured are None.
+    """
+    measurement = measurement or {}
+    rows, columns = shape
+    bytes_read = measurement.get("bytes_read")
+    io_seconds = measurement.get("io_seconds")
+    metrics = {
+        "run_id": current_run["id"],
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "source": source,
+        "rows": rows,
+        "columns": columns,
+        "seconds": execution_time,
+        "seconds_per_row": execution_time / rows if rows else None,
+        "rows_per_second": rows / execution_time if execution_time else None,
+        "bytes_read": bytes_read,
+        "mb_per_second": (
+            bytes_read / 1e6 / execution_time
+            if bytes_read is not None and execution_time
+            else None
+        ),
+        "io_seconds": io_seconds,
+        "parse_seconds": (
+            max(execution_time - io_seconds, 0.0)
+            if io_seconds is not None
+            else None
+        ),
+        "rss_delta_mb": None,
+        "peak_rss_delta_mb": None,
+    }
+    if "rss_bytes" in measurement:
+        metrics["rss_delta_mb"] = (
+            psutil.Process().memory_info().rss - measurement["rss_bytes"]
+        ) / 1e6
+    if "peak_rss_kb" in measurement:
+        metrics["peak_rss_delta_mb"] = (
+            get_process_peak_rss_kb() - measurement["peak_rss_kb"]
+        ) / 1e3
+    return metrics
+
+
+def check_extract_thresholds(metrics: dict, thresholds: dict) -> list[str]:
+    """
+    Compare extraction metrics with the configured thresholds.
+
+    Returns:
+        list[str]: A description of every threshold that was breached.
+    """
+    checks = [
+        ("seconds_per_row", "max_seconds_per_row", "exceeds"),
+        ("rows_per_second", "min_rows_per_second", "is below"),
+        ("mb_per_second", "min_mb_per_second", "is below"),
+        ("peak_rss_delta_mb", "max_rss_delta_mb", "exceeds"),
+    ]
+    breaches = []
+    for metric, threshold_name, comparison in checks:
+        value = metrics.get(metric)
+        threshold = thresholds.get(threshold_name)
+        if value is None or threshold is None:
+            continue
+        if (comparison == "exceeds" and value > threshold) or (
+            comparison == "is below" and value < threshold
+        ):
+            breaches.append(f"{metric} {comparison} {threshold}: {value}")
+    return breaches
+
+
+def write_extract_metrics(metrics: dict, metrics_dir: str = None) -> str:
+    """
+    Append a metrics record to the metrics file of the current run, as one
+    JSON object per line.
+
+    Returns:
+        str: The path of the metrics file.
+    """
+    with metrics_lock:
+        run_id = current_run["id"] or start_metrics_run()
+        metrics_path = get_metrics_path(run_id, metrics_dir)
+        os.makedirs(os.path.dirname(metrics_path), exist_ok=True)
+        with open(metrics_path, "a") as metrics_file:
+            metrics_file.write(
+                json.dumps({**metrics, "run_id": run_id}) + "\n"
+            )
+    return metrics_path
+
+
+def get_process_peak_rss_kb() -> int:
+    # The peak resident memory since the process started, which the resets
+    # of measure_peak_memory do not lower. ru_maxrss is reported in
+    # kilobytes on Linux
+    return max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        peak_rss_before_reset["kb"],
+    )
+
+
+def reset_peak_rss() -> bool:
+    # Linux resets the peak resident memory of the process when 5 is
+    # written to clear_refs. The peak so far is kept for
+    # get_process_peak_rss_kb first
+    peak_rss_before_reset["kb"] = get_process_peak_rss_kb()
+    try:
+        with open(CLEAR_REFS_PATH, "w") as clear_refs:
+            clear_refs.write("5")
+    except OSError:
+        return False
+    return True
+
+
+def read_peak_rss() -> int:
+    # The peak resident memory since the last reset, in bytes
+    with open(PROC_STATUS_PATH) as status:
+        for line in status:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) * 1024
+    raise OSError("VmHWM is missing from the process status")
+
+
+@contextmanager
+def measure_peak_memory() -> Iterator[dict]:
+    """
+    Measure the memory taken by the code run inside the block.
+
+    On Linux the peak resident memory of the process is reset at the start
+    of the block, so everything is counted, including the Arrow buffers.
+    The peak from before the reset is kept, so the process peak that the
+    extract metrics read is not lowered by it.
+    Elsewhere the allocations made through Python and numpy are traced
+    instead.
+
+    Yields:
+        dict: Filled in when the block exits with peak_bytes, the most
+        memory held at once above the start, and retained_bytes, the
+        memory still held at the end.
+    """
+    memory = {}
+    process = psutil.Process()
+    # Arrow keeps freed memory for reuse, which would otherwise be counted
+    # against the block that allocated it and hidden from the blocks after
+    arrow_pool = pa.default_memory_pool()
+    arrow_pool.release_unused()
+    if reset_peak_rss():
+        start_bytes = process.memory_info().rss
+        try:
+            yield memory
+        finally:
+            memory["peak_bytes"] = read_peak_rss() - start_bytes
+            arrow_pool.release_unused()
+            memory["retained_bytes"] = (
+                process.memory_info().rss - start_bytes
+            )
+        return
+
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    start_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    try:
+        yield memory
+    finally:
+        current_bytes, peak_bytes = tracemalloc.get_traced_memory()
+        if started_tracing:
+            tracemalloc.stop()
+        memory["peak_bytes"] = peak_bytes - start_bytes
+        memory["retained_bytes"] = current_bytes - start_bytes
@@ -0,0 +1,202 @@
+import hashlib
+import json
+import os
+from typing import Optional
+from src.utils.cache_utils import hash_file
+from src.utils.file_utils import ROOT_DIR
+from src.utils.shard_utils import resolve_input_files
+from src.utils.watermark_utils import STATE_DIR
+
+# Manifest of the last successful pipeline run, one per run target
+RUN_MANIFEST_NAME = "run_manifest"
+
+# Directories whose Python files make up the pipeline code fingerprint
+CODE_DIRS = ("src", "config", "scripts")
+
+# The settings of the target database that tell one database from another
+TARGET_IDENTITY_KEYS = ("host", "port", "dbname", "schema")
+
+
+def get_run_target(env: str, target_database: dict) -> dict:
+    # The environment and the database a run loads, without credentials.
+    # Runs are only compared with earlier runs into the same target
+    return {
+        "env": env,
+        **{
+            key: str(target_database.get(key, ""))
+            for key in TARGET_IDENTITY_KEYS
+        },
+    }
+
+
+def get_run_manifest_path(
+    state_dir: str = None, target: Optional[dict] = None
+) -> str:
+    state_dir = state_dir or STATE_DIR
+    if target is None:
+        return os.path.join(state_dir, f"{RUN_MANIFEST_NAME}.json")
+    target_id = hashlib.sha256(
+        json.dumps(target, sort_keys=True).encode()
+    ).hexdigest()[:16]
+    return os.path.join(
+        state_dir, f"{RUN_MANIFEST_NAME}_{target['env']}_{target_id}.json"
+    )
+
+
+def load_run_manifest(
+    state_dir: str = None, target: Optional[dict] = None
+) -> dict:
+    manifest_path = get_run_manifest_path(state_dir, target)
+    if not os.path.exists(manifest_path):
+        return {}
+    try:
+        with open(manifest_path) as manifest_file:
+            return json.load(manifest_file)
+    except (OSError, ValueError):
+        # An unreadable manifest only costs a full run
+        return {}
+
+
+def save_run_manifest(
+    manifest: dict, state_dir: str = None, target: Optional[dict] = None
+) -> None:
+    manifest_path = get_run_manifest_path(state_dir, target)
+    os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+    temporary_path = f"{manifest_path}.tmp"
+    with open(temporary_path, "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+    os.replace(temporary_path, manifest_path)
+
+
+def fingerprint_file(file_path: str, previous: Optional[dict]) -> dict:
+    # The content is only hashed again when the size or modification time
+    # changed since the previous run
+    stat = os.stat(file_path)
+    if (
+        previous
+        and previous.get("size") == stat.st_size
+        and previous.get("mtime_ns") == stat.st_mtime_ns
+    ):
+        return previous
+    return {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": hash_file(file_path),
+    }
+
+
+def fingerprint_inputs(
+    input_paths: dict[str, str], previous_inputs: Optional[dict] = None
+) -> dict[str, dict[str, dict]]:
+    """
+    Fingerprint the files of each pipeline input.
+
+    Args:
+        input_paths (dict[str, str]): The file path, or glob of part files,
+        of each input by name.
+        previous_inputs (dict, optional): The input fingerprints of the last
+        run, reused for files that have not been touched since.
+
+    Returns:
+        dict: The size, modification time and content hash of every file,
+        by input name and file path.
+    """
+    previous_inputs = previous_inputs or {}
+    fingerprints = {}
+    for name, input_path in input_paths.items():
+        previous_files = previous_inputs.get(name, {})
+        fingerprints[name] = {
+            os.path.abspath(file_path): fingerprint_file(
+                file_path, previous_files.get(os.path.abspath(file_path))
+            )
+            for file_path in resolve_input_files(input_path)
+        }
+    return fingerprints
+
+
+def fingerprint_code(code_dirs: tuple[str, ...] = CODE_DIRS) -> str:
+    # Hash every Python file of the pipeline in path order, so that any
+    # code change invalidates the previous run
+    code_hash = hashlib.sha256()
+    for code_dir in code_dirs:
+        for dir_path, dir_names, file_names in os.walk(
+            os.path.join(ROOT_DIR, code_dir)
+        ):
+            dir_names.sort()
+            for file_name in sorted(file_names):
+                if not file_name.endswith(".py"):
+                    continue
+                file_path = os.path.join(dir_path, file_name)
+                code_hash.update(
+                    os.path.relpath(file_path, ROOT_DIR).encode()
+                )
+                with open(file_path, "rb") as code_file:
+                    code_hash.update(code_file.read())
+    return code_hash.hexdigest()
+
+
+def build_run_manifest(
+    input_paths: dict[str, str],
+    previous_manifest: Optional[dict] = None,
+    target: Optional[dict] = None,
+) -> dict:
+    previous_manifest = previous_manifest or {}
+    return {
+        "target": target,
+        "code": fingerprint_code(),
+        "inputs": fingerprint_inputs(
+            input_paths, previous_manifest.get("inputs")
+        ),
+    }
+
+
+def find_changed_inputs(previous_manifest: dict, manifest: dict) -> set[str]:
+    # Compare content hashes only, so a file that was touched but not
+    # changed does not count as changed
+    previous_inputs = previous_manifest.get("inputs", {})
+    changed = set()
+    for name, files in manifest["inputs"].items():
+        previous_files = previous_inputs.get(name)
+        if previous_files is None or {
+            path: entry["sha256"] for path, entry in files.items()
+        } != {
+            path: entry.get("sha256")
+            for path, entry in previous_files.items()
+        }:
+            changed.add(name)
+    return changed
+
+
+def plan_outputs(
+    previous_manifest: dict,
+    manifest: dict,
+    output_dependencies: dict[str, list[str]],
+) -> set[str]:
+    """
+    Decide which outputs have to be rebuilt since the last successful run.
+
+    Every output is rebuilt when there is no previous run, the previous
+    run loaded another target or the pipeline code changed. Otherwise only
+    the outputs that depend on a changed input are rebuilt.
+
+    Args:
+        previous_manifest (dict): The manifest of the last successful run.
+        manifest (dict): The manifest of the current inputs and code.
+        output_dependencies (dict[str, list[str]]): The inputs each output
+        is derived from.
+
+    Returns:
+        set[str]: The names of the outputs to rebuild.
+    """
+    if (
+        not previous_manifest
+        or previous_manifest.get("target") != manifest.get("target")
+        or previous_manifest.get("code") != manifest["code"]
+    ):
+        return set(output_dependencies)
+    changed_inputs = find_changed_inputs(previous_manifest, manifest)
+    return {
+        output
+        for output, inputs in output_dependencies.items()
+        if changed_inputs.intersection(inputs)
+    }
@@ -0,0 +1,142 @@
+import glob
+import os
+import pandas as pd
+import pyarrow as pa
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, Optional
+
+# Characters that mark a file path as a glob of part files
+GLOB_CHARACTERS = "*?["
+
+# Extensions of the compressed files that pyarrow decompresses while they
+# are read
+COMPRESSED_EXTENSIONS = (".gz", ".bz2", ".zst", ".lz4")
+
+
+def is_glob(file_path: str) -> bool:
+    return any(character in file_path for character in GLOB_CHARACTERS)
+
+
+def is_compressed(file_path: str) -> bool:
+    return file_path.endswith(COMPRESSED_EXTENSIONS)
+
+
+def resolve_input_files(file_path: str) -> list[str]:
+    """
+    Resolve a file path, or a glob of part files, to the files to read.
+
+    Matches are sorted by path so that the parts are always combined in the
+    same order.
+
+    Args:
+        file_path (str): A file path or a glob such as part-*.csv.gz.
+
+    Returns:
+        list[str]: The files to read, in order.
+    """
+    if not is_glob(file_path):
+        return [file_path]
+    files = sorted(glob.glob(file_path))
+    if not files:
+        raise FileNotFoundError(f"No files match {file_path}")
+    return files
+
+
+def open_input(file_path: str) -> pa.NativeFile:
+    # pyarrow detects the codec from the extension, so compressed parts do
+    # not need the optional pandas codec packages (zstandard for .zst)
+    return pa.input_stream(file_path, compression="detect")
+
+
+def get_read_options(
+    read_options: dict, columns: Optional[list[str]] = None
+) -> dict:
+    # A source's read options, only parsing the requested columns when given
+    if columns is None:
+        return read_options
+    return {**read_options, "usecols": columns}
+
+
+def read_csv_file(file_path: str, **read_csv_kwargs) -> pd.DataFrame:
+    # Uncompressed files are read by path so that the parser can map them
+    if not is_compressed(file_path):
+        return pd.read_csv(file_path, **read_csv_kwargs)
+    with open_input(file_path) as source:
+        return pd.read_csv(source, **read_csv_kwargs)
+
+
+def read_sharded_csv(
+    file_path: str,
+    reader: Callable[..., pd.DataFrame] = read_csv_file,
+    max_workers: Optional[int] = None,
+    **reader_kwargs,
+) -> pd.DataFrame:
+    """
+    Read a CSV file, or every part file matched by a glob, into one
+    DataFrame.
+
+    The parts are parsed at the same time on a thread pool (the pyarrow
+    parser releases the GIL while it works) and concatenated in path
+    order.
+
+    Args:
+        file_path (str): A file path or a glob of part files.
+        reader (Callable, optional): Reads one file into a DataFrame.
+        max_workers (int, optional): The number of parts parsed at once.
+        Defaults to one per core.
+        **reader_kwargs: Options passed to the reader.
+
+    Returns:
+        pd.DataFrame: The rows of every part, in order.
+    """
+    files = resolve_input_files(file_path)
+    if len(files) == 1:
+        return reader(files[0], **reader_kwargs)
+
+    with ThreadPoolExecutor(
+        max_workers=max_workers or min(len(files), os.cpu_count() or 1),
+        thread_name_prefix="read_shard",
+    ) as executor:
+        parts = list(
+            executor.map(lambda part: reader(part, **reader_kwargs), files)
+        )
+    return apply_declared_dtypes(
+        pd.concat(parts, ignore_index=True), reader_kwargs.get("dtype")
+    )
+
+
+def iter_csv_shards(
+    file_path: str, chunk_size: int, **read_csv_kwargs
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream a CSV file, or every part file matched by a glob, in chunks of
+    at most chunk_size rows. The parts are read one after another in path
+    order.
+    """
+    for part in resolve_input_files(file_path):
+        if not is_compressed(part):
+            yield from pd.read_csv(
+                part, chunksize=chunk_size, **read_csv_kwargs
+            )
+            continue
+        with open_input(part) as source:
+            yield from pd.read_csv(
+                source, chunksize=chunk_size, **read_csv_kwargs
+            )
+
+
+def apply_declared_dtypes(
+    df: pd.DataFrame, dtype: Optional[dict]
+) -> pd.DataFrame:
+    # Parts can disagree on categories, which pd.concat falls back to
+    # object for, so the declared types are applied again to the combined
+    # rows
+    if not dtype:
+        return df
+    return df.astype(
+        {
+            column: column_dtype
+            for column, column_dtype in dtype.items()
+            if column in df
+        }
+    )
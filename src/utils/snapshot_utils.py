@@ -0,0 +1,237 @@
+import logging
+import os
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+import pandas as pd
+from src.utils.file_utils import (
+    ROOT_DIR,
+    write_dataframe_to_csv,
+    write_dataframe_to_parquet,
+)
+from src.utils.logging_utils import setup_logger
+
+# The most snapshots waiting to be written. Each one holds on to its frame,
+# so a step that saves a snapshot while the queue is full waits for the
+# writer rather than keeping more frames alive
+SNAPSHOT_QUEUE_SIZE = 2
+
+# Configure the logger
+logger = setup_logger(__name__, "transform_data.log", level=logging.DEBUG)
+
+# The running writer, if any. Without one snapshots are written by the step
+# saving them, as they always were. Disabling snapshots only skips the
+# debug snapshots of intermediate tables, as the processed tables the app
+# reads are always saved. Both are saved as Parquet, and as CSV too when
+# exported
+snapshot_writer = {
+    "enabled": True,
+    "export_csv": False,
+    "queue": None,
+    "thread": None,
+    "failures": [],
+}
+
+# The snapshots saved on each thread while they are being recorded, so a
+# cached step can save them again when its outputs are reused
+snapshot_recorder = threading.local()
+
+
+@contextmanager
+def record_snapshots() -> Iterator[list]:
+    """
+    Record the snapshots saved on this thread within the block, whether or
+    not snapshots are enabled.
+
+    Yields:
+        list: Filled in with the frame, output directory and table name of
+        each snapshot as it is saved, and whether it is a processed table.
+    """
+    previous = getattr(snapshot_recorder, "snapshots", None)
+    snapshot_recorder.snapshots = []
+    try:
+        yield snapshot_recorder.snapshots
+    finally:
+        snapshot_recorder.snapshots = previous
+
+
+def save_snapshot(
+    df: pd.DataFrame, relative_output_dir: str, table_name: str
+) -> None:
+    """
+    Save a debug snapshot of an intermediate DataFrame as a typed Parquet
+    file, and as a CSV file when CSV export is on, unless snapshots are
+    disabled.
+
+    While a background writer runs, the snapshot is queued and written on
+    its thread, so the frame must not be changed in place afterwards. The
+    transform steps run with copy-on-write enabled, which the shallow copy
+    queued here relies on.
+
+    Args:
+        df (pd.DataFrame): The DataFrame to save.
+        relative_output_dir (str): The directory to save the files to,
+        relative to the project root.
+        table_name (str): The name of the files, without extension.
+    """
+    record_snapshot(df, relative_output_dir, table_name, False)
+    if snapshot_writer["enabled"]:
+        queue_snapshot(df, relative_output_dir, table_name)
+
+
+def save_processed_table(
+    df: pd.DataFrame, relative_output_dir: str, table_name: str
+) -> None:
+    """
+    Save one of the processed tables the app reads as a typed Parquet
+    file, and as a CSV file when CSV export is on. Processed tables are
+    saved even when snapshots are disabled, and are queued like snapshots
+    while a background writer runs.
+
+    Args:
+        df (pd.DataFrame): The DataFrame to save.
+        relative_output_dir (str): The directory to save the files to,
+        relative to the project root.
+        table_name (str): The name of the files, without extension.
+    """
+    record_snapshot(df, relative_output_dir, table_name, True)
+    queue_snapshot(df, relative_output_dir, table_name)
+
+
+def record_snapshot(
+    df: pd.DataFrame,
+    relative_output_dir: str,
+    table_name: str,
+    processed: bool,
+) -> None:
+    # Record the snapshot while record_snapshots is recording on this thread
+    recorded = getattr(snapshot_recorder, "snapshots", None)
+    if recorded is not None:
+        recorded.append((df, relative_output_dir, table_name, processed))
+
+
+def queue_snapshot(
+    df: pd.DataFrame, relative_output_dir: str, table_name: str
+) -> None:
+    # Hand the snapshot to the background writer, or write it now without
+    # one
+    output_path = os.path.join(ROOT_DIR, relative_output_dir, table_name)
+    snapshot_queue = snapshot_writer["queue"]
+    if snapshot_queue is None:
+        write_snapshot(df, output_path, snapshot_writer["export_csv"])
+        return
+    snapshot_queue.put(
+        (df.copy(deep=False), output_path, snapshot_writer["export_csv"])
+    )
+
+
+def write_snapshot(
+    df: pd.DataFrame, output_path: str, export_csv: bool
+) -> None:
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    write_dataframe_to_parquet(df, f"{output_path}.parquet")
+    if export_csv:
+        write_dataframe_to_csv(df, f"{output_path}.csv")
+    logger.info(f"Snapshot saved to {output_path}")
+
+
+def drain_snapshots(snapshot_queue: queue.Queue, failures: list) -> None:
+    # Write the queued snapshots until the writer is stopped. A failed
+    # write is recorded and the writer carries on with the next snapshot
+    while True:
+        item = snapshot_queue.get()
+        if item is None:
+            return
+        df, output_path, export_csv = item
+        try:
+            write_snapshot(df, output_path, export_csv)
+        except Exception as e:
+            logger.error(f"Failed to save snapshot {output_path}: {e}")
+            failures.append(output_path)
+        del df, item
+
+
+def start_snapshot_writer(
+    enabled: bool = True,
+    max_pending: int = SNAPSHOT_QUEUE_SIZE,
+    export_csv: bool = False,
+) -> None:
+    """
+    Start writing snapshots and processed tables on a background thread.
+
+    Args:
+        enabled (bool, optional): Whether the debug snapshots are saved.
+        max_pending (int, optional): The most snapshots waiting to be
+        written before save_snapshot blocks.
+        export_csv (bool, optional): Whether snapshots and processed
+        tables are also saved as CSV.
+    """
+    snapshot_writer["enabled"] = enabled
+    snapshot_writer["export_csv"] = export_csv
+    snapshot_writer["failures"] = []
+    if not enabled:
+        logger.info("Debug snapshots are disabled")
+    snapshot_writer["queue"] = queue.Queue(maxsize=max_pending)
+    snapshot_writer["thread"] = threading.Thread(
+        target=drain_snapshots,
+        args=(snapshot_writer["queue"], snapshot_writer["failures"]),
+        name="snapshot_writer",
+        daemon=True,
+    )
+    snapshot_writer["thread"].start()
+
+
+def stop_snapshot_writer() -> list[str]:
+    """
+    Wait for the queued snapshots to be written and stop the writer, after
+    which snapshots are written by the steps saving them again.
+
+    Returns:
+        list[str]: The files that failed to be written.
+    """
+    if snapshot_writer["thread"] is not None:
+        snapshot_writer["queue"].put(None)
+        snapshot_writer["thread"].join()
+    failures = snapshot_writer["failures"]
+    snapshot_writer.update(
+        {
+            "enabled": True,
+            "export_csv": False,
+            "queue": None,
+            "thread": None,
+            "failures": [],
+        }
+    )
+    return failures
+
+
+@contextmanager
+def background_snapshots(
+    enabled: bool = True,
+    max_pending: int = SNAPSHOT_QUEUE_SIZE,
+    export_csv: bool = False,
+) -> Iterator[None]:
+    """
+    Write the snapshots and processed tables saved within the block on a
+    background thread, and wait for them to be written when it ends.
+
+    Args:
+        enabled (bool, optional): Whether the debug snapshots are saved.
+        max_pending (int, optional): The most snapshots waiting to be
+        written before save_snapshot blocks.
+        export_csv (bool, optional): Whether snapshots and processed
+        tables are also saved as CSV.
+
+    Raises:
+        RuntimeError: If a snapshot failed to be written. An error raised
+        within the block takes precedence, with the failures only logged.
+    """
+    start_snapshot_writer(enabled, max_pending, export_csv)
+    try:
+        yield
+    finally:
+        failures = stop_snapshot_writer()
+    if failures:
+        logger.error(f"Failed to save {len(failures)} snapshots: {failures}")
+        raise RuntimeError(f"Failed to save snapshots: {failures}")
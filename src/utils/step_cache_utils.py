@@ -0,0 +1,529 @@
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from typing import Any, Callable, Optional
+from src.utils.file_utils import ROOT_DIR
+from src.utils.logging_utils import setup_logger
+from src.utils.snapshot_utils import (
+    record_snapshots,
+    save_processed_table,
+    save_snapshot,
+)
+
+# Directory holding the cached outputs of the transform steps
+STEP_CACHE_DIR = os.path.join(ROOT_DIR, "data", "cache", "steps")
+
+# The index of the cached entries, with their size and when they were last
+# used
+STEP_CACHE_INDEX_NAME = "index.json"
+
+# Schema metadata key of the pandas types of a cached frame, stored as JSON
+FRAME_METADATA_KEY = b"step_cache_frame"
+
+# The least recently used entries are evicted once the cache is larger
+STEP_CACHE_MAX_BYTES = 5 * 1024**3
+
+# Only the code of the pipeline is fingerprinted, not its dependencies,
+# whose versions are part of the key instead
+CODE_PACKAGES = ("src", "config")
+
+# Configure the logger
+logger = setup_logger(__name__, "transform_data.log", level=logging.DEBUG)
+
+# Steps run on several threads at once, so updates to the index are
+# serialised
+index_lock = threading.Lock()
+
+
+def hash_frame(df: pd.DataFrame) -> str:
+    """
+    Hash the contents of a DataFrame, its columns, types and index, by
+    hashing the Arrow buffers of each column rather than each value.
+
+    Frames that hash the same have the same contents. Equal frames can hash
+    differently if their buffers are laid out differently, which only costs
+    a cache miss.
+    """
+    frame_hash = hashlib.blake2b(digest_size=32)
+    table = pa.Table.from_pandas(df, preserve_index=True)
+    frame_hash.update(table.schema.to_string().encode())
+    frame_hash.update(str(table.num_rows).encode())
+    for column in table.columns:
+        for chunk in column.chunks:
+            hash_array(frame_hash, chunk)
+    return frame_hash.hexdigest()
+
+
+def hash_array(array_hash, array: pa.Array) -> None:
+    # The offset and length say which part of the buffers is the array
+    array_hash.update(f"{array.offset}:{len(array)}".encode())
+    for buffer in array.buffers():
+        array_hash.update(b"-" if buffer is None else memoryview(buffer))
+
+
+def get_code_modules(module_name: str) -> list[str]:
+    # The module and every pipeline module it uses, directly or through
+    # the modules it uses
+    seen = set()
+    pending = [module_name]
+    while pending:
+        name = pending.pop()
+        if name in seen or name not in sys.modules:
+            continue
+        seen.add(name)
+        for value in vars(sys.modules[name]).values():
+            used = (
+                value.__name__
+                if inspect.ismodule(value)
+                else getattr(value, "__module__", None)
+            )
+            if isinstance(used, str) and used.split(".")[0] in CODE_PACKAGES:
+                pending.append(used)
+    return sorted(seen)
+
+
+def fingerprint_function(function: Callable) -> str:
+    """
+    Fingerprint the code a step runs: the source of the module defining the
+    function and of every pipeline module it uses, the arguments bound by
+    functools.partial, and the pandas and pyarrow versions.
+
+    Changing one step therefore leaves the cached outputs of the steps
+    that do not use it valid.
+    """
+    code_hash = hashlib.sha256()
+    bound = []
+    while isinstance(function, functools.partial):
+        bound.append(repr((function.args, sorted(function.keywords.items()))))
+        function = function.func
+    code_hash.update(
+        f"{function.__module__}.{function.__qualname__}".encode()
+    )
+    code_hash.update(repr(bound).encode())
+    code_hash.update(f"{pd.__version__}:{pa.__version__}".encode())
+    for module_name in get_code_modules(function.__module__):
+        code_hash.update(module_name.encode())
+        source_path = inspect.getsourcefile(sys.modules[module_name])
+        with open(source_path, "rb") as source_file:
+            code_hash.update(source_file.read())
+    return code_hash.hexdigest()
+
+
+def hash_input(value: Any) -> Optional[str]:
+    # None when the value is not a DataFrame, such as streamed chunks, as
+    # those cannot be hashed without being consumed
+    if not isinstance(value, pd.DataFrame):
+        return None
+    try:
+        return hash_frame(value)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        # Such as object columns mixing types, which Arrow cannot hold
+        return None
+
+
+def get_step_key(
+    name: str, code: str, input_keys: list[str], state: Optional[str]
+) -> str:
+    key_hash = hashlib.sha256()
+    for part in [name, code, state or "", *input_keys]:
+        key_hash.update(part.encode())
+        key_hash.update(b"\0")
+    return key_hash.hexdigest()
+
+
+def get_index_path(cache_dir: str = None) -> str:
+    return os.path.join(cache_dir or STEP_CACHE_DIR, STEP_CACHE_INDEX_NAME)
+
+
+def load_step_cache_index(cache_dir: str = None) -> dict:
+    """
+    Load the index of the step cache.
+
+    Returns:
+        dict: The entries by key, each with the step name, the files of its
+        outputs, whether the step returned a tuple, the size in bytes and
+        the time it was created and last used.
+    """
+    index_path = get_index_path(cache_dir)
+    if not os.path.exists(index_path):
+        return {}
+    try:
+        with open(index_path) as index_file:
+            return json.load(index_file)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable step cache index: {e}")
+        return {}
+
+
+def save_step_cache_index(index: dict, cache_dir: str = None) -> None:
+    index_path = get_index_path(cache_dir)
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    temporary_path = f"{index_path}.tmp"
+    with open(temporary_path, "w") as index_file:
+        json.dump(index, index_file, indent=2)
+    os.replace(temporary_path, index_path)
+
+
+def describe_dtype(dtype) -> Any:
+    # A JSON description of a pandas type. Arrow types are taken from the
+    # Parquet schema, and categories are listed as they cannot be parsed
+    # from the name of their type
+    if isinstance(dtype, pd.ArrowDtype):
+        return {"arrow": True}
+    if isinstance(dtype, pd.CategoricalDtype):
+        return {
+            "categories": dtype.categories.tolist(),
+            "categories_dtype": describe_dtype(dtype.categories.dtype),
+            "ordered": bool(dtype.ordered),
+        }
+    if isinstance(dtype, pd.StringDtype):
+        # The name of a string type leaves out its storage
+        return f"string[{dtype.storage}]"
+    return str(dtype)
+
+
+def parse_dtype(description: Any, arrow_type: pa.DataType):
+    # The pandas type of a column from its describe_dtype description
+    if isinstance(description, str):
+        return pd.api.types.pandas_dtype(description)
+    if description.get("arrow"):
+        return pd.ArrowDtype(arrow_type)
+    # The categories are the values of the dictionary Arrow stores
+    categories_dtype = parse_dtype(
+        description["categories_dtype"],
+        getattr(arrow_type, "value_type", arrow_type),
+    )
+    return pd.CategoricalDtype(
+        pd.Index(description["categories"], dtype=categories_dtype),
+        ordered=description["ordered"],
+    )
+
+
+def write_frame(df: pd.DataFrame, path: str) -> None:
+    """
+    Write a DataFrame to Parquet along with the pandas type of each column,
+    which pandas cannot always rebuild from its own Parquet metadata (Arrow
+    list columns fail, and string columns lose their storage). The types
+    are stored as JSON, so reading a cached frame runs no code.
+    """
+    # A plain range index is recorded by its bounds, any other index is
+    # stored in columns of its own
+    if isinstance(df.index, pd.RangeIndex) and df.index.name is None:
+        index = {"range": [df.index.start, df.index.stop, df.index.step]}
+    else:
+        index = [
+            name if name is not None else f"__index_{level}__"
+            for level, name in enumerate(df.index.names)
+        ]
+        df = df.rename_axis(index).reset_index()
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    frame_metadata = {
+        "dtypes": {
+            column: describe_dtype(df[column].dtype) for column in df.columns
+        },
+        "index": index,
+    }
+    table = table.replace_schema_metadata(
+        {FRAME_METADATA_KEY: json.dumps(frame_metadata)}
+    )
+    pq.write_table(table, path)
+
+
+def read_frame(path: str) -> pd.DataFrame:
+    # Read a frame written by write_frame, converting each column back to
+    # its pandas type
+    table = pq.read_table(path)
+    frame_metadata = json.loads(table.schema.metadata[FRAME_METADATA_KEY])
+    columns = {}
+    for name, description in frame_metadata["dtypes"].items():
+        dtype = parse_dtype(description, table.schema.field(name).type)
+        column = table.column(name).to_pandas(
+            types_mapper=lambda _, dtype=dtype: (
+                dtype
+                if isinstance(dtype, pd.api.extensions.ExtensionDtype)
+                and not isinstance(dtype, pd.CategoricalDtype)
+                else None
+            )
+        )
+        columns[name] = column if column.dtype == dtype else column.astype(
+            dtype
+        )
+    df = pd.DataFrame(columns)
+    index = frame_metadata["index"]
+    if isinstance(index, dict):
+        df.index = pd.RangeIndex(*index["range"])
+        return df
+    df = df.set_index(index)
+    df.index.names = [
+        None if name.startswith("__index_") else name for name in index
+    ]
+    return df
+
+
+def get_output_key(file: str) -> str:
+    # A cached output is identified by its file, which is shared by every
+    # key its entry is stored under
+    return file.removesuffix(".parquet")
+
+
+def read_step_outputs(
+    key: str, cache_dir: str = None
+) -> Optional[tuple[Any, list[str], list]]:
+    # The cached outputs of an entry with their keys and the snapshots saved
+    # from them, or None when it is not cached. Entries from before
+    # snapshots were recorded are recomputed
+    cache_dir = cache_dir or STEP_CACHE_DIR
+    with index_lock:
+        index = load_step_cache_index(cache_dir)
+        entry = index.get(key)
+        if entry is None or "snapshots" not in entry:
+            return None
+        paths = [os.path.join(cache_dir, file) for file in entry["files"]]
+        if not all(os.path.exists(path) for path in paths):
+            return None
+        entry["last_used"] = time.time()
+        save_step_cache_index(index, cache_dir)
+    outputs = [read_frame(path) for path in paths]
+    output_keys = [get_output_key(file) for file in entry["files"]]
+    return (
+        tuple(outputs) if entry["is_tuple"] else outputs[0],
+        output_keys,
+        entry["snapshots"],
+    )
+
+
+def find_snapshot_outputs(
+    result: Any, snapshots: list
+) -> Optional[list[list]]:
+    # The position of the output each snapshot was saved from, with its
+    # directory, table name and whether it is a processed table, or None if
+    # a snapshot is not of an output
+    outputs = result if isinstance(result, tuple) else (result,)
+    positions = []
+    for df, relative_output_dir, table_name, processed in snapshots:
+        position = next(
+            (
+                position
+                for position, output in enumerate(outputs)
+                if output is df
+            ),
+            None,
+        )
+        if position is None:
+            return None
+        positions.append(
+            [position, relative_output_dir, table_name, processed]
+        )
+    return positions
+
+
+def replay_snapshots(result: Any, snapshots: list[list]) -> None:
+    # Save the snapshots again from the reused outputs, as the step would
+    outputs = result if isinstance(result, tuple) else (result,)
+    for position, relative_output_dir, table_name, processed in snapshots:
+        save = save_processed_table if processed else save_snapshot
+        save(outputs[position], relative_output_dir, table_name)
+
+
+def write_step_outputs(
+    keys: list[str],
+    name: str,
+    result: Any,
+    cache_dir: str = None,
+    max_bytes: int = STEP_CACHE_MAX_BYTES,
+    snapshots: list[list] = None,
+) -> Optional[list[str]]:
+    """
+    Store the outputs of a step under each of the keys, with the snapshots
+    the step saved from them as find_snapshot_outputs lists them, then
+    evict the least recently used entries until the cache fits in
+    max_bytes.
+
+    Returns:
+        list[str] | None: The keys of the stored outputs, or None when they
+        were not stored, as steps with outputs that are not DataFrames are
+        not cached.
+    """
+    is_tuple = isinstance(result, tuple)
+    outputs = list(result) if is_tuple else [result]
+    if not all(isinstance(output, pd.DataFrame) for output in outputs):
+        return None
+    cache_dir = cache_dir or STEP_CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+    files = []
+    for position, output in enumerate(outputs):
+        file = f"{keys[0]}-{position}.parquet"
+        # Written under a temporary name so a partial file is never read
+        temporary_path = os.path.join(cache_dir, f".{file}.tmp")
+        write_frame(output, temporary_path)
+        os.replace(temporary_path, os.path.join(cache_dir, file))
+        files.append(file)
+    size = sum(
+        os.path.getsize(os.path.join(cache_dir, file)) for file in files
+    )
+    with index_lock:
+        index = load_step_cache_index(cache_dir)
+        now = time.time()
+        for key in keys:
+            index[key] = {
+                "step": name,
+                "files": files,
+                "is_tuple": is_tuple,
+                "snapshots": snapshots or [],
+                "bytes": size,
+                "created": now,
+                "last_used": now,
+            }
+        evict_least_recently_used(index, max_bytes, cache_dir)
+        save_step_cache_index(index, cache_dir)
+    return [get_output_key(file) for file in files]
+
+
+def get_step_cache_bytes(index: dict) -> int:
+    # Entries stored under several keys share their files
+    files = {}
+    for entry in index.values():
+        for file in entry["files"]:
+            files[file] = entry["bytes"] / len(entry["files"])
+    return int(sum(files.values()))
+
+
+def evict_least_recently_used(
+    index: dict, max_bytes: int, cache_dir: str = None
+) -> list[str]:
+    """
+    Remove the least recently used entries from the index, and their files,
+    until the cache fits in max_bytes.
+
+    Returns:
+        list[str]: The keys of the evicted entries.
+    """
+    evicted = []
+    by_last_use = sorted(index, key=lambda key: index[key]["last_used"])
+    for key in by_last_use:
+        if get_step_cache_bytes(index) <= max_bytes:
+            break
+        entry = index.pop(key)
+        evicted.append(key)
+        remove_unused_files([entry], index, cache_dir)
+        logger.info(f"Evicted cached outputs of step {entry['step']}")
+    return evicted
+
+
+def remove_unused_files(
+    entries: list[dict], index: dict, cache_dir: str = None
+) -> None:
+    # Remove the files of the entries that no entry left in the index uses
+    cache_dir = cache_dir or STEP_CACHE_DIR
+    still_used = {file for entry in index.values() for file in entry["files"]}
+    for entry in entries:
+        for file in set(entry["files"]) - still_used:
+            path = os.path.join(cache_dir, file)
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def clear_step_cache(step: str = None, cache_dir: str = None) -> int:
+    """
+    Remove every cached entry, or only those of one step.
+
+    Returns:
+        int: The number of entries removed.
+    """
+    with index_lock:
+        index = load_step_cache_index(cache_dir)
+        cleared = [
+            index.pop(key)
+            for key in list(index)
+            if step is None or index[key]["step"] == step
+        ]
+        remove_unused_files(cleared, index, cache_dir)
+        save_step_cache_index(index, cache_dir)
+    return len(cleared)
+
+
+def cache_step(
+    name: str,
+    function: Callable,
+    state: Optional[Callable[[], str]] = None,
+    cache_dir: str = None,
+    max_bytes: int = STEP_CACHE_MAX_BYTES,
+) -> Callable[[list, list], tuple[Any, Optional[list[str]]]]:
+    """
+    Wrap a transform step so that its outputs are stored as Parquet, keyed
+    by its inputs and its code, and reused when both match.
+
+    An input is keyed by the hash of its contents, or when it is the output
+    of another cached step by the key of that output, so the steps after a
+    reused step are reused too without hashing what it returned. The
+    snapshots a step saves of its outputs are recorded with them, and saved
+    again from the reused outputs, so data/processed is written on every
+    run. A step saving a snapshot of anything else is not cached.
+
+    Args:
+        name (str): The name of the step.
+        function (Callable): The step, which takes DataFrames and returns a
+        DataFrame or a tuple of them.
+        state (Callable, optional): Fingerprints any state outside its
+        inputs that the step reads, such as the persisted id mappings. When
+        the step changes that state, the outputs are also stored under the
+        key of the state it leaves behind, so the next run finds them.
+        cache_dir (str, optional): The directory holding the cache.
+        max_bytes (int, optional): The size the cache is evicted down to.
+
+    Returns:
+        Callable: The cached step, which takes the list of inputs and of
+        their keys, None for an input without one, and returns the result
+        of the step with the keys of its outputs, or None when they are not
+        cached.
+    """
+    code = fingerprint_function(function)
+
+    def cached(args: list, input_keys: list) -> tuple[Any, Optional[list]]:
+        input_keys = [
+            key or hash_input(arg) for arg, key in zip(args, input_keys)
+        ]
+        if None in input_keys:
+            return function(*args), None
+        state_before = state() if state else None
+        key = get_step_key(name, code, input_keys, state_before)
+        cached_outputs = read_step_outputs(key, cache_dir)
+        if cached_outputs is not None:
+            logger.info(f"Reusing the cached outputs of step {name}")
+            result, output_keys, snapshots = cached_outputs
+            replay_snapshots(result, snapshots)
+            return result, output_keys
+
+        with record_snapshots() as snapshots:
+            result = function(*args)
+        snapshots = find_snapshot_outputs(result, snapshots)
+        if snapshots is None:
+            logger.warning(
+                f"Not caching step {name}, which saves a snapshot of a frame "
+                "it does not return"
+            )
+            return result, None
+        keys = [key]
+        if state and state() != state_before:
+            keys.append(get_step_key(name, code, input_keys, state()))
+        try:
+            output_keys = write_step_outputs(
+                keys, name, result, cache_dir, max_bytes, snapshots
+            )
+        except Exception as e:
+            # The cache is only an optimisation, so a failed write must not
+            # fail the step
+            logger.warning(f"Failed to cache the outputs of {name}: {e}")
+            output_keys = None
+        return result, output_keys
+
+    return cached
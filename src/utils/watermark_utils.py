@@ -0,0 +1,301 @@
+import glob
+import hashlib
+import io
+import json
+import logging
+import os
+import pandas as pd
+import pyarrow as pa
+from typing import Optional
+from src.utils.file_utils import (
+    ROOT_DIR,
+    read_dataframe_from_parquet,
+    write_dataframe_to_parquet,
+)
+from src.utils.logging_utils import setup_logger
+
+# Directory holding the persisted extraction watermarks
+STATE_DIR = os.path.join(ROOT_DIR, "data", "state")
+
+# Number of bytes before the watermark that are checksummed to detect a
+# source file which was rewritten rather than appended to
+PREFIX_CHECK_SIZE = 64 * 1024
+
+# Configure the logger
+logger = setup_logger(__name__, "extract_data.log", level=logging.DEBUG)
+
+
+def get_watermark_path(name: str, state_dir: str = None) -> str:
+    return os.path.join(state_dir or STATE_DIR, f"{name}_watermark.json")
+
+
+def get_pending_watermark_path(name: str, state_dir: str = None) -> str:
+    return os.path.join(
+        state_dir or STATE_DIR, f"{name}_watermark.pending.json"
+    )
+
+
+def get_kept_rows_dir(name: str, state_dir: str = None) -> str:
+    return os.path.join(state_dir or STATE_DIR, f"{name}_rows")
+
+
+def get_kept_rows_part_path(
+    name: str, first_row: int, state_dir: str = None, pending: bool = False
+) -> str:
+    # Parts are named after the number of their first row, so they sort in
+    # row order
+    prefix = "pending" if pending else "part"
+    return os.path.join(
+        get_kept_rows_dir(name, state_dir),
+        f"{prefix}-{first_row:012d}.parquet",
+    )
+
+
+def load_watermark(name: str, state_dir: str = None) -> Optional[dict]:
+    """
+    Load the last committed watermark for a source, if there is one.
+    """
+    watermark_path = get_watermark_path(name, state_dir)
+    if not os.path.exists(watermark_path):
+        return None
+    try:
+        with open(watermark_path) as watermark_file:
+            return json.load(watermark_file)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable watermark {watermark_path}: {e}")
+        return None
+
+
+def stage_watermark(
+    name: str,
+    watermark: dict,
+    state_dir: str = None,
+    rows: Optional[pd.DataFrame] = None,
+):
+    """
+    Record the watermark reached by an extraction without committing it.
+
+    The staged watermark only replaces the committed one when
+    commit_watermark is called, which should happen once the rows it
+    covers have been loaded successfully.
+
+    Args:
+        name (str): The name of the source.
+        watermark (dict): The watermark reached, with its row_count.
+        state_dir (str, optional): The directory holding the state.
+        rows (pd.DataFrame, optional): The rows read to reach the
+        watermark, to be kept as a part once committed, so that later runs
+        can return them without reading them again (see
+        append_to_kept_rows).
+    """
+    pending_path = get_pending_watermark_path(name, state_dir)
+    os.makedirs(os.path.dirname(pending_path), exist_ok=True)
+    with open(pending_path, "w") as watermark_file:
+        json.dump(watermark, watermark_file, indent=2, default=str)
+    for pending_part_path in list_kept_row_parts(name, state_dir, "pending"):
+        os.remove(pending_part_path)
+    if rows is not None and len(rows):
+        pending_part_path = get_kept_rows_part_path(
+            name, watermark["row_count"] - len(rows), state_dir, pending=True
+        )
+        os.makedirs(os.path.dirname(pending_part_path), exist_ok=True)
+        write_dataframe_to_parquet(rows, pending_part_path)
+
+
+def commit_watermark(name: str, state_dir: str = None) -> bool:
+    """
+    Promote the staged watermark for a source to the committed one, and
+    keep the rows staged with it.
+
+    Returns:
+        bool: True if a staged watermark was committed.
+    """
+    pending_path = get_pending_watermark_path(name, state_dir)
+    if not os.path.exists(pending_path):
+        return False
+    for pending_part_path in list_kept_row_parts(name, state_dir, "pending"):
+        first_row = get_first_row(pending_part_path)
+        # The rows from the first row on were read again
+        for part_path in list_kept_row_parts(name, state_dir):
+            if get_first_row(part_path) >= first_row:
+                os.remove(part_path)
+        os.replace(
+            pending_part_path,
+            get_kept_rows_part_path(name, first_row, state_dir),
+        )
+    os.replace(pending_path, get_watermark_path(name, state_dir))
+    logger.info(f"Committed {name} watermark")
+    return True
+
+
+def list_kept_row_parts(
+    name: str, state_dir: str = None, prefix: str = "part"
+) -> list[str]:
+    return sorted(
+        glob.glob(
+            os.path.join(
+                get_kept_rows_dir(name, state_dir), f"{prefix}-*.parquet"
+            )
+        )
+    )
+
+
+def get_first_row(part_path: str) -> int:
+    return int(os.path.basename(part_path).split("-")[1].split(".")[0])
+
+
+def append_to_kept_rows(
+    name: str, new_rows: pd.DataFrame, row_count: int, state_dir: str = None
+) -> Optional[pd.DataFrame]:
+    """
+    Append the rows extracted since the committed watermark to the rows
+    kept with it, so that the whole source is returned while only its new
+    rows are parsed.
+
+    Args:
+        name (str): The name of the source.
+        new_rows (pd.DataFrame): The rows extracted since the watermark.
+        row_count (int): The number of rows up to the new watermark.
+        state_dir (str, optional): The directory holding the state.
+
+    Returns:
+        pd.DataFrame | None: Every row up to the new watermark. None when
+        the kept rows do not cover the committed watermark or hold other
+        columns, in which case the source has to be read in full.
+    """
+    previous_row_count = row_count - len(new_rows)
+    if not previous_row_count:
+        return new_rows
+    parts = [
+        read_dataframe_from_parquet(part_path)
+        for part_path in list_kept_row_parts(name, state_dir)
+    ]
+    if sum(len(part) for part in parts) != previous_row_count or any(
+        list(part.columns) != list(new_rows.columns) for part in parts
+    ):
+        return None
+    if len(new_rows):
+        parts.append(new_rows)
+    return pd.concat(parts, ignore_index=True)
+
+
+def checksum(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def read_header_line(file_path: str) -> bytes:
+    with open(file_path, "rb") as file:
+        return file.readline()
+
+
+def read_prefix_checksum(file_path: str, byte_offset: int) -> str:
+    # Checksum of the bytes just before the offset
+    start = max(byte_offset - PREFIX_CHECK_SIZE, 0)
+    with open(file_path, "rb") as file:
+        file.seek(start)
+        return checksum(file.read(byte_offset - start))
+
+
+def find_last_line_end(file_path: str, start: int, end: int) -> int:
+    """
+    Find the offset just after the last complete line in [start, end), so
+    that a line which is still being written is left for the next run.
+    """
+    window_start = end
+    with open(file_path, "rb") as file:
+        while window_start > start:
+            window_start = max(window_start - PREFIX_CHECK_SIZE, start)
+            file.seek(window_start)
+            window = file.read(end - window_start)
+            newline = window.rfind(b"\n")
+            if newline != -1:
+                return window_start + newline + 1
+    return start
+
+
+def is_file_watermark_valid(file_path: str, watermark: dict) -> bool:
+    """
+    Check that a file has only been appended to since the watermark.
+    """
+    byte_offset = watermark.get("byte_offset", 0)
+    if os.path.getsize(file_path) < byte_offset:
+        return False
+    if checksum(read_header_line(file_path)) != watermark.get(
+        "header_checksum"
+    ):
+        return False
+    return read_prefix_checksum(file_path, byte_offset) == watermark.get(
+        "prefix_checksum"
+    )
+
+
+def read_csv_since_watermark(
+    file_path: str,
+    watermark: Optional[dict],
+    **read_csv_kwargs,
+) -> tuple[pd.DataFrame, dict]:
+    """
+    Read the rows appended to a CSV file since a watermark.
+
+    Without a usable watermark the whole file is read. Only complete lines
+    are parsed, and the file is memory-mapped so the range is read without
+    copying it.
+
+    Args:
+        file_path (str): The path of the CSV file.
+        watermark (dict, optional): The watermark of the last run.
+        **read_csv_kwargs: Options passed to pd.read_csv.
+
+    Returns:
+        tuple[pd.DataFrame, dict]: The new rows and the new watermark.
+    """
+    header = read_header_line(file_path)
+    if watermark and not is_file_watermark_valid(file_path, watermark):
+        logger.warning(
+            f"{file_path} was rewritten since the last watermark, "
+            "reading it in full"
+        )
+        watermark = None
+
+    start = watermark["byte_offset"] if watermark else 0
+    end = find_last_line_end(
+        file_path, start, os.path.getsize(file_path)
+    )
+    header_columns = pd.read_csv(io.BytesIO(header)).columns.tolist()
+    empty_rows = pd.read_csv(
+        io.BytesIO(header),
+        dtype=read_csv_kwargs.get("dtype"),
+        usecols=read_csv_kwargs.get("usecols"),
+    )
+
+    if end <= max(start, len(header)):
+        rows = empty_rows
+    else:
+        with pa.memory_map(file_path) as source:
+            buffer = source.read_buffer(end).slice(start)
+            if watermark:
+                # The appended bytes have no header line of their own. The
+                # pyarrow engine cannot combine names with usecols, so the
+                # appended rows are projected after parsing
+                tail_kwargs = {
+                    key: value
+                    for key, value in read_csv_kwargs.items()
+                    if key != "usecols"
+                }
+                rows = pd.read_csv(
+                    pa.BufferReader(buffer),
+                    header=None,
+                    names=header_columns,
+                    **tail_kwargs,
+                )[empty_rows.columns]
+            else:
+                rows = pd.read_csv(pa.BufferReader(buffer), **read_csv_kwargs)
+
+    previous_row_count = watermark["row_count"] if watermark else 0
+    new_watermark = {
+        "byte_offset": end,
+        "row_count": previous_row_count + len(rows),
+        "header_checksum": checksum(header),
+        "prefix_checksum": read_prefix_checksum(file_path, end),
+    }
+    return rows, new_watermark
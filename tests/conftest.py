@@ -17,4 +17,47 @@ def setup_test_environment():
     
     yield
     
-    # Cleanup is handled by the setup_env function's cleanup_previous_env
\ No newline at end of file
+    # Cleanup is handled by the setup_env function's cleanup_previous_env
+
+
+@pytest.fixture(autouse=True)
+def metrics_dir(tmp_path, monkeypatch):
+    """
+    Keep the extraction metrics written by tests out of the project.
+    """
+    monkeypatch.setattr(
+        "src.utils.metrics_utils.METRICS_DIR", str(tmp_path / "metrics")
+    )
+
+
+@pytest.fixture(autouse=True)
+def id_mapping_dir(tmp_path, monkeypatch):
+    """
+    Start every test with empty id mappings, kept out of the project.
+    """
+    monkeypatch.setattr(
+        "src.utils.id_mapping_utils.ID_MAPPING_DIR",
+        str(tmp_path / "id_mappings"),
+    )
+
+
+@pytest.fixture(autouse=True)
+def step_cache_dir(tmp_path, monkeypatch):
+    """
+    Keep the step outputs cached by tests out of the project.
+    """
+    monkeypatch.setattr(
+        "src.utils.step_cache_utils.STEP_CACHE_DIR",
+        str(tmp_path / "step_cache"),
+    )
+
+
+@pytest.fixture(autouse=True)
+def aggregate_state_dir(tmp_path, monkeypatch):
+    """
+    Start every test without rating aggregates, kept out of the project.
+    """
+    monkeypatch.setattr(
+        "src.transform.incremental_rating_statistics.AGGREGATE_STATE_DIR",
+        str(tmp_path / "rating_aggregates"),
+    )
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.utils.aggregation_utils import aggregate_by_key, combine_aggregates
+
+
+@pytest.fixture
+def ratings():
+    return pd.DataFrame(
+        {
+            "movie_key": pd.Series([3, 1, 3, 3, 1], dtype=np.int32),
+            "rating_val": [6.0, 8.0, 10.0, 5.0, 9.0],
+        }
+    )
+
+
+def test_aggregate_by_key_matches_groupby(ratings):
+    result = aggregate_by_key(
+        ratings["movie_key"], ratings["rating_val"], variance=True
+    )
+    expected = (
+        ratings.groupby("movie_key")["rating_val"]
+        .agg(["count", "sum", "mean", "var"])
+        .reset_index()
+        .rename(columns={"var": "variance"})
+    )
+
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+    assert result["movie_key"].dtype == np.int32
+
+
+def test_aggregate_by_key_factorizes_sparse_keys():
+    result = aggregate_by_key(
+        pd.Series([10**9, 5, 10**9], name="user_id"),
+        pd.Series([2.0, 4.0, 6.0]),
+    )
+
+    assert result["user_id"].tolist() == [5, 10**9]
+    assert result["mean"].tolist() == [4.0, 4.0]
+
+
+def test_aggregate_by_key_factorizes_string_keys():
+    result = aggregate_by_key(
+        pd.Series(["mank", "insidious", "mank"], name="movie_id"),
+        pd.Series([5.0, 10.0, 7.0]),
+    )
+
+    assert result["movie_id"].tolist() == ["insidious", "mank"]
+    assert result["count"].tolist() == [1, 2]
+
+
+def test_aggregate_by_key_skips_missing_values():
+    result = aggregate_by_key(
+        pd.Series([1, 1, 2], name="movie_key"),
+        pd.Series([4.0, None, None], dtype="Float64"),
+    )
+
+    assert result["movie_key"].tolist() == [1]
+    assert result["count"].tolist() == [1]
+
+
+def test_variance_of_single_rating_is_missing(ratings):
+    result = aggregate_by_key(
+        ratings["movie_key"].iloc[:2],
+        ratings["rating_val"].iloc[:2],
+        variance=True,
+    )
+
+    assert result["variance"].isna().all()
+
+
+def test_combine_aggregates_matches_aggregate_by_key(ratings):
+    partials = [
+        aggregate_by_key(part["movie_key"], part["rating_val"])
+        for part in (ratings.iloc[:2], ratings.iloc[2:])
+    ]
+
+    result = combine_aggregates(partials)
+
+    pd.testing.assert_frame_equal(
+        result, aggregate_by_key(ratings["movie_key"], ratings["rating_val"])
+    )
+
+
+def test_combine_aggregates_of_no_partials_is_empty():
+    result = combine_aggregates([], "movie_key")
+
+    assert result.columns.tolist() == ["movie_key", "count", "sum", "mean"]
+    assert result.empty
+    assert result["count"].dtype == np.int64
+    assert result["mean"].dtype == np.float64
@@ -0,0 +1,150 @@
+import os
+import pandas as pd
+import pytest
+from src.utils.cache_utils import (
+    read_csv_with_parquet_cache,
+    get_cache_paths,
+    load_manifest,
+)
+
+READ_OPTIONS = {
+    "engine": "pyarrow",
+    "dtype_backend": "pyarrow",
+    "dtype": {"rating_val": "Int8"},
+}
+
+
+@pytest.fixture
+def csv_file(tmp_path):
+    file_path = tmp_path / "unclean_user_ratings.csv"
+    pd.DataFrame(
+        {
+            "movie_id": ["mank", "the-social-network", "insidious"],
+            "rating_val": [5, 10, 10],
+            "user_id": ["deathproof", "deathproof", "lily"],
+        }
+    ).to_csv(file_path, index=False)
+    return str(file_path)
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    return str(tmp_path / "cache")
+
+
+@pytest.fixture
+def spy_read_csv(mocker):
+    return mocker.spy(pd, "read_csv")
+
+
+def test_first_read_parses_csv_and_writes_cache(
+    csv_file, cache_dir, spy_read_csv
+):
+    df = read_csv_with_parquet_cache(csv_file, cache_dir, **READ_OPTIONS)
+
+    parquet_path, manifest_path = get_cache_paths(csv_file, cache_dir)
+    assert spy_read_csv.call_count == 1
+    assert os.path.exists(parquet_path)
+    manifest = load_manifest(manifest_path)
+    assert manifest["path"] == os.path.abspath(csv_file)
+    assert manifest["size"] == os.path.getsize(csv_file)
+    assert len(manifest["sha256"]) == 64
+    assert df["rating_val"].dtype == pd.Int8Dtype()
+
+
+def test_second_read_loads_typed_parquet(csv_file, cache_dir, spy_read_csv):
+    first = read_csv_with_parquet_cache(csv_file, cache_dir, **READ_OPTIONS)
+    second = read_csv_with_parquet_cache(csv_file, cache_dir, **READ_OPTIONS)
+
+    assert spy_read_csv.call_count == 1
+    pd.testing.assert_frame_equal(first, second)
+
+
+def test_changed_source_falls_back_to_csv(csv_file, cache_dir, spy_read_csv):
+    read_csv_with_parquet_cache(csv_file, cache_dir, **READ_OPTIONS)
+    with open(csv_file, "a") as file:
+        file.write("mank,8,lily\n")
+
+    df = read_csv_with_parquet_cache(csv_file, cache_dir, **READ_OPTIONS)
+
+    assert spy_read_csv.call_count == 2
+    assert len(df) == 4
+    # The cache is refreshed with the new contents
+    cached = read_csv_with_parquet_cache(csv_file, cache_dir, **READ_OPTIONS)
+    assert spy_read_csv.call_count == 2
+    assert len(cached) == 4
+
+
+def test_touched_but_unchanged_source_uses_cache(
+    csv_file, cache_dir, spy_read_csv
+):
+    read_csv_with_parquet_cache(csv_file, cache_dir, **READ_OPTIONS)
+    stat = os.stat(csv_file)
+    os.utime(csv_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    read_csv_with_parquet_cache(csv_file, cache_dir, **READ_OPTIONS)
+
+    assert spy_read_csv.call_count == 1
+    _, manifest_path = get_cache_paths(csv_file, cache_dir)
+    assert load_manifest(manifest_path)["mtime_ns"] == (
+        stat.st_mtime_ns + 10**9
+    )
+
+
+def test_changed_read_options_invalidate_cache(
+    csv_file, cache_dir, spy_read_csv
+):
+    read_csv_with_parquet_cache(csv_file, cache_dir, **READ_OPTIONS)
+
+    df = read_csv_with_parquet_cache(csv_file, cache_dir)
+
+    assert spy_read_csv.call_count == 2
+    assert df["rating_val"].dtype == "int64"
+
+
+def test_failed_cache_write_still_returns_data(
+    mocker, csv_file, cache_dir
+):
+    mocker.patch(
+        "src.utils.cache_utils.write_cache", side_effect=OSError("Disk full")
+    )
+
+    df = read_csv_with_parquet_cache(csv_file, cache_dir, **READ_OPTIONS)
+
+    assert len(df) == 3
+
+
+def test_cache_projects_columns_on_miss_and_hit(
+    csv_file, cache_dir, spy_read_csv
+):
+    columns = ["user_id", "rating_val"]
+    first = read_csv_with_parquet_cache(
+        csv_file, cache_dir, columns=columns, **READ_OPTIONS
+    )
+    second = read_csv_with_parquet_cache(
+        csv_file, cache_dir, columns=columns, **READ_OPTIONS
+    )
+    full = read_csv_with_parquet_cache(csv_file, cache_dir, **READ_OPTIONS)
+
+    # The cache holds every column, so other projections are still hits
+    assert spy_read_csv.call_count == 1
+    assert list(first.columns) == columns
+    pd.testing.assert_frame_equal(first, second)
+    assert list(full.columns) == ["movie_id", "rating_val", "user_id"]
+
+
+def test_cache_hit_returns_the_types_of_a_miss(
+    csv_file, cache_dir, spy_read_csv
+):
+    options = {**READ_OPTIONS, "dtype": {"user_id": "category"}}
+
+    miss = read_csv_with_parquet_cache(csv_file, cache_dir, **options)
+    hit = read_csv_with_parquet_cache(csv_file, cache_dir, **options)
+
+    assert spy_read_csv.call_count == 1
+    assert hit.dtypes.to_dict() == miss.dtypes.to_dict()
+    assert (
+        hit["user_id"].cat.categories.dtype
+        == miss["user_id"].cat.categories.dtype
+    )
+    assert hit.equals(miss)
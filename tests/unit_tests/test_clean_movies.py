@@ -1,14 +1,21 @@
 import pandas as pd
+import pyarrow as pa
+import pytest
 from unittest.mock import patch
 from src.transform.clean_movies import (
+    CLEAN_MOVIES_STEPS,
     clean_movies,
     remove_missing_values,
+    remove_missing_and_duplicate_movies,
     convert_genres_to_list,
     convert_spoken_languages_to_list,
     remove_empty_languages,
     standardise_runtime_format,
     standardise_year_released_format
 )
+from src.transform.cleaning_steps import run_cleaning_steps
+
+STRING_LIST_DTYPE = pd.ArrowDtype(pa.list_(pa.string()))
 
 
 def test_remove_missing_values():
@@ -41,6 +48,21 @@ def test_remove_missing_values():
     assert result["movie_id"].tolist() == ["insomnia-2002", "a-bugs-life"]
 
 
+def test_remove_missing_and_duplicate_movies():
+    df = pd.DataFrame(
+        {
+            "movie_id": ["mank", None, "insomnia-2002", "mank", ""],
+            "runtime": [131, 95, 118, 132, 90],
+        }
+    )
+
+    result = remove_missing_and_duplicate_movies(df)
+
+    assert result["movie_id"].tolist() == ["mank", "insomnia-2002"]
+    assert result["runtime"].tolist() == [131, 118]
+    assert result.index.tolist() == [0, 1]
+
+
 def test_convert_genres_to_list():
     df = pd.DataFrame(
         {
@@ -139,6 +161,29 @@ def test_remove_empty_languages():
     assert result["spoken_languages"].iloc[1] == []
 
 
+def test_convert_spoken_languages_to_list_drops_empty_strings():
+    df = pd.DataFrame(
+        {"spoken_languages": ['["English",""]', '[""]', None, '']}
+    )
+    result = convert_spoken_languages_to_list(df, drop_empty=True)
+    assert result["spoken_languages"].tolist() == [["English"], [], [], []]
+
+
+def test_remove_empty_languages_from_arrow_lists():
+    df = pd.DataFrame(
+        {
+            "spoken_languages": pd.Series(
+                [["English", ""], [""], ["Français", "English"]],
+                dtype=STRING_LIST_DTYPE,
+            )
+        }
+    )
+    result = remove_empty_languages(df)
+    assert result["spoken_languages"].tolist() == [
+        ["English"], [], ["Français", "English"]
+    ]
+
+
 def test_standardise_runtime_format():
     df = pd.DataFrame(
         {
@@ -200,7 +245,7 @@ def test_standardise_year_released_format():
 
 
 class TestCleanMovies:
-    @patch("src.transform.clean_movies.save_dataframe_to_csv")
+    @patch("src.transform.clean_movies.save_snapshot")
     def test_clean_movies_full_pipeline(self, mock_save):
         df = pd.DataFrame(
             {
@@ -234,15 +279,20 @@ class TestCleanMovies:
         # Should standardise runtime and year_released formats
 
         assert len(result) == 2
-        assert result["genres"].dtype == list
-        assert result["spoken_languages"].dtype == list
+        # Lists are parsed into Arrow list columns
+        assert result["genres"].dtype == STRING_LIST_DTYPE
+        assert result["spoken_languages"].dtype == STRING_LIST_DTYPE
+        assert result["genres"].tolist() == [
+            ["Crime", "Mystery", "Thriller"],
+            ["Adventure", "Animation", "Comedy", "Family  "],
+        ]
         assert result["runtime"].iloc[0] == 118
         assert result["runtime"].dtype == int
         assert result["year_released"].iloc[0] == 2002
         assert result["year_released"].dtype == int
         assert mock_save.called
 
-    @patch("src.transform.clean_movies.save_dataframe_to_csv")
+    @patch("src.transform.clean_movies.save_snapshot")
     def test_clean_movies_calls_save_function(self, mock_save):
         df = pd.DataFrame(
             {
@@ -271,4 +321,71 @@ class TestCleanMovies:
         mock_save.assert_called_once()
         args, kwargs = mock_save.call_args
         assert args[1] == "data/processed"
-        assert args[2] == "cleaned_movies.csv"
+        assert args[2] == "cleaned_movies"
+
+
+@pytest.fixture
+def arrow_movies():
+    return pd.DataFrame(
+        {
+            "movie_id": ["insomnia-2002", "a-bugs-life"],
+            "movie_title": ["Insomnia", "A Bug's Life"],
+            "genres": ['["Crime","Thriller"]', '["Comedy"]'],
+            "runtime": [118, 95],
+            "spoken_languages": ['["English",""]', '["English"]'],
+            "year_released": [2002, 1998],
+        }
+    ).convert_dtypes(dtype_backend="pyarrow")
+
+
+def get_data_address(series: pd.Series) -> int:
+    return pa.array(series.array).buffers()[-1].address
+
+
+def test_cleaning_steps_leave_input_unchanged(arrow_movies):
+    original = arrow_movies.copy()
+
+    result = run_cleaning_steps(arrow_movies, CLEAN_MOVIES_STEPS)
+
+    pd.testing.assert_frame_equal(arrow_movies, original)
+    assert result["genres"].dtype == STRING_LIST_DTYPE
+    # Columns that no step writes to are shared rather than copied
+    assert get_data_address(result["movie_title"]) == get_data_address(
+        arrow_movies["movie_title"]
+    )
+
+
+def test_cleaning_steps_report_memory_of_each_step(arrow_movies):
+    memory_report = []
+
+    run_cleaning_steps(arrow_movies, CLEAN_MOVIES_STEPS, memory_report)
+
+    assert [record["step"] for record in memory_report] == [
+        name for name, _ in CLEAN_MOVIES_STEPS
+    ] + ["total"]
+    assert memory_report[-1]["frame_mb"] > 0
+    assert all(
+        record["peak_copies"] is not None for record in memory_report
+    )
+
+
+def test_removing_nothing_peaks_below_one_copy():
+    rows = 200_000
+    movies = pd.DataFrame(
+        {
+            "movie_id": [f"movie-{row}" for row in range(rows)],
+            "movie_title": ["Insomnia"] * rows,
+            "runtime": [118] * rows,
+        }
+    ).convert_dtypes(dtype_backend="pyarrow")
+    memory_report = []
+
+    result = run_cleaning_steps(
+        movies, CLEAN_MOVIES_STEPS[:1], memory_report
+    )
+
+    assert memory_report[0]["step"] == "remove_missing_and_duplicate_movies"
+    assert memory_report[0]["peak_copies"] <= 1
+    assert get_data_address(result["movie_id"]) == get_data_address(
+        movies["movie_id"]
+    )
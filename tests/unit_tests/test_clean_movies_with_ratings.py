@@ -86,7 +86,7 @@ def test_standardise_ratings():
 
 
 class TestCleanMoviesWithRatings:
-    @patch("src.transform.clean_movies_with_ratings.save_dataframe_to_csv")
+    @patch("src.transform.clean_movies_with_ratings.save_snapshot")
     def test_clean_movies_with_ratings_full_pipeline(self, mock_save):
         df = pd.DataFrame(
             {
@@ -118,7 +118,7 @@ class TestCleanMoviesWithRatings:
         assert result["rating"].iloc[2] == 8.54
         assert mock_save.called
 
-    @patch("src.transform.clean_movies_with_ratings.save_dataframe_to_csv")
+    @patch("src.transform.clean_movies_with_ratings.save_snapshot")
     def test_clean_movies_with_ratings_calls_save_function(self, mock_save):
         df = pd.DataFrame(
             {
@@ -139,4 +139,35 @@ class TestCleanMoviesWithRatings:
         mock_save.assert_called_once()
         args, kwargs = mock_save.call_args
         assert args[1] == "data/processed"
-        assert args[2] == "cleaned_movies_with_ratings.csv"
+        assert args[2] == "cleaned_movies_with_ratings"
+
+
+def test_convert_date_to_int_keeps_parsed_integer_type():
+    df = pd.DataFrame(
+        {
+            "name": ["Parasite", "Unknown"],
+            "date": pd.array([2019, None], dtype="Int16"),
+            "minute": pd.array([133, None], dtype="Int32"),
+        }
+    )
+    result = convert_minute_to_int(convert_date_to_int(df))
+    assert result["date"].dtype == pd.Int16Dtype()
+    assert result["minute"].dtype == pd.Int32Dtype()
+
+
+@patch("src.transform.clean_movies_with_ratings.save_snapshot")
+def test_clean_movies_with_ratings_leaves_input_unchanged(mock_save):
+    df = pd.DataFrame(
+        {
+            "date": [2015, 2014],
+            "name": ["Ex Machina", "Insidious"],
+            "minute": [108, 103],
+            "rating": [3.5, 3.0],
+        }
+    )
+    original = df.copy()
+
+    result = clean_movies_with_ratings(df)
+
+    pd.testing.assert_frame_equal(df, original)
+    assert result["rating"].tolist() == [7.0, 6.0]
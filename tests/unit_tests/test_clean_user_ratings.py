@@ -1,11 +1,14 @@
+import numpy as np
 import pandas as pd
+import pytest
 from unittest.mock import patch
 from src.transform.clean_user_ratings import (
     clean_user_ratings,
     remove_missing_values,
     anonymise_user_id,
     consolidate_duplicated_movies,
-    consolidate_ratings_for_same_movie
+    consolidate_ratings_for_same_movie,
+    deduplicate_and_consolidate_ratings
 )
 
 
@@ -35,6 +38,27 @@ def test_anonymise_user_id():
     assert result["user_id"].iloc[2] == 3
 
 
+def test_anonymise_user_id_is_stable_across_runs():
+    anonymise_user_id(
+        pd.DataFrame(
+            {
+                "movie_id": ["mank", "insidious"],
+                "rating_val": [5, 10],
+                "user_id": ["deathproof", "bob"]
+            }
+        )
+    )
+    df = pd.DataFrame(
+        {
+            "movie_id": ["the-social-network", "mank"],
+            "rating_val": [8, 6],
+            "user_id": ["lily", "bob"]
+        }
+    )
+    result = anonymise_user_id(df)
+    assert result["user_id"].tolist() == [3, 2]
+
+
 def test_consolidate_duplicated_movies():
     df = pd.DataFrame(
         {
@@ -52,7 +76,7 @@ def test_consolidate_duplicated_movies():
 def test_consolidate_ratings_for_same_movie():
     df = pd.DataFrame(
         {
-            "movie_id": ["ex-machina-2015", "ex-machina-2015", "insidious"],
+            "movie_key": [1, 1, 2],
             "rating_val": [6, 8, 10],
             "user_id": ["deathproof", "deathproof", "bob"]
         }
@@ -63,8 +87,46 @@ def test_consolidate_ratings_for_same_movie():
     assert result.shape[0] == 2
 
 
+@pytest.mark.parametrize("rating_dtype", ["Float64", "float64", "int64"])
+def test_deduplicate_and_consolidate_ratings_matches_groupby(rating_dtype):
+    rng = np.random.default_rng(0)
+    rows = 5000
+    df = pd.DataFrame(
+        {
+            "movie_key": rng.integers(1, 40, rows).astype(np.int32),
+            "rating_val": pd.array(
+                rng.integers(1, 11, rows), dtype=rating_dtype
+            ),
+            "user_id": rng.integers(1, 60, rows),
+        }
+    )
+    if rating_dtype != "int64":
+        df["rating_val"] = df["rating_val"] / 3
+
+    result = deduplicate_and_consolidate_ratings(df)
+
+    expected = consolidate_ratings_for_same_movie(df.drop_duplicates())
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_deduplicate_and_consolidate_ratings_with_other_columns():
+    df = pd.DataFrame(
+        {
+            "movie_key": [1, 1],
+            "rating_val": [6.0, 6.0],
+            "user_id": [1, 1],
+            "_id": [1, 2],
+        }
+    )
+
+    result = deduplicate_and_consolidate_ratings(df)
+
+    assert result.columns.tolist() == ["movie_key", "user_id", "rating_val"]
+    assert result["rating_val"].tolist() == [6.0]
+
+
 class TestCleanUserRatings:
-    @patch("src.transform.clean_user_ratings.save_dataframe_to_csv")
+    @patch("src.transform.clean_user_ratings.save_processed_table")
     def test_clean_user_ratings_full_pipeline(self, mock_save):
         df = pd.DataFrame(
             {
@@ -84,12 +146,13 @@ class TestCleanUserRatings:
         assert len(result) == 2
         assert result["user_id"].iloc[0] == 1
         assert result["user_id"].iloc[1] == 2
-        assert result["movie_id"].iloc[0] == "ex-machina-2015"
-        assert result["movie_id"].iloc[1] == "insidious"
+        assert result["movie_key"].iloc[0] == 1
+        assert result["movie_key"].iloc[1] == 2
+        assert "movie_id" not in result.columns
         assert result["rating_val"].iloc[0] == 7
         assert mock_save.called
 
-    @patch("src.transform.clean_user_ratings.save_dataframe_to_csv")
+    @patch("src.transform.clean_user_ratings.save_processed_table")
     def test_clean_user_ratings_calls_save_function(self, mock_save):
         df = pd.DataFrame(
             {
@@ -104,4 +167,19 @@ class TestCleanUserRatings:
         mock_save.assert_called_once()
         args, kwargs = mock_save.call_args
         assert args[1] == "data/processed"
-        assert args[2] == "cleaned_user_ratings.csv"
+        assert args[2] == "cleaned_user_ratings"
+
+    @patch("src.transform.clean_user_ratings.save_processed_table")
+    def test_clean_user_ratings_accepts_chunks(self, mock_save):
+        df = pd.DataFrame(
+            {
+                "movie_id": ["ex-machina-2015", "ex-machina-2014", "insidious", "mank"],
+                "rating_val": [6, 8, 10, None],
+                "user_id": ["deathproof", "deathproof", "bob", "lily"]
+            }
+        )
+        chunks = iter([df.iloc[:2], df.iloc[2:]])
+
+        result = clean_user_ratings(chunks)
+
+        pd.testing.assert_frame_equal(result, clean_user_ratings(df.copy()))
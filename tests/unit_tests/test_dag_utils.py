@@ -0,0 +1,145 @@
+import threading
+import pytest
+from src.utils.dag_utils import (
+    find_critical_path,
+    get_step_dependencies,
+    run_dag,
+)
+
+
+def add(left, right):
+    return left + right
+
+
+def test_run_dag_passes_outputs_to_dependent_steps():
+    steps = {
+        "total": {"function": add, "inputs": ["a", "b"], "outputs": ["c"]},
+        "split": {
+            "function": lambda c: (c - 1, 1),
+            "inputs": ["c"],
+            "outputs": ["d", "e"],
+        },
+    }
+
+    values, durations = run_dag(steps, {"a": 1, "b": 2})
+
+    assert values["c"] == 3
+    assert (values["d"], values["e"]) == (2, 1)
+    assert set(durations) == {"total", "split"}
+
+
+def test_run_dag_runs_independent_steps_at_the_same_time():
+    # Each step waits for the other one to start, which only returns when
+    # both are running at once
+    barrier = threading.Barrier(2, timeout=5)
+
+    def meet(value):
+        barrier.wait()
+        return value
+
+    steps = {
+        name: {"function": meet, "inputs": [name], "outputs": [f"{name}!"]}
+        for name in ["a", "b"]
+    }
+
+    values, _ = run_dag(steps, {"a": 1, "b": 2}, max_workers=2)
+
+    assert (values["a!"], values["b!"]) == (1, 2)
+
+
+def test_run_dag_runs_steps_after_the_steps_they_follow():
+    order = []
+    steps = {
+        "first": {
+            "function": lambda: order.append("first"),
+            "inputs": [],
+            "outputs": ["x"],
+        },
+        "second": {
+            "function": lambda: order.append("second"),
+            "inputs": [],
+            "outputs": ["y"],
+            "after": ["first"],
+        },
+    }
+
+    run_dag(steps, {}, max_workers=2)
+
+    assert order == ["first", "second"]
+
+
+def test_run_dag_raises_the_error_of_a_failed_step():
+    ran = []
+    steps = {
+        "fail": {
+            "function": lambda: 1 / 0,
+            "inputs": [],
+            "outputs": ["x"],
+        },
+        "next": {
+            "function": ran.append,
+            "inputs": ["x"],
+            "outputs": ["y"],
+        },
+    }
+
+    with pytest.raises(ZeroDivisionError):
+        run_dag(steps, {})
+    assert ran == []
+
+
+def test_run_dag_rejects_missing_inputs():
+    steps = {"total": {"function": add, "inputs": ["a", "b"], "outputs": ["c"]}}
+
+    with pytest.raises(ValueError, match="Missing inputs"):
+        run_dag(steps, {"a": 1})
+
+
+@pytest.mark.parametrize(
+    "steps, message",
+    [
+        (
+            {
+                "a": {"function": add, "inputs": ["y"], "outputs": ["x"]},
+                "b": {"function": add, "inputs": ["x"], "outputs": ["y"]},
+            },
+            "depend on each other",
+        ),
+        (
+            {
+                "a": {"function": add, "inputs": [], "outputs": ["x"]},
+                "b": {"function": add, "inputs": [], "outputs": ["x"]},
+            },
+            "produced by both",
+        ),
+        (
+            {
+                "a": {
+                    "function": add,
+                    "inputs": [],
+                    "outputs": ["x"],
+                    "after": ["z"],
+                },
+            },
+            "unknown steps",
+        ),
+    ],
+)
+def test_get_step_dependencies_rejects_invalid_graphs(steps, message):
+    with pytest.raises(ValueError, match=message):
+        get_step_dependencies(steps)
+
+
+def test_find_critical_path():
+    dependencies = {
+        "clean_a": set(),
+        "clean_b": set(),
+        "merge": {"clean_a", "clean_b"},
+        "summary": {"clean_b"},
+    }
+    durations = {"clean_a": 1.0, "clean_b": 3.0, "merge": 2.0, "summary": 1.0}
+
+    path, seconds = find_critical_path(dependencies, durations)
+
+    assert path == ["clean_b", "merge"]
+    assert seconds == 5.0
@@ -30,6 +30,7 @@ def test_load_db_config(mocker):
     assert config['target_database']['password'] == 'test_password'
     assert config['target_database']['host'] == 'localhost'
     assert config['target_database']['port'] == '5432'
+    assert config['target_database']['schema'] == 'de_2506_a'
 
 
 def test_load_db_config_missing_env_var_port_defaults(mocker):
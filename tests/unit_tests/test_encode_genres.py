@@ -0,0 +1,103 @@
+import pandas as pd
+import pytest
+from src.transform.encode_genres import (
+    GENRES,
+    MAX_GENRES,
+    build_movie_genres,
+    encode_genre_mask,
+    encode_genres,
+    get_genre_ids,
+)
+from src.utils.list_utils import parse_string_lists
+
+
+@pytest.fixture
+def movies():
+    return pd.DataFrame(
+        {
+            "movie_key": [7, 3, 12],
+            "genres": parse_string_lists(
+                pd.Series(
+                    [
+                        '["Crime","Mystery","Thriller"]',
+                        '["Comedy"]',
+                        "[]",
+                    ]
+                )
+            ),
+        }
+    )
+
+
+def test_build_movie_genres(movies):
+    movie_genres = build_movie_genres(movies)
+
+    assert movie_genres["movie_key"].tolist() == [7, 7, 7, 3]
+    assert movie_genres["genre"].tolist() == [
+        "Crime", "Mystery", "Thriller", "Comedy"
+    ]
+    assert movie_genres["genre_id"].tolist() == [
+        GENRES.index(genre) for genre in movie_genres["genre"]
+    ]
+
+
+def test_build_movie_genres_from_python_lists(movies):
+    python_lists = movies.assign(
+        genres=[["Crime", "Mystery", "Thriller"], ["Comedy"], []]
+    )
+
+    pd.testing.assert_frame_equal(
+        build_movie_genres(python_lists), build_movie_genres(movies)
+    )
+
+
+def test_encode_genre_mask(movies):
+    movie_genres = build_movie_genres(movies)
+
+    masks = encode_genre_mask(movie_genres, movies["movie_key"])
+
+    assert masks.tolist() == [
+        (1 << GENRES.index("Crime"))
+        | (1 << GENRES.index("Mystery"))
+        | (1 << GENRES.index("Thriller")),
+        1 << GENRES.index("Comedy"),
+        0,
+    ]
+
+
+def test_genre_mask_matches_bridge_table(movies, mocker):
+    mocker.patch("src.transform.encode_genres.save_processed_table")
+
+    encoded_movies, movie_genres = encode_genres(movies)
+
+    comedy = encoded_movies["genre_mask"] & (1 << GENRES.index("Comedy"))
+
+    assert encoded_movies.loc[comedy > 0, "movie_key"].tolist() == (
+        movie_genres.loc[movie_genres["genre"] == "Comedy", "movie_key"]
+        .tolist()
+    )
+
+
+def test_new_genres_follow_the_known_ones():
+    genre_ids = get_genre_ids(pd.Series(["Comedy", "Noir", "Anime"]))
+
+    assert genre_ids["Comedy"] == GENRES.index("Comedy")
+    assert genre_ids["Anime"] == len(GENRES)
+    assert genre_ids["Noir"] == len(GENRES) + 1
+
+
+def test_new_genres_keep_their_ids_across_runs():
+    first = get_genre_ids(pd.Series(["Noir"]))
+    # Anime sorts before Noir, but Noir was given its bit first
+    second = get_genre_ids(pd.Series(["Anime", "Noir", "Drama"]))
+
+    assert second["Noir"] == first["Noir"] == len(GENRES)
+    assert second["Anime"] == len(GENRES) + 1
+    assert second["Drama"] == GENRES.index("Drama")
+
+
+def test_too_many_genres_raise_error():
+    genres = pd.Series([f"genre-{number}" for number in range(MAX_GENRES)])
+
+    with pytest.raises(ValueError, match="Too many genres"):
+        get_genre_ids(genres)
@@ -0,0 +1,176 @@
+import threading
+import pandas as pd
+import pytest
+from src.extract.extract import commit_extract_watermark, extract_data
+from src.transform.column_manifest import COLUMN_MANIFEST
+
+
+@pytest.fixture
+def mock_logger(mocker):
+    return mocker.patch("src.extract.extract.logger")
+
+
+@pytest.fixture
+def mock_extractors(mocker):
+    movies = pd.DataFrame({"movie_id": ["mank", "insidious"]})
+    movies_with_ratings = pd.DataFrame({"name": ["Mank"], "rating": [7.2]})
+    user_ratings = pd.DataFrame(
+        {"movie_id": ["mank"], "rating_val": [5], "user_id": ["lily"]}
+    )
+    return {
+        "movies": mocker.patch(
+            "src.extract.extract.extract_movies", return_value=movies
+        ),
+        "movies_with_ratings": mocker.patch(
+            "src.extract.extract.extract_movies_with_ratings",
+            return_value=movies_with_ratings,
+        ),
+        "user_ratings": mocker.patch(
+            "src.extract.extract.extract_user_ratings",
+            return_value=user_ratings,
+        ),
+    }
+
+
+def test_extract_data_sequential(mock_extractors, mock_logger):
+    result = extract_data()
+
+    assert result[0] is mock_extractors["movies"].return_value
+    assert result[1] is mock_extractors["movies_with_ratings"].return_value
+    assert result[2] is mock_extractors["user_ratings"].return_value
+
+
+def test_extract_data_concurrent_returns_same_tuple(
+    mock_extractors, mock_logger
+):
+    sequential = extract_data()
+    concurrent = extract_data(concurrent=True)
+
+    assert len(concurrent) == 3
+    for expected, actual in zip(sequential, concurrent):
+        assert actual is expected
+
+
+def test_extract_data_logs_wall_clock_and_summed_times(
+    mock_extractors, mock_logger
+):
+    extract_data(concurrent=True)
+
+    messages = [call.args[0] for call in mock_logger.info.call_args_list]
+    assert any(
+        "wall-clock time" in message and "summed per-source time" in message
+        for message in messages
+    )
+    assert any(message.startswith("Extracted movies in") for message in messages)
+
+
+def test_extract_data_concurrent_runs_sources_in_parallel(
+    mock_extractors, mock_logger
+):
+    # Each extractor waits until all three are running at the same time,
+    # which can only happen if they are executed concurrently
+    barrier = threading.Barrier(3, timeout=5)
+
+    def wait_for_other_sources(value):
+        def extractor(**kwargs):
+            barrier.wait()
+            return value
+        return extractor
+
+    for mock_extractor in mock_extractors.values():
+        mock_extractor.side_effect = wait_for_other_sources(
+            mock_extractor.return_value
+        )
+
+    result = extract_data(concurrent=True)
+
+    assert result[2] is mock_extractors["user_ratings"].return_value
+
+
+def test_extract_data_concurrent_failure_cancels_pending_sources(
+    mock_extractors, mock_logger
+):
+    mock_extractors["movies"].side_effect = Exception("Broken file")
+
+    with pytest.raises(Exception, match="Broken file"):
+        extract_data(concurrent=True, max_workers=1)
+
+    mock_extractors["movies_with_ratings"].assert_not_called()
+    mock_extractors["user_ratings"].assert_not_called()
+    mock_logger.error.assert_called_once_with(
+        "Data extraction failed: Broken file"
+    )
+
+
+def test_extract_data_streams_user_ratings(mocker, mock_extractors, mock_logger):
+    chunks = iter([pd.DataFrame({"movie_id": ["mank"]})])
+    mock_chunks = mocker.patch(
+        "src.extract.extract.extract_user_ratings_in_chunks",
+        return_value=chunks,
+    )
+
+    result = extract_data(user_ratings_chunk_size=10, column_manifest=None)
+
+    mock_chunks.assert_called_once_with(chunk_size=10, chunk_bytes=None)
+    assert result[2] is chunks
+    mock_extractors["user_ratings"].assert_not_called()
+
+
+def test_extract_data_rejects_chunked_incremental_csv_reads(
+    mock_extractors, mock_logger
+):
+    with pytest.raises(ValueError, match="cannot be chunked"):
+        extract_data(user_ratings_chunk_size=10, incremental=True)
+
+
+def test_commit_extract_watermark_commits_the_source_watermark(mocker):
+    commit = mocker.patch(
+        "src.extract.extract.commit_watermark", return_value=True
+    )
+
+    assert commit_extract_watermark("db")
+    commit.assert_called_once_with("user_ratings_db")
+
+
+def test_extract_data_passes_use_cache(mock_extractors, mock_logger):
+    extract_data(use_cache=True, column_manifest=None)
+
+    for mock_extractor in mock_extractors.values():
+        mock_extractor.assert_called_once_with(use_cache=True)
+
+
+def test_extract_data_projects_manifest_columns(mock_extractors, mock_logger):
+    extract_data(column_manifest={"movies_with_ratings": ["name", "rating"]})
+
+    mock_extractors["movies"].assert_called_once_with(use_cache=False)
+    mock_extractors["movies_with_ratings"].assert_called_once_with(
+        use_cache=False, columns=["name", "rating"]
+    )
+
+
+def test_extract_data_uses_column_manifest_by_default(
+    mock_extractors, mock_logger
+):
+    extract_data()
+
+    for name, mock_extractor in mock_extractors.items():
+        mock_extractor.assert_called_once_with(
+            use_cache=False, columns=COLUMN_MANIFEST[name]
+        )
+
+
+def test_extract_data_passes_file_paths(mock_extractors, mock_logger):
+    extract_data(
+        column_manifest=None,
+        file_paths={"user_ratings": "data/raw/user_ratings/part-*.csv.gz"},
+    )
+
+    mock_extractors["movies"].assert_called_once_with(use_cache=False)
+    mock_extractors["user_ratings"].assert_called_once_with(
+        use_cache=False, file_path="data/raw/user_ratings/part-*.csv.gz"
+    )
+
+
+def test_extract_data_rejects_file_paths_for_db(mock_logger):
+    with pytest.raises(ValueError):
+        extract_data(source="db", file_paths={"movies": "movies.csv"})
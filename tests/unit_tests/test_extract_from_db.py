@@ -0,0 +1,234 @@
+import re
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+from src.extract.extract import extract_data
+from src.utils.watermark_utils import commit_watermark
+from src.extract.extract_from_db import (
+    extract_table_from_db,
+    extract_movies_with_ratings_from_db,
+    extract_user_ratings_from_db,
+    USER_RATINGS_KEY_COLUMN,
+    MOVIES_WITH_RATINGS_TABLE,
+    USER_RATINGS_TABLE,
+)
+
+
+@pytest.fixture
+def mock_logger(mocker):
+    return mocker.patch("src.extract.extract_from_db.logger")
+
+
+@pytest.fixture
+def source_db(mocker, tmp_path):
+    # SQLite stand-in for the source database
+    engine = create_engine(f"sqlite:///{tmp_path / 'source.db'}")
+    pd.DataFrame(
+        {
+            USER_RATINGS_KEY_COLUMN: list(range(1, 8)),
+            "movie_id": [f"movie-{i}" for i in range(7)],
+            "rating_val": [i + 1 for i in range(7)],
+            "user_id": ["deathproof"] * 4 + ["lily"] * 3,
+        }
+    ).to_sql(USER_RATINGS_TABLE, engine, index=False)
+    pd.DataFrame(
+        {
+            "id": [1000002, 1000003],
+            "name": ["Parasite", "Mank"],
+            "date": [2019.0, None],
+            "minute": [133.0, 131.0],
+            "rating": [4.56, 3.41],
+        }
+    ).to_sql(MOVIES_WITH_RATINGS_TABLE, engine, index=False)
+    mocker.patch(
+        "src.extract.extract_from_db.load_db_config",
+        return_value={"source_database": {"dbname": "source"}},
+    )
+    mock_connection = mocker.patch(
+        "src.extract.extract_from_db.get_db_connection",
+        side_effect=lambda connection_params: engine.connect(),
+    )
+    yield mock_connection
+    engine.dispose()
+
+
+def test_extract_table_from_db_returns_dataframe(source_db, mock_logger):
+    df = extract_user_ratings_from_db()
+
+    assert isinstance(df, pd.DataFrame)
+    assert df.shape == (7, 4)
+    assert df["rating_val"].dtype == pd.Int8Dtype()
+    source_db.assert_called_once_with({"dbname": "source"})
+
+
+def test_extract_table_from_db_applies_declared_schema(
+    source_db, mock_logger
+):
+    df = extract_movies_with_ratings_from_db()
+
+    assert df["date"].dtype == pd.Int16Dtype()
+    assert df["date"].isna().tolist() == [False, True]
+    assert df["rating"].dtype == "float32"
+
+
+def test_extract_table_from_db_in_chunks(source_db, mock_logger, mocker):
+    mock_log = mocker.patch(
+        "src.extract.extract_from_db.log_extract_success"
+    )
+
+    chunks = extract_user_ratings_from_db(chunk_size=3)
+
+    assert not isinstance(chunks, pd.DataFrame)
+    chunk_list = list(chunks)
+    assert [len(chunk) for chunk in chunk_list] == [3, 3, 1]
+    assert pd.concat(chunk_list)["movie_id"].tolist() == [
+        f"movie-{i}" for i in range(7)
+    ]
+    assert mock_log.call_args.args[2] == (7, 4)
+
+
+def test_extract_table_from_db_error(source_db, mock_logger):
+    with pytest.raises(
+        Exception,
+        match=re.escape("Failed to load table from database: missing_table"),
+    ):
+        extract_table_from_db("missing_table")
+
+    mock_logger.error.assert_called_once()
+
+
+def test_extract_data_from_db_source(source_db, mocker):
+    mocker.patch("src.extract.extract.logger")
+    mocker.patch(
+        "src.extract.extract.extract_movies_from_db",
+        return_value=pd.DataFrame({"movie_id": ["movie-0"]}),
+    )
+
+    movies, movies_with_ratings, user_ratings = extract_data(source="db")
+
+    assert movies.shape == (1, 1)
+    assert list(movies_with_ratings.columns) == [
+        "name", "date", "minute", "rating"
+    ]
+    assert user_ratings.shape == (7, 3)
+
+
+@pytest.fixture
+def state_dir(mocker, tmp_path):
+    return mocker.patch(
+        "src.utils.watermark_utils.STATE_DIR", str(tmp_path / "state")
+    )
+
+
+def test_extract_user_ratings_from_db_incremental(
+    source_db, mock_logger, state_dir, tmp_path
+):
+    first = extract_user_ratings_from_db(incremental=True)
+    commit_watermark("user_ratings_db")
+    engine = create_engine(f"sqlite:///{tmp_path / 'source.db'}")
+    pd.DataFrame(
+        {
+            USER_RATINGS_KEY_COLUMN: [8, 9],
+            "movie_id": ["insidious", "hush-2016"],
+            "rating_val": [10, 8],
+            "user_id": ["bob", "bob"],
+        }
+    ).to_sql(USER_RATINGS_TABLE, engine, index=False, if_exists="append")
+    engine.dispose()
+
+    second = extract_user_ratings_from_db(incremental=True)
+    full = extract_user_ratings_from_db(incremental=True, full_refresh=True)
+
+    assert len(first) == 7
+    assert second["movie_id"].tolist() == ["insidious", "hush-2016"]
+    assert len(full) == 9
+
+
+def test_extract_user_ratings_from_db_incremental_chunks(
+    source_db, mock_logger, state_dir
+):
+    chunks = extract_user_ratings_from_db(chunk_size=3, incremental=True)
+    assert sum(len(chunk) for chunk in chunks) == 7
+    commit_watermark("user_ratings_db")
+
+    chunks = extract_user_ratings_from_db(chunk_size=3, incremental=True)
+
+    assert list(chunks) == []
+
+
+def test_extract_table_from_db_selects_columns(source_db, mock_logger):
+    df = extract_movies_with_ratings_from_db(columns=["name", "rating"])
+
+    assert list(df.columns) == ["name", "rating"]
+    assert df["rating"].dtype == "float32"
+
+
+def test_extract_user_ratings_from_db_incremental_projects_columns(
+    source_db, mock_logger, state_dir
+):
+    df = extract_user_ratings_from_db(incremental=True, columns=["movie_id"])
+    chunks = list(
+        extract_user_ratings_from_db(
+            chunk_size=3, incremental=True, full_refresh=True,
+            columns=["movie_id"],
+        )
+    )
+
+    # The key is read to track the watermark but not returned
+    assert list(df.columns) == ["movie_id"]
+    assert all(list(chunk.columns) == ["movie_id"] for chunk in chunks)
+    commit_watermark("user_ratings_db")
+    assert extract_user_ratings_from_db(incremental=True).empty
+
+
+def test_extract_table_from_db_keeps_columns_of_an_empty_result(
+    source_db, mock_logger, state_dir
+):
+    extract_user_ratings_from_db(incremental=True)
+    commit_watermark("user_ratings_db")
+
+    df = extract_user_ratings_from_db(incremental=True)
+
+    assert df.empty
+    assert list(df.columns) == [
+        USER_RATINGS_KEY_COLUMN, "movie_id", "rating_val", "user_id"
+    ]
+    assert df["rating_val"].dtype == pd.Int8Dtype()
+
+
+def test_extract_table_from_db_disposes_the_engine(
+    source_db, mock_logger, mocker
+):
+    dispose = mocker.patch("sqlalchemy.engine.Engine.dispose")
+
+    extract_user_ratings_from_db()
+    list(extract_user_ratings_from_db(chunk_size=3))
+
+    assert dispose.call_count == 2
+
+
+def test_extract_user_ratings_from_db_accumulates_new_rows(
+    source_db, mock_logger, state_dir, tmp_path
+):
+    extract_user_ratings_from_db(incremental=True, accumulate=True)
+    commit_watermark("user_ratings_db")
+    engine = create_engine(f"sqlite:///{tmp_path / 'source.db'}")
+    pd.DataFrame(
+        {
+            USER_RATINGS_KEY_COLUMN: [8],
+            "movie_id": ["insidious"],
+            "rating_val": [10],
+            "user_id": ["bob"],
+        }
+    ).to_sql(USER_RATINGS_TABLE, engine, index=False, if_exists="append")
+    engine.dispose()
+
+    df = extract_user_ratings_from_db(
+        incremental=True, accumulate=True, columns=["movie_id"]
+    )
+
+    # The kept rows hold every column, so the table is read again in full
+    assert df["movie_id"].tolist()[-2:] == ["movie-6", "insidious"]
+    assert list(df.columns) == ["movie_id"] and len(df) == 8
+    with pytest.raises(ValueError, match="chunks"):
+        extract_user_ratings_from_db(chunk_size=3, accumulate=True)
@@ -5,7 +5,6 @@ from src.extract.extract_movies import (
     extract_movies,
     TYPE,
     FILE_PATH,
-    EXPECTED_PERFORMANCE,
 )
 
 
@@ -103,7 +102,7 @@ def test_log_extract_success_movies(
 
     # Assertions
     mock_log_extract_success.assert_called_once_with(
-        mock_logger, TYPE, df.shape, mock_execution_time, EXPECTED_PERFORMANCE
+        mock_logger, TYPE, df.shape, mock_execution_time, mocker.ANY
     )
 
 
@@ -124,3 +123,11 @@ def test_log_movies_error(mocker, mock_logger):
     mock_logger.error.assert_called_once_with(
         f"Error loading {FILE_PATH}: Failed to load CSV file: {FILE_PATH}"
     )
+
+
+def test_extract_movies_uses_declared_schema(mock_log_extract_success):
+    df = extract_movies()
+
+    assert isinstance(df["original_language"].dtype, pd.CategoricalDtype)
+    assert df["runtime"].dtype == pd.Int16Dtype()
+    assert df["year_released"].dtype == pd.Int16Dtype()
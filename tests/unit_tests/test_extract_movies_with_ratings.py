@@ -5,7 +5,6 @@ from src.extract.extract_movies_with_ratings import (
     extract_movies_with_ratings,
     TYPE,
     FILE_PATH,
-    EXPECTED_PERFORMANCE,
 )
 
 
@@ -85,7 +84,7 @@ def test_log_extract_success_movies_with_ratings(
 
     # Assertions
     mock_log_extract_success.assert_called_once_with(
-        mock_logger, TYPE, df.shape, mock_execution_time, EXPECTED_PERFORMANCE
+        mock_logger, TYPE, df.shape, mock_execution_time, mocker.ANY
     )
 
 
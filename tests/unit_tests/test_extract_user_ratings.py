@@ -3,9 +3,14 @@ import pytest
 import re
 from src.extract.extract_user_ratings import (
     extract_user_ratings,
+    extract_user_ratings_in_chunks,
     TYPE,
     FILE_PATH,
-    EXPECTED_PERFORMANCE,
+    SCHEMA,
+)
+from src.utils.watermark_utils import (
+    commit_watermark,
+    read_csv_since_watermark,
 )
 
 
@@ -73,7 +78,7 @@ def test_log_extract_success_user_ratings(
 
     # Assertions
     mock_log_extract_success.assert_called_once_with(
-        mock_logger, TYPE, df.shape, mock_execution_time, EXPECTED_PERFORMANCE
+        mock_logger, TYPE, df.shape, mock_execution_time, mocker.ANY
     )
 
 
@@ -94,3 +99,267 @@ def test_log_user_ratings_error(mocker, mock_logger):
     mock_logger.error.assert_called_once_with(
         f"Error loading {FILE_PATH}: Failed to load CSV file: {FILE_PATH}"
     )
+
+
+@pytest.fixture
+def user_ratings_csv(tmp_path, mocker):
+    file_path = tmp_path / "unclean_user_ratings.csv"
+    pd.DataFrame(
+        {
+            "movie_id": [f"movie-{i}" for i in range(10)],
+            "rating_val": [i % 10 + 1 for i in range(10)],
+            "user_id": ["deathproof"] * 5 + ["lily"] * 5,
+        }
+    ).to_csv(file_path, index=False)
+    mocker.patch(
+        "src.extract.extract_user_ratings.FILE_PATH", str(file_path)
+    )
+    return file_path
+
+
+def test_extract_user_ratings_in_chunks_by_rows(
+    user_ratings_csv, mock_log_extract_success, mock_logger
+):
+    chunks = list(extract_user_ratings_in_chunks(chunk_size=4))
+
+    assert [len(chunk) for chunk in chunks] == [4, 4, 2]
+    result = pd.concat(chunks, ignore_index=True)
+    pd.testing.assert_frame_equal(
+        result,
+        pd.read_csv(user_ratings_csv, dtype_backend="pyarrow", dtype=SCHEMA),
+    )
+
+    # Logged once, with the total rows, once the stream is exhausted
+    mock_log_extract_success.assert_called_once()
+    args = mock_log_extract_success.call_args.args
+    assert args[2] == (10, 3)
+
+
+def test_extract_user_ratings_in_chunks_by_bytes(
+    user_ratings_csv, mock_log_extract_success, mock_logger
+):
+    chunks = list(extract_user_ratings_in_chunks(chunk_bytes=64))
+
+    assert len(chunks) > 1
+    result = pd.concat(chunks, ignore_index=True)
+    assert result["movie_id"].tolist() == [f"movie-{i}" for i in range(10)]
+    assert result["rating_val"].dtype == pd.Int8Dtype()
+    assert mock_log_extract_success.call_args.args[2] == (10, 3)
+
+
+def test_extract_user_ratings_in_chunks_is_lazy(
+    user_ratings_csv, mock_log_extract_success, mock_logger
+):
+    chunks = extract_user_ratings_in_chunks(chunk_size=4)
+
+    next(chunks)
+
+    mock_log_extract_success.assert_not_called()
+
+
+def test_extract_user_ratings_in_chunks_requires_a_size():
+    with pytest.raises(ValueError):
+        next(extract_user_ratings_in_chunks(chunk_size=None))
+
+
+def test_extract_user_ratings_in_chunks_error(mocker, mock_logger):
+    mocker.patch(
+        "src.extract.extract_user_ratings.pd.read_csv",
+        side_effect=Exception("Broken file"),
+    )
+
+    with pytest.raises(
+        Exception, match=re.escape(f"Failed to load CSV file: {FILE_PATH}")
+    ):
+        list(extract_user_ratings_in_chunks(chunk_size=4))
+
+    mock_logger.error.assert_called_once_with(
+        f"Error loading {FILE_PATH}: Broken file"
+    )
+
+
+def test_extract_user_ratings_uses_declared_schema(
+    user_ratings_csv, mock_log_extract_success, mock_logger
+):
+    df = extract_user_ratings()
+
+    assert df["rating_val"].dtype == pd.Int8Dtype()
+    assert df["movie_id"].tolist() == [f"movie-{i}" for i in range(10)]
+
+
+def test_extract_user_ratings_incremental(
+    mocker, user_ratings_csv, mock_log_extract_success, mock_logger, tmp_path
+):
+    state_dir = str(tmp_path / "state")
+    mocker.patch("src.utils.watermark_utils.STATE_DIR", state_dir)
+
+    first = extract_user_ratings(incremental=True)
+    commit_watermark("user_ratings")
+    with open(user_ratings_csv, "a") as file:
+        file.write("insidious,7,bob\n")
+    second = extract_user_ratings(incremental=True)
+    full = extract_user_ratings(incremental=True, full_refresh=True)
+
+    assert len(first) == 10
+    assert second["movie_id"].tolist() == ["insidious"]
+    assert len(full) == 11
+
+
+def test_extract_user_ratings_incremental_without_commit_rereads(
+    mocker, user_ratings_csv, mock_log_extract_success, mock_logger, tmp_path
+):
+    mocker.patch(
+        "src.utils.watermark_utils.STATE_DIR", str(tmp_path / "state")
+    )
+
+    extract_user_ratings(incremental=True)
+    second = extract_user_ratings(incremental=True)
+
+    # The first run never committed its watermark, so nothing is skipped
+    assert len(second) == 10
+
+
+def test_extract_user_ratings_accumulates_new_rows(
+    mocker, user_ratings_csv, mock_log_extract_success, mock_logger, tmp_path
+):
+    mocker.patch(
+        "src.utils.watermark_utils.STATE_DIR", str(tmp_path / "state")
+    )
+    first = extract_user_ratings(incremental=True, accumulate=True)
+    commit_watermark("user_ratings")
+    with open(user_ratings_csv, "a") as file:
+        file.write("insidious,7,bob\n")
+    read = mocker.patch(
+        "src.extract.extract_user_ratings.read_csv_since_watermark",
+        wraps=read_csv_since_watermark,
+    )
+
+    second = extract_user_ratings(incremental=True, accumulate=True)
+
+    # Only the rows after the watermark are parsed, but every row is
+    # returned
+    assert read.call_count == 1
+    assert read.call_args.args[1]["row_count"] == 10
+    pd.testing.assert_frame_equal(second.iloc[:10], first)
+    assert second["movie_id"].tolist()[-1] == "insidious"
+    assert second["rating_val"].dtype == pd.Int8Dtype()
+
+
+def test_extract_user_ratings_accumulate_rereads_without_kept_rows(
+    mocker, user_ratings_csv, mock_log_extract_success, mock_logger, tmp_path
+):
+    mocker.patch(
+        "src.utils.watermark_utils.STATE_DIR", str(tmp_path / "state")
+    )
+    # A watermark committed without keeping the rows it covers
+    extract_user_ratings(incremental=True)
+    commit_watermark("user_ratings")
+    with open(user_ratings_csv, "a") as file:
+        file.write("insidious,7,bob\n")
+
+    user_ratings = extract_user_ratings(incremental=True, accumulate=True)
+
+    assert len(user_ratings) == 11
+    mock_logger.warning.assert_called_once()
+
+
+@pytest.mark.parametrize(
+    "read",
+    [
+        lambda columns: extract_user_ratings(columns=columns),
+        lambda columns: pd.concat(
+            extract_user_ratings_in_chunks(chunk_size=4, columns=columns)
+        ),
+        lambda columns: pd.concat(
+            extract_user_ratings_in_chunks(chunk_bytes=64, columns=columns)
+        ),
+        lambda columns: extract_user_ratings(
+            incremental=True, columns=columns
+        ),
+    ],
+)
+def test_extract_user_ratings_projects_columns(
+    mocker, read, user_ratings_csv, mock_log_extract_success, mock_logger,
+    tmp_path
+):
+    mocker.patch(
+        "src.utils.watermark_utils.STATE_DIR", str(tmp_path / "state")
+    )
+
+    df = read(["movie_id", "rating_val"])
+
+    assert list(df.columns) == ["movie_id", "rating_val"]
+    assert len(df) == 10
+    assert df["rating_val"].dtype == pd.Int8Dtype()
+
+
+def test_extract_user_ratings_incremental_projects_appended_rows(
+    mocker, user_ratings_csv, mock_log_extract_success, mock_logger, tmp_path
+):
+    mocker.patch(
+        "src.utils.watermark_utils.STATE_DIR", str(tmp_path / "state")
+    )
+
+    extract_user_ratings(incremental=True, columns=["user_id"])
+    commit_watermark("user_ratings")
+    with open(user_ratings_csv, "a") as file:
+        file.write("insidious,7,bob\n")
+    second = extract_user_ratings(incremental=True, columns=["user_id"])
+
+    assert second.to_dict("list") == {"user_id": ["bob"]}
+
+
+@pytest.fixture
+def user_ratings_parts(tmp_path):
+    shard_dir = tmp_path / "unclean_user_ratings"
+    shard_dir.mkdir()
+    for part in range(3):
+        pd.DataFrame(
+            {
+                "movie_id": [f"movie-{part}-{i}" for i in range(4)],
+                "rating_val": [part + 1] * 4,
+                "user_id": ["lily"] * 4,
+            }
+        ).to_csv(shard_dir / f"part-{part:05d}.csv.gz", index=False)
+    return str(shard_dir / "part-*.csv.gz")
+
+
+@pytest.mark.parametrize(
+    "read",
+    [
+        lambda file_path: extract_user_ratings(file_path=file_path),
+        lambda file_path: extract_user_ratings(
+            use_cache=True, file_path=file_path
+        ),
+        lambda file_path: pd.concat(
+            extract_user_ratings_in_chunks(chunk_size=3, file_path=file_path)
+        ),
+        lambda file_path: pd.concat(
+            extract_user_ratings_in_chunks(
+                chunk_bytes=64, file_path=file_path
+            )
+        ),
+    ],
+)
+def test_extract_user_ratings_reads_compressed_parts(
+    mocker, read, user_ratings_parts, mock_log_extract_success, mock_logger,
+    tmp_path
+):
+    mocker.patch("src.utils.cache_utils.CACHE_DIR", str(tmp_path / "cache"))
+
+    df = read(user_ratings_parts)
+
+    assert df["rating_val"].tolist() == [1] * 4 + [2] * 4 + [3] * 4
+    assert df["movie_id"].iloc[-1] == "movie-2-3"
+    assert df["rating_val"].dtype == pd.Int8Dtype()
+
+
+def test_extract_user_ratings_incremental_rejects_parts(
+    user_ratings_parts, mock_logger
+):
+    with pytest.raises(Exception, match="Failed to load CSV file"):
+        extract_user_ratings(incremental=True, file_path=user_ratings_parts)
+
+    assert "single uncompressed CSV file" in (
+        mock_logger.error.call_args.args[0]
+    )
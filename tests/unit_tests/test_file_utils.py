@@ -2,8 +2,15 @@ import pytest
 import os
 import tempfile
 import pandas as pd
+import pyarrow as pa
 from unittest.mock import patch
-from src.utils.file_utils import find_project_root, save_dataframe_to_csv
+import pyarrow.parquet as pq
+from src.utils.file_utils import (
+    find_project_root,
+    read_dataframe_from_parquet,
+    save_dataframe_to_csv,
+    save_dataframe_to_parquet,
+)
 
 
 # Classes create suites inside a test file
@@ -114,3 +121,79 @@ class TestSaveDataframeToCSV:
                 mock_print.assert_called_once_with(
                     f"Data saved to {expected_path}"
                 )
+
+    def test_save_dataframe_writes_arrow_lists_like_python_lists(self):
+        """Test that Arrow list columns are saved as printed lists."""
+        df = pd.DataFrame(
+            {
+                "genres": pd.Series(
+                    [["Crime", "Mystery"], []],
+                    dtype=pd.ArrowDtype(pa.list_(pa.string())),
+                )
+            }
+        )
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with patch("src.utils.file_utils.ROOT_DIR", temp_dir):
+                save_dataframe_to_csv(df, "test_dir", "test.csv")
+
+                saved_df = pd.read_csv(
+                    os.path.join(temp_dir, "test_dir", "test.csv")
+                )
+                assert saved_df["genres"].tolist() == [
+                    "['Crime', 'Mystery']", "[]"
+                ]
+
+
+class TestSaveDataframeToParquet:
+    @pytest.fixture
+    def movies(self):
+        return pd.DataFrame(
+            {
+                "movie_id": pd.Series(
+                    ["insomnia-2002", "a-bugs-life"],
+                    dtype=pd.ArrowDtype(pa.string()),
+                ),
+                "genres": pd.Series(
+                    [["Crime", "Mystery"], []],
+                    dtype=pd.ArrowDtype(pa.list_(pa.string())),
+                ),
+                "original_language": pd.Series(
+                    ["en", "en"],
+                    dtype=pd.CategoricalDtype(
+                        pd.Index(["en"], dtype=pd.ArrowDtype(pa.string()))
+                    ),
+                ),
+                "runtime": pd.Series([118, None], dtype="Int16"),
+                "ratings_count": pd.Series([5, None], dtype="Int64"),
+                "rating": [3.5, 3.2],
+            }
+        )
+
+    def test_save_dataframe_to_parquet_keeps_types(self, movies):
+        """Test that the column types survive the round trip."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with patch("src.utils.file_utils.ROOT_DIR", temp_dir):
+                save_dataframe_to_parquet(movies, "test_dir", "movies.parquet")
+
+                saved_df = read_dataframe_from_parquet(
+                    os.path.join(temp_dir, "test_dir", "movies.parquet")
+                )
+                pd.testing.assert_frame_equal(saved_df, movies)
+
+    def test_save_dataframe_to_parquet_is_readable_by_pandas(self, movies):
+        """Test that plain pd.read_parquet can read the saved file."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with patch("src.utils.file_utils.ROOT_DIR", temp_dir):
+                save_dataframe_to_parquet(movies, "test_dir", "movies.parquet")
+
+                file_path = os.path.join(temp_dir, "test_dir", "movies.parquet")
+                saved_df = pd.read_parquet(file_path)
+                assert saved_df["genres"].map(list).tolist() == [
+                    ["Crime", "Mystery"], []
+                ]
+                assert saved_df["runtime"].dtype == "Int16"
+                compression = pq.ParquetFile(file_path).metadata.row_group(
+                    0
+                ).column(0).compression
+                assert compression == "ZSTD"
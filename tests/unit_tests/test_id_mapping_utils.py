@@ -0,0 +1,63 @@
+import pandas as pd
+import pytest
+from src.utils.id_mapping_utils import (
+    load_id_mapping,
+    map_to_persistent_ids,
+)
+
+
+def test_ids_follow_first_appearance(tmp_path):
+    ids = map_to_persistent_ids(
+        pd.Series(["lily", "bob", "lily", "deathproof"]),
+        "user_id",
+        str(tmp_path),
+    )
+
+    assert ids.tolist() == [1, 2, 1, 3]
+
+
+def test_known_keys_keep_their_ids(tmp_path):
+    map_to_persistent_ids(pd.Series(["lily", "bob"]), "user_id", str(tmp_path))
+
+    ids = map_to_persistent_ids(
+        pd.Series(["deathproof", "bob", "lily"]), "user_id", str(tmp_path)
+    )
+
+    assert ids.tolist() == [3, 2, 1]
+
+
+def test_new_keys_are_appended_to_the_mapping(tmp_path):
+    map_to_persistent_ids(pd.Series(["lily"]), "user_id", str(tmp_path))
+    map_to_persistent_ids(pd.Series(["bob"]), "user_id", str(tmp_path))
+
+    mapping = load_id_mapping("user_id", str(tmp_path))
+
+    assert mapping["key"].tolist() == ["lily", "bob"]
+    assert mapping["id"].tolist() == [1, 2]
+    assert len(list((tmp_path / "user_id").glob("part-*.parquet"))) == 2
+
+
+def test_known_keys_do_not_write_a_part(tmp_path):
+    map_to_persistent_ids(pd.Series(["lily"]), "user_id", str(tmp_path))
+    map_to_persistent_ids(pd.Series(["lily"]), "user_id", str(tmp_path))
+
+    assert len(list((tmp_path / "user_id").glob("part-*.parquet"))) == 1
+
+
+def test_ids_keep_the_index(tmp_path):
+    keys = pd.Series(["lily", "bob"], index=[10, 20])
+
+    ids = map_to_persistent_ids(keys, "user_id", str(tmp_path))
+
+    assert ids.index.tolist() == [10, 20]
+
+
+def test_missing_keys_raise_error(tmp_path):
+    with pytest.raises(ValueError, match="missing user_id"):
+        map_to_persistent_ids(
+            pd.Series(["lily", None]), "user_id", str(tmp_path)
+        )
+
+
+def test_load_id_mapping_without_previous_run(tmp_path):
+    assert load_id_mapping("user_id", str(tmp_path)).empty
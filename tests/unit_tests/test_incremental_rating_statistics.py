@@ -0,0 +1,155 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.transform.rating_statistics import compute_rating_statistics
+from src.transform.incremental_rating_statistics import (
+    apply_rating_batch,
+    build_aggregate_state,
+    diff_ratings,
+    fingerprint_aggregate_state,
+    load_aggregate_state,
+    pack_pair_keys,
+    update_rating_statistics,
+    verify_rating_statistics,
+    with_means,
+)
+
+
+@pytest.fixture
+def ratings():
+    return pd.DataFrame(
+        {
+            "movie_key": pd.Series([1, 1, 2, 3], dtype="int32"),
+            "user_id": [1, 2, 2, 3],
+            "rating_val": [6.0, 8.0, 10.0, 4.0],
+        }
+    )
+
+
+def assert_matches_full_recompute(ratings, movie_statistics, user_statistics):
+    expected_movies, expected_users = compute_rating_statistics(ratings)
+    for statistics, expected in [
+        (movie_statistics, expected_movies),
+        (user_statistics, expected_users),
+    ]:
+        key = expected.columns[0]
+        actual = statistics.sort_values(key).reset_index(drop=True)
+        assert actual[key].tolist() == expected[key].tolist()
+        assert actual["count"].tolist() == expected["count"].tolist()
+        np.testing.assert_allclose(actual["mean"], expected["mean"])
+
+
+def test_update_rating_statistics_builds_the_state_on_the_first_run(
+    ratings,
+):
+    movie_statistics, user_statistics = update_rating_statistics(ratings)
+
+    assert_matches_full_recompute(ratings, movie_statistics, user_statistics)
+    assert load_aggregate_state()["ratings"]["rating_val"].tolist() == [
+        6.0, 8.0, 10.0, 4.0
+    ]
+
+
+def test_update_rating_statistics_applies_the_changes_since_the_last_run(
+    ratings,
+):
+    update_rating_statistics(ratings)
+    version = fingerprint_aggregate_state()
+    changed = pd.concat(
+        [
+            ratings.iloc[1:3].assign(rating_val=[2.0, 10.0]),
+            pd.DataFrame(
+                {"movie_key": [3], "user_id": [4], "rating_val": [9.0]}
+            ).astype({"movie_key": "int32"}),
+        ],
+        ignore_index=True,
+    )
+
+    movie_statistics, user_statistics = update_rating_statistics(
+        changed, verify=True
+    )
+
+    assert_matches_full_recompute(changed, movie_statistics, user_statistics)
+    assert fingerprint_aggregate_state() != version
+
+
+def test_apply_rating_batch_retracts_the_earlier_rating(ratings):
+    state = build_aggregate_state(ratings)
+    batch = pd.DataFrame(
+        {"movie_key": [1], "user_id": [2], "rating_val": [4.0]}
+    )
+
+    state, changed_movies, changed_users = apply_rating_batch(state, batch)
+
+    # A user who re-rates a film is still counted once
+    assert changed_movies["movie_key"].tolist() == [1]
+    assert changed_movies["count"].tolist() == [2]
+    assert changed_movies["sum"].tolist() == [10.0]
+    assert changed_users["user_id"].tolist() == [2]
+    assert changed_users["sum"].tolist() == [14.0]
+    assert len(state["ratings"]) == 4
+
+
+def test_apply_rating_batch_reports_removed_keys_with_a_count_of_zero(
+    ratings,
+):
+    state = build_aggregate_state(ratings)
+    batch = pd.DataFrame(
+        {"movie_key": [3], "user_id": [3], "rating_val": [np.nan]}
+    )
+
+    state, changed_movies, changed_users = apply_rating_batch(state, batch)
+
+    assert changed_movies[["movie_key", "count"]].values.tolist() == [[3, 0]]
+    assert changed_users[["user_id", "count"]].values.tolist() == [[3, 0]]
+    assert 3 not in state["movie_key"]["movie_key"].tolist()
+    assert len(state["ratings"]) == 3
+
+
+def test_apply_rating_batch_keeps_the_ratings_in_key_order(ratings):
+    state = build_aggregate_state(ratings)
+    batch = pd.DataFrame(
+        {
+            "movie_key": [2, 1, 3],
+            "user_id": [1, 3, 3],
+            "rating_val": [7.0, 5.0, np.nan],
+        }
+    )
+
+    state, _, _ = apply_rating_batch(state, batch)
+
+    keys = pack_pair_keys(state["ratings"])
+    assert (keys[1:] > keys[:-1]).all()
+    assert state["ratings"]["rating_val"].tolist() == [
+        6.0, 8.0, 5.0, 7.0, 10.0
+    ]
+
+
+def test_diff_ratings_finds_new_changed_and_removed_ratings(ratings):
+    state = build_aggregate_state(ratings)
+    current = pd.concat(
+        [
+            ratings.iloc[[0, 2]],
+            pd.DataFrame({"movie_key": [1], "user_id": [2], "rating_val": [1]}),
+            pd.DataFrame({"movie_key": [4], "user_id": [1], "rating_val": [3]}),
+        ],
+        ignore_index=True,
+    )
+
+    batch = diff_ratings(state["ratings"], current)
+
+    assert batch.values.tolist() == [
+        [1, 2, 1.0],
+        [4, 1, 3.0],
+        [3, 3, pytest.approx(np.nan, nan_ok=True)],
+    ]
+
+
+def test_verify_rating_statistics_raises_on_a_mismatch(ratings):
+    state = build_aggregate_state(ratings)
+    movie_statistics = with_means(state["movie_key"].assign(sum=1.0))
+
+    with pytest.raises(ValueError, match="movie_key"):
+        verify_rating_statistics(
+            ratings, movie_statistics, with_means(state["user_id"])
+        )
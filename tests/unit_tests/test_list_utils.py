@@ -0,0 +1,88 @@
+import ast
+import pandas as pd
+import pyarrow as pa
+from src.utils.list_utils import (
+    format_string_lists,
+    parse_string_lists,
+    to_python_lists,
+)
+
+STRING_LIST_DTYPE = pd.ArrowDtype(pa.list_(pa.string()))
+
+
+def test_parse_string_lists_of_scraped_literals():
+    series = pd.Series(
+        ['["Comedy"]', '["Crime","Mystery","Thriller"]', "[]"],
+        index=[3, 5, 8],
+    )
+
+    result = parse_string_lists(series)
+
+    assert result.dtype == STRING_LIST_DTYPE
+    assert result.index.tolist() == [3, 5, 8]
+    assert result.tolist() == [
+        ["Comedy"], ["Crime", "Mystery", "Thriller"], []
+    ]
+
+
+def test_parse_string_lists_of_saved_csv_lists():
+    # Lists saved to CSV come back in the form Python prints them
+    series = pd.Series(["['Crime', 'Mystery']", '["N\'Ko"]'])
+
+    assert parse_string_lists(series).tolist() == [
+        ["Crime", "Mystery"], ["N'Ko"]
+    ]
+
+
+def test_parse_string_lists_of_missing_values():
+    series = pd.Series(['["English"]', None, "", ["already", "a list"]])
+
+    assert parse_string_lists(series).tolist() == [["English"], [], [], []]
+
+
+def test_parse_string_lists_drops_empty_strings():
+    series = pd.Series(['["English",""]', '[""]'], dtype="string[pyarrow]")
+
+    assert parse_string_lists(series).tolist() == [["English", ""], [""]]
+    assert parse_string_lists(series, drop_empty=True).tolist() == [
+        ["English"], []
+    ]
+
+
+def test_parse_string_lists_falls_back_for_irregular_rows():
+    series = pd.Series(['["Drama"]', '["Comma, inside",""]'])
+
+    assert parse_string_lists(series, drop_empty=True).tolist() == [
+        ["Drama"], ["Comma, inside"]
+    ]
+
+
+def test_parse_string_lists_matches_literal_eval():
+    literals = [
+        '["Adventure","Animation","Comedy","Family"]',
+        '[""]',
+        '["Français","Español","English"]',
+        "[]",
+    ]
+
+    assert parse_string_lists(pd.Series(literals)).tolist() == [
+        ast.literal_eval(literal) for literal in literals
+    ]
+
+
+def test_format_string_lists_matches_repr():
+    lists = [["Crime", "Mystery"], [], ["N'Ko"], [""]]
+    series = pd.Series(lists, dtype=STRING_LIST_DTYPE)
+
+    assert format_string_lists(series).tolist() == [
+        repr(items) for items in lists
+    ]
+
+
+def test_to_python_lists():
+    series = pd.Series([["Crime"], []], dtype=STRING_LIST_DTYPE)
+
+    result = to_python_lists(series)
+
+    assert result.dtype == object
+    assert result.tolist() == [["Crime"], []]
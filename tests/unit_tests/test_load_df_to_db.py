@@ -0,0 +1,24 @@
+import pandas as pd
+from src.load.load_df_to_db import load_dataframe_to_db
+
+
+def test_load_dataframe_to_db_uses_the_configured_schema(mocker):
+    mocker.patch(
+        "src.load.load_df_to_db.load_db_config",
+        return_value={"target_database": {"schema": "letterboxd"}},
+    )
+    connection = mocker.patch(
+        "src.load.load_df_to_db.get_db_connection"
+    ).return_value
+    mocker.patch("builtins.print")
+    to_sql = mocker.patch.object(pd.DataFrame, "to_sql")
+
+    load_dataframe_to_db(
+        pd.DataFrame({"movie_key": [1]}),
+        "rf_movie_keys",
+        index_columns=["movie_key"],
+    )
+
+    assert to_sql.call_args.kwargs["schema"] == "letterboxd"
+    statement = str(connection.execute.call_args.args[0])
+    assert "ON letterboxd.rf_movie_keys (movie_key)" in statement
@@ -1,3 +1,4 @@
+import json
 import logging
 import tempfile
 from pathlib import Path
@@ -77,31 +78,67 @@ def test_setup_logger_skips_handlers_if_already_exist(mock_get_logger):
     mock_logger.addHandler.assert_not_called()
 
 
-def test_log_extract_success_within_expected_rate():
+def test_log_extract_success_within_expected_rate(tmp_path):
     mock_logger = MagicMock()
 
-    log_extract_success(mock_logger, "test_data", (1000, 5), 1.0, 0.002)
+    with patch("src.utils.metrics_utils.METRICS_DIR", str(tmp_path)):
+        metrics = log_extract_success(
+            mock_logger,
+            "test_data",
+            (1000, 5),
+            1.0,
+            thresholds={"max_seconds_per_row": 0.002},
+        )
 
-    mock_logger.setLevel.assert_called_with(logging.INFO)
-    assert mock_logger.info.call_count == 4
+    mock_logger.setLevel.assert_not_called()
     mock_logger.info.assert_any_call(
         "Data extraction successful for test_data!"
     )
     mock_logger.info.assert_any_call("Extracted 1000 rows and 5 columns")
     mock_logger.info.assert_any_call("Execution time: 1.0 seconds")
     mock_logger.info.assert_any_call("Execution time per row: 0.001 seconds")
+    mock_logger.info.assert_any_call("Throughput: 1000 rows/s")
     mock_logger.warning.assert_not_called()
+    assert metrics["rows_per_second"] == 1000
 
 
-def test_log_extract_success_exceeds_expected_rate():
+def test_log_extract_success_exceeds_expected_rate(tmp_path):
     mock_logger = MagicMock()
 
-    log_extract_success(mock_logger, "slow_data", (100, 3), 5.0, 0.01)
+    with patch("src.utils.metrics_utils.METRICS_DIR", str(tmp_path)):
+        log_extract_success(
+            mock_logger,
+            "slow_data",
+            (100, 3),
+            5.0,
+            thresholds={
+                "max_seconds_per_row": 0.01,
+                "min_rows_per_second": 10,
+            },
+        )
 
-    assert mock_logger.setLevel.call_count == 2
-    mock_logger.setLevel.assert_any_call(logging.INFO)
-    mock_logger.setLevel.assert_any_call(logging.WARNING)
-    assert mock_logger.info.call_count == 3
+    mock_logger.setLevel.assert_not_called()
     mock_logger.warning.assert_called_once_with(
-        "Execution time per row exceeds 0.01: 0.05 seconds"
+        "Extraction of slow_data is below expectations: "
+        "seconds_per_row exceeds 0.01: 0.05"
     )
+
+
+def test_log_extract_success_writes_metrics_file(tmp_path):
+    mock_logger = MagicMock()
+
+    with patch("src.utils.metrics_utils.METRICS_DIR", str(tmp_path)):
+        log_extract_success(
+            mock_logger,
+            "test_data",
+            (10, 2),
+            0.5,
+            {"bytes_read": 2_000_000, "io_seconds": 0.1},
+            thresholds={},
+        )
+
+    (metrics_file,) = tmp_path.iterdir()
+    record = json.loads(metrics_file.read_text())
+    assert record["source"] == "test_data"
+    assert record["mb_per_second"] == 4.0
+    assert record["parse_seconds"] == 0.4
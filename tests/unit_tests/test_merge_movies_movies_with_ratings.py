@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+from src.transform.merge_movies_movies_with_ratings import (
+    key_titles_and_years,
+    merge_movies_and_movies_with_ratings,
+)
+
+
+def make_movies():
+    return pd.DataFrame(
+        {
+            "movie_id": ["mank", "insidious", "parasite-2019", "dune"],
+            "movie_title": ["Mank", "Insidious", "Parasite", "Dune"],
+            "year_released": pd.array([2020, 2010, 2019, 1984], dtype="Int16"),
+        }
+    )
+
+
+def make_movies_with_ratings():
+    return pd.DataFrame(
+        {
+            "name": ["Insidious", "Mank", "Mank", "Parasite", "Dune"],
+            "date": pd.array([2010, 2020, 2020, 2019, 2021], dtype="Int64"),
+            "rating": np.array([6.6, 7.0, 7.4, 9.2, 8.0], dtype=np.float32),
+        }
+    )
+
+
+def test_merge_keeps_best_rating_of_duplicate_matches():
+    merged = merge_movies_and_movies_with_ratings(
+        make_movies(), make_movies_with_ratings()
+    )
+
+    assert merged["movie_id"].tolist() == ["parasite-2019", "mank", "insidious"]
+    assert merged["rating"].tolist() == list(
+        np.array([9.2, 7.4, 6.6], dtype=np.float32)
+    )
+    assert merged["rating"].dtype == np.float32
+
+
+def test_merge_matches_groupby_deduplicated_merge():
+    movies = make_movies()
+    movies_with_ratings = make_movies_with_ratings()
+
+    merged = merge_movies_and_movies_with_ratings(movies, movies_with_ratings)
+
+    expected = movies.merge(
+        movies_with_ratings.sort_values("rating", ascending=False)
+        .drop_duplicates(subset=["name", "date"]),
+        left_on=["movie_title", "year_released"],
+        right_on=["name", "date"],
+    ).drop(columns=["name", "date"])
+    pd.testing.assert_frame_equal(
+        merged.sort_values("movie_id", ignore_index=True),
+        expected.sort_values("movie_id", ignore_index=True),
+    )
+
+
+def test_merge_removes_aliased_movies():
+    aliases = pd.Series(["mank"], index=pd.Index(["insidious"]))
+
+    merged = merge_movies_and_movies_with_ratings(
+        make_movies(), make_movies_with_ratings(), aliases
+    )
+
+    assert "insidious" not in merged["movie_id"].tolist()
+
+
+def test_key_titles_and_years_matches_missing_years():
+    movie_keys, rating_keys = key_titles_and_years(
+        pd.Series(["Mank", "Mank"]),
+        pd.Series([2020, None], dtype="Int16"),
+        pd.Series(["Mank", "Mank"]),
+        pd.Series([None, 2020], dtype="Int64"),
+    )
+
+    assert movie_keys.tolist() == rating_keys[::-1].tolist()
+    assert movie_keys[0] != movie_keys[1]
@@ -0,0 +1,158 @@
+import json
+import os
+import numpy as np
+import pytest
+from config.metrics_config import (
+    load_extract_thresholds,
+    MetricsConfigError,
+)
+from src.utils.metrics_utils import (
+    build_extract_metrics,
+    check_extract_thresholds,
+    get_metrics_path,
+    measure_peak_memory,
+    start_extract_measurement,
+    start_metrics_run,
+    write_extract_metrics,
+)
+
+
+@pytest.fixture
+def csv_file(tmp_path):
+    file_path = tmp_path / "unclean_movies.csv"
+    file_path.write_text("movie_id\nmank\n" * 1000)
+    return str(file_path)
+
+
+def test_start_extract_measurement_times_file_reads(csv_file):
+    measurement = start_extract_measurement(csv_file, time_reads=True)
+
+    assert measurement["bytes_read"] == os.path.getsize(csv_file)
+    assert measurement["io_seconds"] >= 0
+    assert measurement["rss_bytes"] > 0
+
+
+def test_start_extract_measurement_does_not_read_the_file_by_default(
+    csv_file, mocker
+):
+    mock_time_reads = mocker.patch(
+        "src.utils.metrics_utils.time_file_reads"
+    )
+
+    measurement = start_extract_measurement(csv_file)
+
+    mock_time_reads.assert_not_called()
+    assert measurement["bytes_read"] == os.path.getsize(csv_file)
+    assert measurement["io_seconds"] is None
+
+
+def test_start_extract_measurement_times_reads_when_configured(
+    csv_file, monkeypatch
+):
+    monkeypatch.setenv("EXTRACT_TIME_FILE_READS", "true")
+
+    assert start_extract_measurement(csv_file)["io_seconds"] >= 0
+
+
+def test_start_extract_measurement_with_missing_file(tmp_path):
+    measurement = start_extract_measurement(
+        str(tmp_path / "missing.csv"), time_reads=True
+    )
+
+    assert measurement["bytes_read"] is None
+    assert measurement["io_seconds"] is None
+
+
+def test_build_extract_metrics_without_measurement():
+    metrics = build_extract_metrics("MOVIES from CSV", (0, 8), 0.0)
+
+    assert metrics["seconds_per_row"] is None
+    assert metrics["rows_per_second"] is None
+    assert metrics["peak_rss_delta_mb"] is None
+
+
+def test_check_extract_thresholds_reports_each_breach():
+    metrics = {
+        "seconds_per_row": 0.5,
+        "rows_per_second": 2.0,
+        "mb_per_second": None,
+        "peak_rss_delta_mb": 10.0,
+    }
+
+    breaches = check_extract_thresholds(
+        metrics,
+        {
+            "max_seconds_per_row": 0.1,
+            "min_rows_per_second": 100,
+            "min_mb_per_second": 50,
+            "max_rss_delta_mb": None,
+        },
+    )
+
+    assert breaches == [
+        "seconds_per_row exceeds 0.1: 0.5",
+        "rows_per_second is below 100: 2.0",
+    ]
+
+
+def test_write_extract_metrics_appends_to_run_file(tmp_path):
+    run_id = start_metrics_run("test-run")
+
+    for source in ["movies", "user_ratings"]:
+        write_extract_metrics({"source": source}, str(tmp_path))
+
+    with open(get_metrics_path(run_id, str(tmp_path))) as metrics_file:
+        records = [json.loads(line) for line in metrics_file]
+    assert [record["source"] for record in records] == [
+        "movies", "user_ratings"
+    ]
+    assert all(record["run_id"] == "test-run" for record in records)
+
+
+def test_load_extract_thresholds_from_environment(mocker):
+    mocker.patch.dict(
+        os.environ,
+        {"EXTRACT_MIN_ROWS_PER_SECOND": "50000"},
+    )
+    os.environ.pop("EXTRACT_MAX_SECONDS_PER_ROW", None)
+
+    thresholds = load_extract_thresholds()
+
+    assert thresholds["max_seconds_per_row"] == 0.0001
+    assert thresholds["min_rows_per_second"] == 50000
+    assert thresholds["max_rss_delta_mb"] is None
+
+
+def test_load_extract_thresholds_rejects_non_numbers(mocker):
+    mocker.patch.dict(os.environ, {"EXTRACT_MAX_RSS_DELTA_MB": "lots"})
+
+    with pytest.raises(MetricsConfigError):
+        load_extract_thresholds()
+
+
+@pytest.mark.parametrize("peak_rss_resets", [True, False])
+def test_measure_peak_memory_counts_temporary_arrays(peak_rss_resets, mocker):
+    if not peak_rss_resets:
+        mocker.patch(
+            "src.utils.metrics_utils.reset_peak_rss", return_value=False
+        )
+
+    with measure_peak_memory() as memory:
+        temporary = np.ones(8_000_000)
+        del temporary
+
+    assert memory["peak_bytes"] >= 60e6
+    assert memory["retained_bytes"] < 20e6
+
+
+def test_measure_peak_memory_keeps_the_extract_peak():
+    temporary = np.ones(8_000_000)
+    del temporary
+    measurement = start_extract_measurement()
+
+    # Resetting the peak would otherwise drop it below the starting reading
+    with measure_peak_memory():
+        pass
+
+    metrics = build_extract_metrics("movies", (1, 1), 1.0, measurement)
+    assert metrics["peak_rss_delta_mb"] >= 0
@@ -0,0 +1,102 @@
+import pandas as pd
+import pytest
+from src.transform.movie_aliases import (
+    apply_movie_aliases,
+    find_duplicate_movies,
+    load_movie_aliases,
+    remove_aliased_movies,
+)
+
+
+@pytest.fixture
+def aliases():
+    return pd.Series(
+        ["ex-machina-2015"], index=pd.Index(["ex-machina-2014"])
+    )
+
+
+@pytest.fixture
+def no_aliases():
+    return pd.Series([], index=pd.Index([], dtype=object), dtype=object)
+
+
+def test_load_movie_aliases_from_the_alias_table():
+    aliases = load_movie_aliases()
+
+    assert aliases["ex-machina-2014"] == "ex-machina-2015"
+    assert aliases["black-panther"] == "black-panther-2018"
+
+
+def test_load_movie_aliases_rejects_chains(tmp_path):
+    file_path = tmp_path / "movie_aliases.csv"
+    file_path.write_text(
+        "alias_movie_id,movie_id\n"
+        "black-panther,black-panther-2018\n"
+        "black-panther-2018,black-panther-1\n"
+    )
+
+    with pytest.raises(ValueError, match="point to a movie_id"):
+        load_movie_aliases(str(file_path))
+
+
+def test_apply_movie_aliases(aliases):
+    movie_ids = pd.Series(
+        ["ex-machina-2014", "mank", "ex-machina-2015"],
+        dtype="string[pyarrow]",
+    )
+
+    result = apply_movie_aliases(movie_ids, aliases)
+
+    assert result.tolist() == ["ex-machina-2015", "mank", "ex-machina-2015"]
+    assert result.dtype == movie_ids.dtype
+
+
+def test_remove_aliased_movies(aliases):
+    movies = pd.DataFrame({"movie_id": ["ex-machina-2014", "ex-machina-2015"]})
+
+    result = remove_aliased_movies(movies, aliases)
+
+    assert result["movie_id"].tolist() == ["ex-machina-2015"]
+
+
+def test_find_duplicate_movies(no_aliases):
+    movies = pd.DataFrame(
+        {
+            "movie_id": [
+                "ex-machina-2015",
+                "black-panther",
+                "ex-machina-2014",
+                "black-panther-2018",
+                "dune",
+                "dune-2021",
+            ],
+            "movie_title": [
+                "Ex Machina",
+                "Black Panther",
+                "Ex machina",
+                "Black Panther",
+                "Dune",
+                "Dune",
+            ],
+            "year_released": [2015, 2018, 2014, 2018, 1984, 2021],
+        }
+    )
+
+    duplicates = find_duplicate_movies(movies, no_aliases)
+
+    assert duplicates[["alias_movie_id", "movie_id"]].values.tolist() == [
+        ["black-panther", "black-panther-2018"],
+        ["ex-machina-2014", "ex-machina-2015"],
+    ]
+
+
+def test_find_duplicate_movies_skips_known_aliases(aliases):
+    movies = pd.DataFrame(
+        {
+            "movie_id": ["ex-machina-2014", "ex-machina-2015"],
+            "movie_title": ["Ex Machina", "Ex Machina"],
+            "year_released": [2014, 2015],
+        }
+    )
+
+    assert find_duplicate_movies(movies, aliases).empty
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+from src.transform.movie_keys import (
+    add_movie_keys,
+    build_movie_dimension,
+    get_movie_keys,
+    replace_movie_ids_with_keys,
+)
+
+
+def test_movie_keys_are_dense_int32():
+    keys = get_movie_keys(pd.Series(["mank", "insidious", "mank"]))
+
+    assert keys.dtype == np.int32
+    assert keys.tolist() == [1, 2, 1]
+
+
+def test_movie_keys_agree_across_tables():
+    user_ratings = replace_movie_ids_with_keys(
+        pd.DataFrame(
+            {
+                "movie_id": ["insidious", "mank"],
+                "rating_val": [10, 5],
+                "user_id": [1, 2],
+            }
+        )
+    )
+    movies = add_movie_keys(
+        pd.DataFrame({"movie_id": ["mank", "parasite-2019"]})
+    )
+
+    assert user_ratings["movie_key"].tolist() == [1, 2]
+    assert movies["movie_key"].tolist() == [2, 3]
+
+
+def test_replace_movie_ids_with_keys_keeps_column_order():
+    result = replace_movie_ids_with_keys(
+        pd.DataFrame(
+            {"user_id": [1], "movie_id": ["mank"], "rating_val": [5]}
+        )
+    )
+
+    assert result.columns.tolist() == ["user_id", "movie_key", "rating_val"]
+
+
+def test_add_movie_keys_keeps_the_slug():
+    movies = pd.DataFrame({"movie_id": ["mank"], "rating": [7.2]})
+
+    result = add_movie_keys(movies)
+
+    assert result.columns.tolist() == ["movie_key", "movie_id", "rating"]
+    assert "movie_key" not in movies.columns
+
+
+def test_movie_dimension_resolves_every_key(mocker):
+    mock_save = mocker.patch("src.transform.movie_keys.save_processed_table")
+    user_ratings = replace_movie_ids_with_keys(
+        pd.DataFrame({"movie_id": ["insidious", "mank"], "user_id": [1, 2]})
+    )
+    # Only mank survives into the movies table
+    add_movie_keys(pd.DataFrame({"movie_id": ["mank"]}))
+
+    movie_dimension = build_movie_dimension()
+
+    resolved = user_ratings.merge(movie_dimension, on="movie_key", how="left")
+    assert resolved["movie_id"].tolist() == ["insidious", "mank"]
+    assert movie_dimension["movie_key"].dtype == np.int32
+    mock_save.assert_called_once()
@@ -0,0 +1,30 @@
+import pandas as pd
+from src.transform.rating_statistics import (
+    compute_rating_statistics,
+    round_average_rating,
+)
+
+
+def test_compute_rating_statistics():
+    cleaned_user_ratings = pd.DataFrame(
+        {
+            "movie_key": [1, 1, 2],
+            "user_id": [1, 2, 2],
+            "rating_val": [6.0, 8.0, 10.0],
+        }
+    )
+
+    movie_statistics, user_statistics = compute_rating_statistics(
+        cleaned_user_ratings
+    )
+
+    assert movie_statistics["movie_key"].tolist() == [1, 2]
+    assert movie_statistics["mean"].tolist() == [7.0, 10.0]
+    assert user_statistics["user_id"].tolist() == [1, 2]
+    assert user_statistics["count"].tolist() == [1, 2]
+
+
+def test_round_average_rating_ignores_summation_error():
+    assert round_average_rating(
+        pd.Series([5.525000000000001, 5.525])
+    ).tolist() == [5.52, 5.52]
@@ -0,0 +1,175 @@
+import os
+import pytest
+from src.extract.extract import get_input_paths
+from src.load.load import LOAD_DEPENDENCIES
+from src.transform.movie_aliases import MOVIE_ALIASES_PATH
+from src.utils.run_manifest_utils import (
+    build_run_manifest,
+    fingerprint_code,
+    fingerprint_inputs,
+    get_run_target,
+    load_run_manifest,
+    plan_outputs,
+    save_run_manifest,
+)
+
+
+@pytest.fixture
+def input_paths(tmp_path):
+    paths = {}
+    for name in ["movies", "movies_with_ratings", "user_ratings"]:
+        file_path = tmp_path / f"unclean_{name}.csv"
+        file_path.write_text("movie_id\nmank\n")
+        paths[name] = str(file_path)
+    aliases_path = tmp_path / "movie_aliases.csv"
+    aliases_path.write_text("alias_movie_id,movie_id\n")
+    paths["movie_aliases"] = str(aliases_path)
+    return paths
+
+
+def test_unchanged_inputs_skip_every_output(input_paths, tmp_path):
+    previous = build_run_manifest(input_paths)
+    save_run_manifest(previous, str(tmp_path / "state"))
+
+    manifest = build_run_manifest(
+        input_paths, load_run_manifest(str(tmp_path / "state"))
+    )
+
+    assert plan_outputs(previous, manifest, LOAD_DEPENDENCIES) == set()
+
+
+def test_first_run_builds_every_output(input_paths):
+    manifest = build_run_manifest(input_paths)
+
+    assert plan_outputs({}, manifest, LOAD_DEPENDENCIES) == set(
+        LOAD_DEPENDENCIES
+    )
+
+
+def test_changed_input_rebuilds_dependent_outputs(input_paths):
+    previous = build_run_manifest(input_paths)
+    with open(input_paths["movies_with_ratings"], "a") as file:
+        file.write("parasite\n")
+
+    manifest = build_run_manifest(input_paths, previous)
+
+    assert plan_outputs(previous, manifest, LOAD_DEPENDENCIES) == {
+        "movies", "movie_genres", "movie_keys"
+    }
+
+
+def test_changed_aliases_rebuild_every_table_they_consolidate(
+    input_paths,
+):
+    previous = build_run_manifest(input_paths)
+    with open(input_paths["movie_aliases"], "a") as file:
+        file.write("mank-2020,mank\n")
+
+    manifest = build_run_manifest(input_paths, previous)
+
+    assert plan_outputs(previous, manifest, LOAD_DEPENDENCIES) == {
+        "movies",
+        "user_ratings",
+        "aggregated_user_ratings",
+        "movie_genres",
+        "movie_keys",
+    }
+
+
+def test_input_paths_include_the_movie_aliases():
+    assert get_input_paths()["movie_aliases"] == MOVIE_ALIASES_PATH
+
+
+def test_touched_input_is_not_a_change(input_paths):
+    previous = build_run_manifest(input_paths)
+    stat = os.stat(input_paths["user_ratings"])
+    os.utime(
+        input_paths["user_ratings"],
+        ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000),
+    )
+
+    manifest = build_run_manifest(input_paths, previous)
+
+    assert plan_outputs(previous, manifest, LOAD_DEPENDENCIES) == set()
+
+
+def test_changed_code_rebuilds_every_output(input_paths):
+    previous = {**build_run_manifest(input_paths), "code": "old"}
+
+    manifest = build_run_manifest(input_paths, previous)
+
+    assert plan_outputs(previous, manifest, LOAD_DEPENDENCIES) == set(
+        LOAD_DEPENDENCIES
+    )
+
+
+def test_fingerprint_inputs_reuses_hash_of_untouched_files(
+    input_paths, mocker
+):
+    previous = fingerprint_inputs(input_paths)
+    mock_hash = mocker.patch("src.utils.run_manifest_utils.hash_file")
+
+    assert fingerprint_inputs(input_paths, previous) == previous
+    mock_hash.assert_not_called()
+
+
+def test_fingerprint_inputs_covers_every_part(tmp_path):
+    for part in range(2):
+        (tmp_path / f"part-{part}.csv").write_text(f"movie_id\n{part}\n")
+
+    fingerprints = fingerprint_inputs(
+        {"user_ratings": str(tmp_path / "part-*.csv")}
+    )
+
+    assert len(fingerprints["user_ratings"]) == 2
+
+
+def test_fingerprint_code_is_stable():
+    assert fingerprint_code() == fingerprint_code()
+
+
+def test_load_run_manifest_without_previous_run(tmp_path):
+    assert load_run_manifest(str(tmp_path / "state")) == {}
+
+
+def test_dev_run_does_not_skip_a_prod_run(input_paths, tmp_path):
+    state_dir = str(tmp_path / "state")
+    database = {"host": "localhost", "port": "5432", "dbname": "letterboxd"}
+    dev = get_run_target("dev", database)
+    prod = get_run_target("prod", {**database, "host": "db.internal"})
+    save_run_manifest(
+        build_run_manifest(input_paths, target=dev), state_dir, dev
+    )
+
+    previous = load_run_manifest(state_dir, prod)
+    manifest = build_run_manifest(input_paths, previous, prod)
+
+    assert previous == {}
+    assert plan_outputs(previous, manifest, LOAD_DEPENDENCIES) == set(
+        LOAD_DEPENDENCIES
+    )
+    # Nor does a manifest of another target that ends up being compared
+    dev_manifest = build_run_manifest(input_paths, target=dev)
+    assert plan_outputs(dev_manifest, manifest, LOAD_DEPENDENCIES) == set(
+        LOAD_DEPENDENCIES
+    )
+
+
+def test_run_target_leaves_out_credentials():
+    target = get_run_target(
+        "prod", {"host": "db", "dbname": "letterboxd", "password": "secret"}
+    )
+
+    assert "secret" not in target.values()
+
+
+def test_fingerprint_code_covers_the_scripts(mocker, tmp_path):
+    for code_dir in ["src", "scripts"]:
+        (tmp_path / code_dir).mkdir()
+        (tmp_path / code_dir / "run.py").write_text("print('run')\n")
+    mocker.patch("src.utils.run_manifest_utils.ROOT_DIR", str(tmp_path))
+    before = fingerprint_code()
+
+    (tmp_path / "scripts" / "run.py").write_text("print('changed')\n")
+
+    assert fingerprint_code() != before
@@ -0,0 +1,127 @@
+import pandas as pd
+import pyarrow as pa
+import pytest
+from src.utils.shard_utils import (
+    get_read_options,
+    iter_csv_shards,
+    read_csv_file,
+    read_sharded_csv,
+    resolve_input_files,
+)
+
+READ_OPTIONS = {
+    "engine": "pyarrow",
+    "dtype_backend": "pyarrow",
+    "dtype": {"rating_val": "Int8", "original_language": "category"},
+}
+
+
+def write_part(path, df):
+    # Compress through pyarrow, which picks the codec from the extension
+    data = df.to_csv(index=False).encode()
+    codec = {".gz": "gzip", ".zst": "zstd"}.get(path.suffix)
+    if codec is None:
+        path.write_bytes(data)
+        return
+    with pa.CompressedOutputStream(str(path), codec) as stream:
+        stream.write(data)
+
+
+@pytest.fixture
+def parts(tmp_path):
+    shard_dir = tmp_path / "unclean_user_ratings"
+    shard_dir.mkdir()
+    frames = {
+        "part-00002.csv.zst": pd.DataFrame(
+            {
+                "movie_id": ["hush-2016"],
+                "rating_val": [8],
+                "original_language": ["en"],
+            }
+        ),
+        "part-00000.csv.gz": pd.DataFrame(
+            {
+                "movie_id": ["mank", "parasite"],
+                "rating_val": [5, 10],
+                "original_language": ["en", "ko"],
+            }
+        ),
+        "part-00001.csv": pd.DataFrame(
+            {
+                "movie_id": ["insidious"],
+                "rating_val": [7],
+                "original_language": ["fr"],
+            }
+        ),
+    }
+    for name, df in frames.items():
+        write_part(shard_dir / name, df)
+    return str(shard_dir / "part-*.csv*")
+
+
+def test_resolve_input_files_sorts_matches(parts):
+    files = resolve_input_files(parts)
+
+    assert [file.rsplit("/", 1)[1] for file in files] == [
+        "part-00000.csv.gz",
+        "part-00001.csv",
+        "part-00002.csv.zst",
+    ]
+
+
+def test_resolve_input_files_keeps_plain_path():
+    assert resolve_input_files("data/raw/movies.csv") == [
+        "data/raw/movies.csv"
+    ]
+
+
+def test_resolve_input_files_without_matches(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        resolve_input_files(str(tmp_path / "part-*.csv"))
+
+
+def test_read_sharded_csv_combines_parts_in_order(parts):
+    df = read_sharded_csv(parts, **READ_OPTIONS)
+
+    assert df["movie_id"].tolist() == [
+        "mank", "parasite", "insidious", "hush-2016"
+    ]
+    assert df.index.tolist() == [0, 1, 2, 3]
+    assert df["rating_val"].dtype == pd.Int8Dtype()
+    # Each part has its own categories, so they are merged again
+    assert df["original_language"].dtype == "category"
+
+
+def test_read_sharded_csv_uses_reader(parts, mocker):
+    reader = mocker.Mock(return_value=pd.DataFrame({"movie_id": ["mank"]}))
+
+    df = read_sharded_csv(parts, reader, max_workers=1, usecols=["movie_id"])
+
+    assert len(df) == 3
+    assert [call.args[0] for call in reader.call_args_list] == (
+        resolve_input_files(parts)
+    )
+    assert all(
+        call.kwargs == {"usecols": ["movie_id"]}
+        for call in reader.call_args_list
+    )
+
+
+def test_read_csv_file_decompresses_zstd(parts):
+    df = read_csv_file(resolve_input_files(parts)[2], **READ_OPTIONS)
+
+    assert df["movie_id"].tolist() == ["hush-2016"]
+
+
+def test_iter_csv_shards_streams_every_part(parts):
+    chunks = list(iter_csv_shards(parts, 1, dtype={"rating_val": "Int8"}))
+
+    assert len(chunks) == 4
+    assert pd.concat(chunks)["rating_val"].tolist() == [5, 10, 7, 8]
+
+
+def test_get_read_options_only_parses_requested_columns():
+    assert get_read_options(READ_OPTIONS) is READ_OPTIONS
+    assert get_read_options(READ_OPTIONS, ["movie_id"]) == {
+        **READ_OPTIONS, "usecols": ["movie_id"]
+    }
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.transform.clean_user_ratings import clean_user_ratings
+from src.transform.rating_statistics import compute_rating_statistics
+from src.transform.sharded_user_ratings import (
+    assign_shards,
+    transform_user_ratings_sharded,
+)
+
+
+@pytest.fixture
+def user_ratings():
+    rng = np.random.default_rng(0)
+    rows = 3000
+    user_ratings = pd.DataFrame(
+        {
+            "movie_id": [f"movie-{key}" for key in rng.integers(0, 50, rows)],
+            "rating_val": rng.integers(1, 11, rows).astype(float),
+            "user_id": [f"user-{key}" for key in rng.integers(0, 40, rows)],
+        }
+    )
+    # One user rated far more movies than the others
+    user_ratings.loc[: rows // 2, "user_id"] = "hot-user"
+    return user_ratings
+
+
+def test_sharded_transform_matches_single_process(
+    user_ratings, tmp_path, mocker
+):
+    mocker.patch("src.transform.clean_user_ratings.save_processed_table")
+    shard_dir = tmp_path / "shards"
+    shard_dir.mkdir()
+
+    cleaned, movie_statistics, user_statistics = (
+        transform_user_ratings_sharded(
+            user_ratings.copy(), workers=2, shard_dir=str(shard_dir)
+        )
+    )
+
+    expected = clean_user_ratings(user_ratings.copy())
+    expected_movies, expected_users = compute_rating_statistics(expected)
+    pd.testing.assert_frame_equal(cleaned, expected)
+    pd.testing.assert_frame_equal(
+        movie_statistics, expected_movies, check_exact=False
+    )
+    pd.testing.assert_frame_equal(
+        user_statistics, expected_users, check_exact=False
+    )
+    assert list(shard_dir.iterdir()) == []
+
+
+def test_sharded_transform_of_no_surviving_ratings_is_empty(
+    user_ratings, tmp_path, mocker
+):
+    mocker.patch("src.transform.clean_user_ratings.save_processed_table")
+    user_ratings["rating_val"] = np.nan
+
+    cleaned, movie_statistics, user_statistics = (
+        transform_user_ratings_sharded(
+            user_ratings.copy(), workers=2, shard_dir=str(tmp_path)
+        )
+    )
+
+    expected = clean_user_ratings(user_ratings.copy())
+    expected_movies, expected_users = compute_rating_statistics(expected)
+    assert cleaned.empty
+    pd.testing.assert_frame_equal(cleaned, expected)
+    pd.testing.assert_frame_equal(movie_statistics, expected_movies)
+    pd.testing.assert_frame_equal(user_statistics, expected_users)
+
+
+def test_assign_shards_spreads_hot_users():
+    user_ratings = pd.DataFrame(
+        {
+            "user_id": [1] * 90 + list(range(2, 12)),
+            "movie_key": np.arange(100, dtype=np.int32),
+        }
+    )
+
+    shards = assign_shards(user_ratings, shard_count=4)
+
+    assert len(set(shards[:90])) == 4
+    # The ratings of other users stay in the shard of their user
+    assert shards[90:].tolist() == assign_shards(
+        user_ratings.iloc[90:], shard_count=4
+    ).tolist()
@@ -0,0 +1,140 @@
+import os
+import threading
+import pandas as pd
+import pytest
+from src.utils import snapshot_utils
+from src.utils.snapshot_utils import (
+    background_snapshots,
+    save_processed_table,
+    save_snapshot,
+    start_snapshot_writer,
+    stop_snapshot_writer,
+)
+
+
+@pytest.fixture(autouse=True)
+def root_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr("src.utils.snapshot_utils.ROOT_DIR", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def ratings():
+    return pd.DataFrame({"user_id": [1, 2], "rating": [4.0, 3.5]})
+
+
+def test_save_snapshot_writes_right_away_without_a_writer(root_dir, ratings):
+    save_snapshot(ratings, "data/processed", "ratings")
+
+    saved = pd.read_parquet(
+        root_dir / "data" / "processed" / "ratings.parquet"
+    )
+    pd.testing.assert_frame_equal(saved, ratings)
+    assert not os.path.exists(root_dir / "data" / "processed" / "ratings.csv")
+
+
+def test_background_snapshots_writes_every_snapshot_by_the_end(
+    root_dir, ratings
+):
+    with background_snapshots(max_pending=1):
+        for number in range(5):
+            save_snapshot(ratings, "data/processed", f"ratings_{number}")
+
+    for number in range(5):
+        assert os.path.exists(
+            root_dir / "data" / "processed" / f"ratings_{number}.parquet"
+        )
+    assert snapshot_utils.snapshot_writer["queue"] is None
+
+
+def test_background_snapshots_can_export_csv(root_dir, ratings):
+    with background_snapshots(export_csv=True):
+        save_snapshot(ratings, "data/processed", "ratings")
+
+    saved = pd.read_csv(root_dir / "data" / "processed" / "ratings.csv")
+    pd.testing.assert_frame_equal(saved, ratings)
+    assert os.path.exists(root_dir / "data" / "processed" / "ratings.parquet")
+
+
+def test_background_snapshots_writes_on_another_thread(mocker, ratings):
+    threads = []
+    mocker.patch(
+        "src.utils.snapshot_utils.write_dataframe_to_parquet",
+        side_effect=lambda df, path: threads.append(
+            threading.current_thread()
+        ),
+    )
+
+    with background_snapshots():
+        save_snapshot(ratings, "data/processed", "ratings")
+
+    assert threads and threads[0] is not threading.current_thread()
+
+
+def test_background_snapshots_can_be_disabled(root_dir, ratings):
+    with background_snapshots(enabled=False):
+        save_snapshot(ratings, "data/processed", "ratings")
+
+    assert not os.path.exists(root_dir / "data" / "processed")
+
+
+def test_processed_tables_are_saved_with_snapshots_disabled(
+    root_dir, ratings
+):
+    with background_snapshots(enabled=False, export_csv=True):
+        save_processed_table(ratings, "data/processed", "ratings")
+        save_snapshot(ratings, "data/processed", "cleaned_ratings")
+
+    assert sorted(os.listdir(root_dir / "data" / "processed")) == [
+        "ratings.csv",
+        "ratings.parquet",
+    ]
+
+
+def test_background_snapshots_reports_failed_writes(mocker, ratings):
+    mocker.patch(
+        "src.utils.snapshot_utils.write_dataframe_to_parquet",
+        side_effect=OSError("No space left on device"),
+    )
+
+    with pytest.raises(RuntimeError, match="ratings"):
+        with background_snapshots():
+            save_snapshot(ratings, "data/processed", "ratings")
+
+
+def test_background_snapshots_raises_the_error_of_the_block(mocker, ratings):
+    mocker.patch(
+        "src.utils.snapshot_utils.write_dataframe_to_parquet",
+        side_effect=OSError("No space left on device"),
+    )
+
+    with pytest.raises(ValueError):
+        with background_snapshots():
+            save_snapshot(ratings, "data/processed", "ratings")
+            raise ValueError("The load failed")
+
+
+def test_queued_snapshots_keep_the_frame_as_it_was_saved(
+    mocker, root_dir, ratings
+):
+    # The writer waits until the frame has been changed
+    changed = threading.Event()
+    write = snapshot_utils.write_dataframe_to_parquet
+    mocker.patch(
+        "src.utils.snapshot_utils.write_dataframe_to_parquet",
+        side_effect=lambda df, path: changed.wait(5) and write(df, path),
+    )
+
+    start_snapshot_writer()
+    try:
+        with pd.option_context("mode.copy_on_write", True):
+            save_snapshot(ratings, "data/processed", "ratings")
+            ratings.loc[0, "rating"] = 1.0
+            changed.set()
+    finally:
+        assert stop_snapshot_writer() == []
+
+    saved = pd.read_parquet(
+        root_dir / "data" / "processed" / "ratings.parquet"
+    )
+    assert saved["rating"].tolist() == [4.0, 3.5]
@@ -0,0 +1,339 @@
+import json
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from src.utils.dag_utils import run_dag
+from src.utils.snapshot_utils import (
+    background_snapshots,
+    save_processed_table,
+    save_snapshot,
+)
+from src.utils.step_cache_utils import (
+    FRAME_METADATA_KEY,
+    cache_step,
+    clear_step_cache,
+    evict_least_recently_used,
+    hash_frame,
+    load_step_cache_index,
+    read_frame,
+    write_frame,
+)
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    return str(tmp_path / "steps")
+
+
+@pytest.fixture
+def movies():
+    return pd.DataFrame(
+        {"movie_id": ["a", "b", "c"], "rating_count": [3, 1, 2]}
+    )
+
+
+def count_calls(function):
+    # Record each call of a step, to tell a cache hit from a miss
+    calls = []
+
+    def step(*args):
+        calls.append(args)
+        return function(*args)
+
+    return step, calls
+
+
+def add_half(df):
+    return df.assign(half=df["rating_count"] / 2)
+
+
+def split_rows(df):
+    return df.iloc[:1], df.iloc[1:]
+
+
+def test_cache_step_reuses_outputs_of_the_same_inputs(cache_dir, movies):
+    step, calls = count_calls(add_half)
+    cached = cache_step("add_half", step, cache_dir=cache_dir)
+
+    first, first_keys = cached([movies], [None])
+    second, second_keys = cached([movies.copy()], [None])
+
+    assert len(calls) == 1
+    pd.testing.assert_frame_equal(first, second)
+    assert first_keys == second_keys
+
+
+def test_cache_step_recomputes_when_the_inputs_change(cache_dir, movies):
+    step, calls = count_calls(add_half)
+    cached = cache_step("add_half", step, cache_dir=cache_dir)
+
+    cached([movies], [None])
+    result, _ = cached([movies.assign(rating_count=[4, 5, 6])], [None])
+
+    assert len(calls) == 2
+    assert result["half"].tolist() == [2.0, 2.5, 3.0]
+
+
+def test_cache_step_recomputes_when_the_code_changes(cache_dir, movies):
+    cache_step("add_half", add_half, cache_dir=cache_dir)([movies], [None])
+    step, calls = count_calls(lambda df: df.assign(half=0))
+    cached = cache_step("add_half", step, cache_dir=cache_dir)
+
+    result, _ = cached([movies], [None])
+
+    assert len(calls) == 1
+    assert result["half"].tolist() == [0, 0, 0]
+
+
+def test_cache_step_keys_inputs_by_the_given_keys(cache_dir, movies):
+    step, calls = count_calls(add_half)
+    cached = cache_step("add_half", step, cache_dir=cache_dir)
+
+    cached([movies], ["upstream-0"])
+    # The key stands for the input, so its contents are not hashed again
+    cached([movies.assign(rating_count=0)], ["upstream-0"])
+    cached([movies], ["upstream-1"])
+
+    assert len(calls) == 2
+
+
+def test_cache_step_restores_tuples_of_outputs(cache_dir, movies):
+    cached = cache_step("split_rows", split_rows, cache_dir=cache_dir)
+
+    computed, computed_keys = cached([movies], [None])
+    reused, reused_keys = cached([movies], [None])
+
+    assert isinstance(reused, tuple) and len(reused) == 2
+    for expected, actual in zip(computed, reused):
+        pd.testing.assert_frame_equal(expected, actual)
+    assert reused_keys == computed_keys and len(set(reused_keys)) == 2
+
+
+def test_cache_step_does_not_cache_inputs_that_are_not_frames(cache_dir):
+    step, calls = count_calls(lambda chunks: pd.concat(chunks))
+    cached = cache_step("concat", step, cache_dir=cache_dir)
+    chunks = [pd.DataFrame({"a": [1]}), pd.DataFrame({"a": [2]})]
+
+    _, keys = cached([iter(chunks)], [None])
+    cached([iter(chunks)], [None])
+
+    assert keys is None
+    assert len(calls) == 2
+    assert load_step_cache_index(cache_dir) == {}
+
+
+def test_cache_step_saves_the_snapshots_again_on_a_hit(
+    cache_dir, movies, mocker
+):
+    write_snapshot = mocker.patch("src.utils.snapshot_utils.write_snapshot")
+
+    def add_half_and_save(df):
+        halves = add_half(df)
+        save_snapshot(halves, "data/processed", "halves")
+        return halves
+
+    step, calls = count_calls(add_half_and_save)
+    cached = cache_step("add_half", step, cache_dir=cache_dir)
+
+    computed, _ = cached([movies], [None])
+    reused, _ = cached([movies], [None])
+
+    assert len(calls) == 1
+    assert write_snapshot.call_count == 2
+    reused_snapshot, output_path, _ = write_snapshot.call_args.args
+    assert output_path.endswith("halves")
+    pd.testing.assert_frame_equal(reused_snapshot, computed)
+
+
+def test_cache_step_replays_processed_tables_with_snapshots_disabled(
+    cache_dir, movies, mocker
+):
+    write_snapshot = mocker.patch("src.utils.snapshot_utils.write_snapshot")
+
+    def add_half_and_save(df):
+        halves = add_half(df)
+        save_snapshot(halves, "data/processed", "debug_halves")
+        save_processed_table(halves, "data/processed", "halves")
+        return halves
+
+    cached = cache_step("add_half", add_half_and_save, cache_dir=cache_dir)
+    cached([movies], [None])
+
+    with background_snapshots(enabled=False):
+        cached([movies], [None])
+
+    # The debug snapshot is only written by the first run
+    assert [
+        os.path.basename(call.args[1])
+        for call in write_snapshot.call_args_list
+    ] == ["debug_halves", "halves", "halves"]
+
+
+def test_cache_step_does_not_cache_snapshots_of_other_frames(
+    cache_dir, movies, mocker
+):
+    mocker.patch("src.utils.snapshot_utils.write_snapshot")
+
+    def save_input(df):
+        save_snapshot(df, "data/processed", "movies")
+        return add_half(df)
+
+    step, calls = count_calls(save_input)
+    cached = cache_step("save_input", step, cache_dir=cache_dir)
+
+    _, output_keys = cached([movies], [None])
+    cached([movies], [None])
+
+    assert output_keys is None
+    assert len(calls) == 2
+
+
+def test_cache_step_stores_outputs_under_the_state_they_leave(
+    cache_dir, movies
+):
+    state = {"version": 0}
+
+    def extend_state(df):
+        state["version"] += 1
+        return df
+
+    step, calls = count_calls(extend_state)
+    cached = cache_step(
+        "extend_state",
+        step,
+        state=lambda: str(state["version"]),
+        cache_dir=cache_dir,
+    )
+
+    cached([movies], [None])
+    cached([movies], [None])
+
+    # The second run starts from the state the first one left, as a rerun
+    # of the pipeline would
+    assert len(calls) == 1
+    assert len(load_step_cache_index(cache_dir)) == 2
+
+
+def test_run_dag_passes_keys_between_cached_steps(cache_dir, movies):
+    first, first_calls = count_calls(add_half)
+    second, second_calls = count_calls(split_rows)
+    steps = {
+        "add_half": {
+            "function": first,
+            "inputs": ["movies"],
+            "outputs": ["halved"],
+            "cache": cache_step("add_half", first, cache_dir=cache_dir),
+        },
+        "split_rows": {
+            "function": second,
+            "inputs": ["halved"],
+            "outputs": ["head", "tail"],
+            "cache": cache_step("split_rows", second, cache_dir=cache_dir),
+        },
+    }
+
+    computed, _ = run_dag(steps, {"movies": movies})
+    reused, _ = run_dag(steps, {"movies": movies})
+
+    assert (len(first_calls), len(second_calls)) == (1, 1)
+    pd.testing.assert_frame_equal(computed["tail"], reused["tail"])
+
+
+def test_write_frame_round_trips_pandas_types(tmp_path):
+    df = pd.DataFrame(
+        {
+            "genres": pd.Series(
+                [["Drama"], [], None],
+                dtype=pd.ArrowDtype(pa.list_(pa.string())),
+            ),
+            "title": pd.Series(["a", None, "c"], dtype="string[pyarrow]"),
+            "arrow_title": pd.Series(
+                ["a", "b", None], dtype=pd.ArrowDtype(pa.string())
+            ),
+            "language": pd.Series(["en", "fr", "en"], dtype="category"),
+            "arrow_language": pd.Series(
+                ["en", "fr", None],
+                dtype=pd.CategoricalDtype(
+                    pd.Index(["de", "en", "fr"], dtype="string[pyarrow]")
+                ),
+            ),
+            "arrow_category": pd.Series(
+                ["en", "fr", "en"],
+                dtype=pd.CategoricalDtype(
+                    pd.Index(["en", "fr"], dtype=pd.ArrowDtype(pa.string()))
+                ),
+            ),
+            "year": pd.Series([2000, None, 2010], dtype="Int64"),
+            "rating": [1.5, 2.0, None],
+        },
+        index=pd.Index([10, 20, 30], name="movie_key"),
+    )
+    path = str(tmp_path / "frame.parquet")
+
+    write_frame(df, path)
+
+    pd.testing.assert_frame_equal(read_frame(path), df)
+
+
+def test_write_frame_stores_the_types_as_json(tmp_path, movies):
+    path = str(tmp_path / "frame.parquet")
+
+    write_frame(movies, path)
+
+    metadata = pq.read_schema(path).metadata[FRAME_METADATA_KEY]
+    assert json.loads(metadata)["dtypes"] == {
+        "movie_id": "object",
+        "rating_count": "int64",
+    }
+
+
+def test_write_frame_keeps_a_range_index(tmp_path, movies):
+    df = movies.iloc[1:].reset_index(drop=True)
+    df.index = pd.RangeIndex(5, 7)
+    path = str(tmp_path / "frame.parquet")
+
+    write_frame(df, path)
+
+    restored = read_frame(path)
+    assert isinstance(restored.index, pd.RangeIndex)
+    pd.testing.assert_frame_equal(restored, df)
+
+
+def test_hash_frame_depends_on_values_and_types(movies):
+    assert hash_frame(movies) == hash_frame(movies.copy())
+    assert hash_frame(movies) != hash_frame(movies.assign(rating_count=0))
+    assert hash_frame(movies) != hash_frame(
+        movies.astype({"rating_count": "int32"})
+    )
+
+
+def test_evict_least_recently_used_keeps_recent_entries(cache_dir, movies):
+    for name in ["first", "second", "third"]:
+        cache_step(name, add_half, cache_dir=cache_dir)([movies], [None])
+    index = load_step_cache_index(cache_dir)
+    entry_bytes = max(entry["bytes"] for entry in index.values())
+
+    evicted = evict_least_recently_used(index, entry_bytes, cache_dir)
+
+    assert len(evicted) == 2
+    assert [entry["step"] for entry in index.values()] == ["third"]
+
+
+def test_clear_step_cache_removes_the_entries_of_a_step(cache_dir, movies):
+    step, calls = count_calls(add_half)
+    cached = cache_step("add_half", step, cache_dir=cache_dir)
+    cached([movies], [None])
+    cache_step("split_rows", split_rows, cache_dir=cache_dir)(
+        [movies], [None]
+    )
+
+    assert clear_step_cache("add_half", cache_dir) == 1
+    cached([movies], [None])
+
+    assert len(calls) == 2
+    steps = {
+        entry["step"] for entry in load_step_cache_index(cache_dir).values()
+    }
+    assert steps == {"add_half", "split_rows"}
@@ -0,0 +1,25 @@
+import pytest
+from src.transform.transform import (
+    TRANSFORM_INPUTS,
+    TRANSFORM_OUTPUTS,
+    get_transform_steps,
+)
+from src.utils.dag_utils import get_step_dependencies
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_transform_steps_form_a_graph(workers):
+    steps = get_transform_steps(workers)
+
+    dependencies = get_step_dependencies(steps)
+
+    outputs = {output for step in steps.values() for output in step["outputs"]}
+    inputs = {value for step in steps.values() for value in step["inputs"]}
+    assert set(TRANSFORM_OUTPUTS) <= outputs
+    assert inputs - outputs == set(TRANSFORM_INPUTS)
+    # The three sources are cleaned independently
+    for source in ["clean_movies", "clean_movies_with_ratings"]:
+        assert dependencies[source] == set()
+    assert dependencies["clean_user_ratings"] == set()
+    # Movie keys are handed out to the user ratings first
+    assert "clean_user_ratings" in dependencies["add_movie_keys"]
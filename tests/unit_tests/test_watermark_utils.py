@@ -0,0 +1,156 @@
+import os
+import pandas as pd
+import pytest
+from src.utils.watermark_utils import (
+    append_to_kept_rows,
+    commit_watermark,
+    load_watermark,
+    read_csv_since_watermark,
+    stage_watermark,
+)
+
+READ_OPTIONS = {
+    "engine": "pyarrow",
+    "dtype_backend": "pyarrow",
+    "dtype": {"rating_val": "Int8"},
+}
+
+
+@pytest.fixture
+def csv_file(tmp_path):
+    file_path = tmp_path / "unclean_user_ratings.csv"
+    file_path.write_text(
+        "movie_id,rating_val,user_id\n"
+        "mank,5,deathproof\n"
+        "the-social-network,10,deathproof\n"
+    )
+    return str(file_path)
+
+
+def append(file_path, text):
+    with open(file_path, "a") as file:
+        file.write(text)
+
+
+def test_first_read_returns_whole_file(csv_file):
+    rows, watermark = read_csv_since_watermark(csv_file, None, **READ_OPTIONS)
+
+    assert rows["movie_id"].tolist() == ["mank", "the-social-network"]
+    assert rows["rating_val"].dtype == pd.Int8Dtype()
+    assert watermark["row_count"] == 2
+    assert watermark["byte_offset"] == len(open(csv_file, "rb").read())
+
+
+def test_read_returns_only_appended_rows(csv_file):
+    _, watermark = read_csv_since_watermark(csv_file, None, **READ_OPTIONS)
+    append(csv_file, "insidious,10,lily\nhush-2016,8,lily\n")
+
+    rows, new_watermark = read_csv_since_watermark(
+        csv_file, watermark, **READ_OPTIONS
+    )
+
+    assert rows.columns.tolist() == ["movie_id", "rating_val", "user_id"]
+    assert rows["movie_id"].tolist() == ["insidious", "hush-2016"]
+    assert rows["rating_val"].tolist() == [10, 8]
+    assert new_watermark["row_count"] == 4
+
+
+def test_read_without_new_rows_is_empty(csv_file):
+    _, watermark = read_csv_since_watermark(csv_file, None, **READ_OPTIONS)
+
+    rows, new_watermark = read_csv_since_watermark(
+        csv_file, watermark, **READ_OPTIONS
+    )
+
+    assert rows.empty
+    assert rows.columns.tolist() == ["movie_id", "rating_val", "user_id"]
+    assert new_watermark == watermark
+
+
+def test_incomplete_last_line_is_left_for_next_run(csv_file):
+    _, watermark = read_csv_since_watermark(csv_file, None, **READ_OPTIONS)
+    append(csv_file, "insidious,10,lily\nhush-2016,8,li")
+
+    rows, watermark = read_csv_since_watermark(
+        csv_file, watermark, **READ_OPTIONS
+    )
+    assert rows["movie_id"].tolist() == ["insidious"]
+
+    append(csv_file, "ly\n")
+    rows, watermark = read_csv_since_watermark(
+        csv_file, watermark, **READ_OPTIONS
+    )
+    assert rows["user_id"].tolist() == ["lily"]
+    assert watermark["row_count"] == 4
+
+
+def test_rewritten_file_is_read_in_full(csv_file):
+    _, watermark = read_csv_since_watermark(csv_file, None, **READ_OPTIONS)
+    with open(csv_file, "w") as file:
+        file.write(
+            "movie_id,rating_val,user_id\n"
+            "insidious,10,lily\n"
+            "mank,5,deathproof\n"
+            "hush-2016,8,lily\n"
+        )
+
+    rows, watermark = read_csv_since_watermark(
+        csv_file, watermark, **READ_OPTIONS
+    )
+
+    assert len(rows) == 3
+    assert watermark["row_count"] == 3
+
+
+def test_staged_watermark_is_only_loaded_after_commit(tmp_path):
+    state_dir = str(tmp_path / "state")
+
+    stage_watermark("user_ratings", {"row_count": 2}, state_dir)
+    assert load_watermark("user_ratings", state_dir) is None
+
+    assert commit_watermark("user_ratings", state_dir)
+    assert load_watermark("user_ratings", state_dir) == {"row_count": 2}
+    assert not commit_watermark("user_ratings", state_dir)
+
+
+def test_kept_rows_are_committed_with_the_watermark(tmp_path):
+    state_dir = str(tmp_path / "state")
+    rows = pd.DataFrame({"movie_id": ["mank", "hush-2016"]})
+    new_rows = pd.DataFrame({"movie_id": ["insidious"]})
+
+    stage_watermark("user_ratings", {"row_count": 2}, state_dir, rows=rows)
+    assert append_to_kept_rows("user_ratings", new_rows, 3, state_dir) is None
+    commit_watermark("user_ratings", state_dir)
+    all_rows = append_to_kept_rows("user_ratings", new_rows, 3, state_dir)
+    stage_watermark(
+        "user_ratings", {"row_count": 3}, state_dir, rows=new_rows
+    )
+    commit_watermark("user_ratings", state_dir)
+
+    assert all_rows["movie_id"].tolist() == ["mank", "hush-2016", "insidious"]
+    # Each run keeps only the rows it read, as a part of its own
+    assert len(os.listdir(tmp_path / "state" / "user_ratings_rows")) == 2
+    assert len(
+        append_to_kept_rows("user_ratings", new_rows.head(0), 3, state_dir)
+    ) == 3
+
+
+def test_kept_rows_must_cover_the_watermark(tmp_path):
+    state_dir = str(tmp_path / "state")
+    rows = pd.DataFrame({"movie_id": ["mank", "hush-2016"]})
+    stage_watermark("user_ratings", {"row_count": 2}, state_dir, rows=rows)
+    commit_watermark("user_ratings", state_dir)
+    new_rows = pd.DataFrame({"movie_id": ["insidious"]})
+
+    # Too few kept rows, or other columns
+    assert append_to_kept_rows("user_ratings", new_rows, 4, state_dir) is None
+    assert append_to_kept_rows(
+        "user_ratings", new_rows.rename(columns={"movie_id": "slug"}), 3,
+        state_dir,
+    ) is None
+    # Rows read again from the start replace the kept ones
+    stage_watermark("user_ratings", {"row_count": 1}, state_dir, rows=new_rows)
+    commit_watermark("user_ratings", state_dir)
+    assert append_to_kept_rows(
+        "user_ratings", new_rows, 2, state_dir
+    )["movie_id"].tolist() == ["insidious", "insidious"]